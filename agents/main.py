@@ -1,18 +1,39 @@
 from dotenv import load_dotenv
-import dspy
-import os
 import asyncio
 from typing import List, Dict, Optional
-from agents.pipelines.visualization_pipeline import VisualizationPipeline
-from agents.pipelines.analysis_pipeline import AnalysisPipeline
-from agents.pipelines.modifier_pipeline import ModifierPipeline
-from agents.modules.router import ActionRouter, ACTION_LIST
-from agents.modules.webhook_monitor import WebhookMonitorAgent
+from agents.modules.router import ACTION_LIST
+from agents.runtime import get_runtime
+from agents.utils.concurrency import gather_bounded, get_env_int, get_env_float
+from agents.utils.render_pool import get_render_pool
+
+async def export_pngs_in_batch(results: List[Dict]):
+    """
+    Export the PNGs of all successful results with a single renderer round-trip.
+    
+    Results whose export fails are marked as failed in place.
+    """
+    to_export = [result for result in results if result.get("success") and result.get("fig_json")]
+    if not to_export:
+        return
+    
+    try:
+        export_results = await get_render_pool().export_pngs(
+            [(result["fig_json"], result["output_png_path"]) for result in to_export]
+        )
+    except Exception as e:
+        export_results = [{"success": False, "error": f"Failed to export PNG: {str(e)}"}] * len(to_export)
+    
+    for result, export_result in zip(to_export, export_results):
+        if not export_result["success"]:
+            print(f"[ERROR] {export_result['error']}")
+            result["success"] = False
+            result["error"] = export_result["error"]
 
 async def main(
     prompt: str, 
     conversation_history: List[Dict[str, str]] = None,
-    mentioned_visualizations: Optional[List[Dict]] = None
+    mentioned_visualizations: Optional[List[Dict]] = None,
+    mcp_server: Optional[str] = None
 ):
     # Load environment variables
     load_dotenv()
@@ -25,28 +46,15 @@ async def main(
     
     print(f"Processing prompt with {len(mentioned_visualizations)} mentioned visualizations")
     
-    model = f"openai/{os.getenv('OPENAI_MODEL')}"
-    lm = dspy.LM(model=model, api_key=os.getenv("OPENAI_API_KEY"))
-    dspy.configure(lm=lm)
-    
-    # Initialize pipelines and agents
-    analysis_pipeline = AnalysisPipeline()
-    await analysis_pipeline.initialize()
-        
-    visualization_pipeline = VisualizationPipeline()
-    await visualization_pipeline.initialize() 
-    
-    modifier_pipeline = ModifierPipeline()
-    await modifier_pipeline.initialize()
-    
-    webhook_agent = WebhookMonitorAgent()
-    await webhook_agent.initialize_tools()
+    # Reuse the pipelines, agents and tool listings of the MCP server
+    runtime = await get_runtime(mcp_server)
+    analysis_pipeline = runtime.analysis_pipeline
+    visualization_pipeline = runtime.visualization_pipeline
+    modifier_pipeline = runtime.modifier_pipeline
+    webhook_agent = runtime.webhook_agent
     
-    # Add available mcp tools in visualization pipeline to the prompt
-    prompt = prompt + "\n\nAvailable MCP tools in RETRIEVE_AND_VISUALIZE_INFORMATION: " + ", ".join([tool.name for tool in visualization_pipeline.retriever.tools])
-    
-    # Add available mcp tools in webhook agent to the prompt
-    prompt = prompt + "\n\nAvailable MCP tools in USE_WEBHOOK: " + ", ".join([tool.name for tool in webhook_agent.tools])
+    # Add available mcp tools in visualization pipeline and webhook agent to the prompt
+    prompt = prompt + runtime.tools_prompt
     
     # Add information about mentioned visualizations to the prompt if any
     if mentioned_visualizations and len(mentioned_visualizations) > 0:
@@ -55,11 +63,9 @@ async def main(
             viz_info += f"Visualization {i+1} (ID: {viz['visualization_id']}): {viz['png_path']}\n"
         prompt = prompt + "\n\n" + viz_info
     
-    # Initialize router with predict
-    router = dspy.Predict(ActionRouter)
-    
-    # Get route action with required fields
-    response = router(
+    # Get route action with required fields, the LM call is blocking so it runs in a thread
+    response = await asyncio.to_thread(
+        runtime.router,
         available_action=ACTION_LIST,
         conversation_history=conversation_history,    
         new_message=prompt,
@@ -84,14 +90,30 @@ async def main(
         results = await analysis_pipeline.analyze_figures(img_paths, prompt, conversation_history)
         results["action"] = action
     elif action == "RETRIEVE_AND_VISUALIZE_INFORMATION":
+        # Run the sub-tasks concurrently, results keep the order of information_needed
+        information_needed = parameters["information_needed"]
+        task_results = await gather_bounded(
+            information_needed,
+            lambda info_needed: visualization_pipeline.generate_visualization(info_needed, conversation_history, export_png=False),
+            limit=get_env_int("VISUALIZATION_CONCURRENCY", 3),
+            timeout=get_env_float("VISUALIZATION_TASK_TIMEOUT"),
+        )
+        
         results = {"visualization_results_list": []}
-        for info_needed in parameters["information_needed"]:
-            result = await visualization_pipeline.generate_visualization(info_needed, conversation_history)
+        for info_needed, result in zip(information_needed, task_results):
+            if isinstance(result, BaseException):
+                error_msg = f"Failed to generate visualization for '{info_needed}': {type(result).__name__}: {result}"
+                print(f"[ERROR] {error_msg}")
+                result = {"success": False, "error": error_msg}
             results["visualization_results_list"].append(result)
+        
+        # Export the PNGs of all successful sub-tasks in one round-trip to the renderer
+        await export_pngs_in_batch(results["visualization_results_list"])
         results["action"] = action
     elif action == "MODIFY_VISUALIZATION":
         # This action is for modifying existing visualizations
-        results = {"modification_results_list": []}
+        # Results are keyed by the visualization_id of each mentioned visualization
+        results = {"modification_results": {}}
         
         # Check if we have mentioned visualizations
         if not mentioned_visualizations or len(mentioned_visualizations) == 0:
@@ -101,31 +123,50 @@ async def main(
             results["action"] = action
             return results
         
-        for viz_to_modify in mentioned_visualizations:            
-            # Modify the visualization
-            result = await modifier_pipeline.modify_visualization(
+        async def _modify(viz_to_modify):
+            return await modifier_pipeline.modify_visualization(
                 prompt=prompt,
                 task=prompt,
                 file_path=viz_to_modify["file_path"],
                 original_json_data=viz_to_modify["json_data"],
                 original_png_path=viz_to_modify["png_path"],
-                conversation_history=conversation_history
+                conversation_history=conversation_history,
+                visualization_id=viz_to_modify["visualization_id"],
+                export_png=False
             )
-
-            # Add the result to the modification results list
+        
+        # Modify all mentioned visualizations in parallel
+        modify_results = await gather_bounded(
+            mentioned_visualizations,
+            _modify,
+            limit=get_env_int("MODIFICATION_CONCURRENCY", 4),
+            timeout=get_env_float("MODIFICATION_TASK_TIMEOUT"),
+        )
+        
+        for viz_to_modify, result in zip(mentioned_visualizations, modify_results):
+            visualization_id = viz_to_modify["visualization_id"]
+            if isinstance(result, BaseException):
+                result = {"success": False, "error": f"Failed to modify visualization: {type(result).__name__}: {result}"}
+            
+            # Add the result under the visualization id
             if result["success"]:
-                results["modification_results_list"].append({
+                results["modification_results"][visualization_id] = {
                     "success": True,
-                    "visualization_id": viz_to_modify["visualization_id"],
+                    "visualization_id": visualization_id,
                     "fig_json": result["fig_json"],
                     "output_png_path": result["output_png_path"],
                     "file_path": viz_to_modify["file_path"],
-                })
+                    "plot_code": result["plot_code"],
+                }
             else:
-                results["modification_results_list"].append({
+                results["modification_results"][visualization_id] = {
                     "success": False,
+                    "visualization_id": visualization_id,
                     "error": result.get("error", "Unknown error")
-                })
+                }
+        
+        # Export the PNGs of all modified figures in one round-trip to the renderer
+        await export_pngs_in_batch(list(results["modification_results"].values()))
         results["action"] = action
     elif action == "USE_WEBHOOK":
         # Handle webhook tool usage
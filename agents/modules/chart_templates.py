@@ -0,0 +1,188 @@
+"""
+Pre-built Plotly charts for MCP tools with fixed output shapes.
+
+A template builds the chart directly from the retrieved data, so common charts
+skip LLM code generation. Each builder returns None when the data does not have
+the expected shape, and the caller then falls back to the Visualizer.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# builder(df, tool_args) -> figure, or None if the data does not match
+ChartBuilder = Callable[[pd.DataFrame, Dict[str, Any]], Optional[go.Figure]]
+
+CHART_TEMPLATES: Dict[str, ChartBuilder] = {}
+
+TIME_COLUMN_NAMES = ["date", "day", "timestamp", "time", "datetime", "t"]
+
+
+def chart_template(*tool_names: str):
+    """Register a chart builder for one or more tool names"""
+    def decorator(builder: ChartBuilder) -> ChartBuilder:
+        for tool_name in tool_names:
+            CHART_TEMPLATES[tool_name] = builder
+        return builder
+    return decorator
+
+
+def build_chart(tool_name: str, df: pd.DataFrame, tool_args: Dict[str, Any] = None) -> Optional[go.Figure]:
+    """
+    Build the chart of a tool result with its template.
+
+    Returns:
+        The figure, or None if the tool has no template or the data does not match it
+    """
+    builder = CHART_TEMPLATES.get(tool_name)
+    if builder is None or df.empty:
+        return None
+    return builder(_unwrap_records(df), tool_args or {})
+
+
+def _unwrap_records(df: pd.DataFrame) -> pd.DataFrame:
+    """Expand a single-row result whose only list column holds the records, e.g. {"data": [...]}"""
+    if len(df) != 1:
+        return df
+    list_columns = [
+        name for name in df.columns
+        if isinstance(df[name].iloc[0], list) and df[name].iloc[0] and isinstance(df[name].iloc[0][0], dict)
+    ]
+    if len(list_columns) != 1:
+        return df
+    return pd.json_normalize(df[list_columns[0]].iloc[0])
+
+
+def _find_time_column(df: pd.DataFrame) -> Optional[str]:
+    columns = {name.lower(): name for name in df.columns}
+    for candidate in TIME_COLUMN_NAMES:
+        if candidate in columns:
+            return columns[candidate]
+    for lower, name in columns.items():
+        if lower.endswith(("date", "timestamp", "time")):
+            return name
+    return None
+
+
+def _to_datetime(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series):
+        # Unix timestamps, in milliseconds when too large for seconds
+        unit = "ms" if series.dropna().abs().max() > 1e11 else "s"
+        return pd.to_datetime(series, unit=unit, errors="coerce")
+    return pd.to_datetime(series, errors="coerce", utc=True)
+
+
+def _value_columns(df: pd.DataFrame, exclude: List[str]) -> List[str]:
+    return [
+        name for name in df.columns
+        if name not in exclude
+        and pd.api.types.is_numeric_dtype(df[name])
+        and not pd.api.types.is_bool_dtype(df[name])
+    ]
+
+
+def _time_series(df: pd.DataFrame, value_columns: List[str] = None) -> Optional[tuple]:
+    """Return (sorted frame, time column, value columns), or None if the data is not a time series"""
+    time_column = _find_time_column(df)
+    if time_column is None:
+        return None
+    df = df.assign(**{time_column: _to_datetime(df[time_column])}).dropna(subset=[time_column])
+    value_columns = value_columns or _value_columns(df, exclude=[time_column])
+    value_columns = [name for name in value_columns if name in df.columns]
+    if df.empty or not value_columns:
+        return None
+    return df.sort_values(time_column), time_column, value_columns
+
+
+def _label(name: str) -> str:
+    return name.replace("_", " ").replace(".", " ").strip().title()
+
+
+def _layout(fig: go.Figure, title: str, y_title: str = None) -> go.Figure:
+    fig.update_layout(
+        title=title,
+        xaxis_title="Date",
+        yaxis_title=y_title,
+        hovermode="x unified",
+        template="plotly_white",
+    )
+    return fig
+
+
+def _line_chart(df: pd.DataFrame, title: str, y_title: str = None, value_columns: List[str] = None, bar: bool = False) -> Optional[go.Figure]:
+    series = _time_series(df, value_columns)
+    if series is None:
+        return None
+    df, time_column, value_columns = series
+
+    fig = go.Figure()
+    for name in value_columns:
+        trace = go.Bar if bar and len(value_columns) == 1 else go.Scatter
+        kwargs = {} if trace is go.Bar else {"mode": "lines+markers"}
+        fig.add_trace(trace(x=df[time_column], y=df[name], name=_label(name), **kwargs))
+    return _layout(fig, title, y_title or (_label(value_columns[0]) if len(value_columns) == 1 else None))
+
+
+def _chain_label(tool_args: Dict[str, Any]) -> str:
+    blockchain = tool_args.get("blockchain")
+    return f" on {blockchain.title()}" if blockchain else ""
+
+
+@chart_template("get_daily_transaction_stats")
+def daily_transactions_chart(df: pd.DataFrame, tool_args: Dict[str, Any]) -> Optional[go.Figure]:
+    return _line_chart(df, f"Daily Transactions{_chain_label(tool_args)}", "Transactions", bar=True)
+
+
+@chart_template("get_daily_active_accounts_stats", "get_daily_active_accounts_stats_by_contract")
+def daily_active_accounts_chart(df: pd.DataFrame, tool_args: Dict[str, Any]) -> Optional[go.Figure]:
+    return _line_chart(df, f"Daily Active Accounts{_chain_label(tool_args)}", "Active Accounts", bar=True)
+
+
+@chart_template("get_transaction_count")
+def transaction_count_chart(df: pd.DataFrame, tool_args: Dict[str, Any]) -> Optional[go.Figure]:
+    return _line_chart(df, "Daily Transactions on Zircuit", "Transactions", bar=True)
+
+
+@chart_template("get_daily_metrics")
+def daily_metrics_chart(df: pd.DataFrame, tool_args: Dict[str, Any]) -> Optional[go.Figure]:
+    series = _time_series(df)
+    if series is None:
+        return None
+    df, time_column, value_columns = series
+
+    # One panel per metric, their scales differ by orders of magnitude
+    fig = make_subplots(
+        rows=len(value_columns), cols=1, shared_xaxes=True,
+        subplot_titles=[_label(name) for name in value_columns],
+    )
+    for row, name in enumerate(value_columns, start=1):
+        fig.add_trace(go.Scatter(x=df[time_column], y=df[name], name=_label(name), mode="lines"), row=row, col=1)
+    fig.update_layout(
+        title=f"Zircuit Daily Metrics ({tool_args.get('period', '30')} days)",
+        height=max(400, 250 * len(value_columns)),
+        showlegend=False,
+        hovermode="x unified",
+        template="plotly_white",
+    )
+    return fig
+
+
+@chart_template("get_general_value_chart_by_address")
+def portfolio_value_chart(df: pd.DataFrame, tool_args: Dict[str, Any]) -> Optional[go.Figure]:
+    value_columns = [name for name in ("value_usd", "value") if name in df.columns] or None
+    return _line_chart(df, "Portfolio Value", "Value (USD)", value_columns=value_columns)
+
+
+@chart_template("get_token_price_history")
+def token_price_history_chart(df: pd.DataFrame, tool_args: Dict[str, Any]) -> Optional[go.Figure]:
+    value_columns = [name for name in ("avg", "price", "value", "close") if name in df.columns][:1] or None
+    symbols = [
+        df[name].dropna().iloc[0] if name in df.columns and df[name].notna().any() else None
+        for name in ("token0_symbol", "token1_symbol")
+    ]
+    pair = "/".join(symbols) if all(symbols) else "Token"
+    granularity = tool_args.get("granularity")
+    title = f"{pair} Price History" + (f" ({granularity})" if granularity else "")
+    return _line_chart(df, title, "Price", value_columns=value_columns)
@@ -1,21 +1,22 @@
 import base64
-from openai import OpenAI
 import os
 from dotenv import load_dotenv
 from typing import List, Dict
 
+from agents.utils.openai_client import get_async_openai_client
+
 load_dotenv()
 
 class FigureAnalyzerAgent:
     def __init__(self):
-        self.client = OpenAI()
+        self.client = get_async_openai_client()
 
     def encode_image(self, image_path: str) -> str:
         """Encode image to base64 string"""
         with open(image_path, "rb") as image_file:
             return base64.b64encode(image_file.read()).decode("utf-8")
 
-    def analyze_figures(
+    async def analyze_figures(
         self, image_paths: list[str], prompt: str = "Please analyze the figure and provide a detailed description of the figure.",
         conversation_history: List[Dict[str, str]] = None
     ) -> str:
@@ -56,7 +57,7 @@ class FigureAnalyzerAgent:
         # Add the content to messages
         messages.append({"role": "user", "content": content})
 
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model=os.getenv("MODEL_NAME"),
             messages=messages,
             max_tokens=1000,
@@ -3,12 +3,13 @@ import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from openai import OpenAI
 import importlib
 import asyncio
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-from agents.utils.format_utils import format_obj, flatten_json
+from agents.utils.format_utils import normalize_records
+from agents.utils.openai_client import get_async_openai_client
+from agents.utils.result_store import write_columns, RESULT_FILE_SUFFIX
 
 SYSTEM_PROMPT = """
 You are an AI assistant that can interact with blockchain data through an MCP server.
@@ -17,18 +18,15 @@ You are an AI assistant that can interact with blockchain data through an MCP se
 logger = logging.getLogger(__name__)
 
 class MCPRetrieverAgent:
-    def __init__(self) -> None:
+    def __init__(self, mcp_server: Optional[str] = None) -> None:
         try:
             logger.info("Initializing MCPRetrieverAgent...")
             
-            # Initialize OpenAI client
-            self.client = OpenAI(
-                api_key=os.getenv("OPENAI_API_KEY"),
-                base_url=os.getenv("OPENAI_BASE_URL"),
-            )
+            # Use the shared async OpenAI client
+            self.client = get_async_openai_client()
             
-            # Get current MCP server from backend state
-            self.mcp = self._get_mcp_server()
+            # Use the given MCP server, or the one selected in the backend
+            self.mcp = self._get_mcp_server(mcp_server)
             
             # Initialize empty lists
             self.tools = []
@@ -49,19 +47,22 @@ class MCPRetrieverAgent:
             logger.error(f"Failed to initialize MCPRetrieverAgent: {str(e)}")
             raise
             
-    def _get_mcp_server(self):
-        """Get the current MCP server based on backend state"""
-        from backend.routes.mcp import current_mcp_server
+    def _get_mcp_server(self, mcp_server: Optional[str] = None):
+        """Get the given MCP server, or the current one based on backend state"""
+        if mcp_server is None:
+            from backend.routes.mcp import current_mcp_server as mcp_server
         
         # Import the appropriate MCP server module
-        module_name = f"agents.utils.mcp_server_{current_mcp_server}"
+        module_name = f"agents.utils.mcp_server_{mcp_server}"
         try:
             mcp_module = importlib.import_module(module_name)
+            self.mcp_server_name = mcp_server
             return mcp_module.mcp
         except ImportError as e:
             logger.error(f"Failed to import MCP server module: {str(e)}")
             # Fall back to nodit if import fails
             fallback_module = importlib.import_module("agents.utils.mcp_server_nodit")
+            self.mcp_server_name = "nodit"
             return fallback_module.mcp
 
     async def initialize_tools(self):
@@ -94,11 +95,11 @@ class MCPRetrieverAgent:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         # Create a safe filename from the first 50 chars of the prompt
         safe_prompt = "".join(c if c.isalnum() else "_" for c in prompt[:50]).rstrip("_")
-        return f"{timestamp}_{safe_prompt}.json"
+        return f"{timestamp}_{safe_prompt}{RESULT_FILE_SUFFIX}"
 
     async def retrieve_by_prompt(self, prompt: str, conversation_history: List[Dict[str, str]] = None) -> dict:
         """
-        Process a prompt, execute tools, and save results to a JSON file
+        Process a prompt, execute tools, and save results to a Parquet file
         
         Args:
             prompt: The user's prompt
@@ -121,7 +122,7 @@ class MCPRetrieverAgent:
             messages.append({"role": "user", "content": prompt})
             
             # Get OpenAI's tool selection
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=os.getenv("MODEL_NAME"),
                 messages=messages,
                 tools=self.openai_tools,
@@ -133,6 +134,8 @@ class MCPRetrieverAgent:
             assistant_message = response.choices[0].message
             
             result = None
+            source_tool = None
+            source_args = None
             
             # Check if OpenAI wants to call any tools
             if hasattr(assistant_message, 'tool_calls') and assistant_message.tool_calls:
@@ -155,23 +158,13 @@ class MCPRetrieverAgent:
                             if asyncio.iscoroutinefunction(func):
                                 result = await func(**args)
                             else:
-                                result = func(**args)
+                                # Sync tools make blocking HTTP calls, run them in a thread
+                                result = await asyncio.to_thread(func, **args)
                             logger.info(f"Tool execution successful: {tool_name}")
+                            source_tool, source_args = tool_name, args
                             
-                            from backend.routes.mcp import current_mcp_server
-                            
-                            if current_mcp_server == "zircuit":
-                                formatted_item = format_obj(result)
-                                flattened_item = flatten_json(formatted_item)
-                                result = [flattened_item]
-                            else:
-                                # Format and flatten each item
-                                flattened_items = []
-                                for item in result:
-                                    formatted_item = format_obj(item)
-                                    flattened_item = flatten_json(formatted_item)
-                                    flattened_items.append(flattened_item)
-                                result = flattened_items
+                            # Flatten the records and convert number strings column by column
+                            result = normalize_records(result)
                             
                             # Add tool response to conversation history
                             messages.append({
@@ -200,15 +193,17 @@ class MCPRetrieverAgent:
             filename = self._generate_filename(prompt)
             file_path = self.results_dir / filename
             
-            # Save results to JSON file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
+            # Save results to a columnar file with an explicit schema
+            await asyncio.to_thread(write_columns, result or {}, file_path)
             
             logger.info(f"Result saved to {file_path}")
             
             return {
                 "success": True,
-                "file_path": str(file_path)
+                "file_path": str(file_path),
+                "tool_name": source_tool,
+                "tool_args": source_args,
+                "mcp_server": self.mcp_server_name
             }
             
         except Exception as e:
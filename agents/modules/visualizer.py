@@ -1,37 +1,40 @@
 # TODO: python plotly with python interpreter/retry logic
 
 
+import asyncio
 import dspy
 import pandas as pd
-import kaleido
 import re
 from typing import List, Dict
 
+from agents.utils.plot_cache import get_plot_cache, make_plot_cache_key
+from agents.utils.render_pool import get_render_pool
+from agents.utils.result_store import read_result
+
 class Visualizer(dspy.Signature):
     """
     You are a visualization expert in python plotly. 
-    You are given a user's prompt and a json data file. 
-    You need to plot the data in the json file using python plotly. 
-    Read the data from the json file and plot the data using python plotly. 
-    Remember, do not directly use the sample data of the json file, you need to read the data from the json file. 
-    Do not assume what the data is, always read the data from the json file. You can refer to sample data for the structure of the data.
+    You are given a user's prompt and a data file that is already loaded into a pandas DataFrame named `df`. 
+    You need to plot the data in `df` using python plotly. 
+    Remember, do not directly use the sample data, you need to use the data in `df`. 
+    Do not assume what the data is, always use the data in `df`. You can refer to sample data for the structure of the data.
     
     Rules:
-    1. Always check what data is available in the json file. The sample data is given to you.
+    1. Always check what data is available in `df`. The sample data is given to you.
     2. Only use columns that are available in the data! Avoid keyerror! Strictly follow the column names in the sample data.
     3. When u plot wallet address or contract address, only show the first 4 and last 4 characters, with ellipsis in the middle because they are too long.
     4. No need to use fig.show() in the plot code, just return the plot code.
-    5. If the data is token balances or similar, you should get the decimals of the contract from the data and then convert the balance to the token's decimal so that the visualization scale is easier to understand.
-    6. If there are timestamp data in the json data and you want to use it, you should convert the timestamp to a human readable date and time, remember to use unit='s' when converting the timestamp to a datetime object.
-    7. Use encoding='utf-8' when reading the json file.
+    5. Token amounts are already scaled by the token's decimals: use the `converted_<field>` columns (e.g. `converted_balance`, `converted_value`, `contract.converted_totalSupply`). The raw columns are in the token's smallest unit, never divide them by the decimals yourself.
+    6. If there are timestamp data in the data and you want to use it, you should convert the timestamp to a human readable date and time, remember to use unit='s' when converting the timestamp to a datetime object.
+    7. Do not read the data file yourself, `df` is already loaded and `pd`, `go` and `json` are already imported.
     8. Cannot accept list of column references or list of columns for both `x` and `y` in the plot code.
     9. Depending on the data, you can also use tables to visualize the data if it is suitable.
     """
 
     prompt = dspy.InputField(prefix="User's prompt:")
     task = dspy.InputField(prefix="The current task split from the user's prompt:")
-    file_path = dspy.InputField(prefix="The file path of the json data:")
-    sample_data = dspy.InputField(prefix="The sample data of the json file:")
+    file_path = dspy.InputField(prefix="The file path of the data:")
+    sample_data = dspy.InputField(prefix="The sample data of the DataFrame `df`:")
     reasoning = dspy.OutputField(
         prefix="Which information should be visualized based on the user's prompt?"
     )
@@ -42,9 +45,12 @@ class VisualizerAgent:
     def __init__(self, engine=None) -> None:
         self.engine = engine
         self.visualize = dspy.Predict(Visualizer, max_tokens=16000)
+        self.render_pool = get_render_pool()
+        self.plot_cache = get_plot_cache()
         
-    def visualize_by_prompt(
-        self, prompt: str, task: str, file_path: str, output_png_path: str, conversation_history: List[Dict[str, str]] = None
+    async def visualize_by_prompt(
+        self, prompt: str, task: str, file_path: str, output_png_path: str, conversation_history: List[Dict[str, str]] = None,
+        export_png: bool = True, source_tool: str = None
     ):
         """
         Generate visualization based on prompt and data
@@ -55,16 +61,34 @@ class VisualizerAgent:
             file_path: Path to the data file
             output_png_path: Path to save the output PNG
             conversation_history: List of previous conversation messages
-        """
+            export_png: Whether to export the PNG here. Pass False when the caller
+                exports several figures at once with RenderPool.export_pngs
+            source_tool: Name of the tool that produced the data. When given, plot
+                code that worked for the same tool, data schema and task is reused
+                instead of asking the LLM
         
-        # overwrite the default json.loads to use pandas.json_normalize so that large int can be read
-        import simplejson
-        pd.io.json._json.loads = lambda s, *a, **kw: simplejson.loads(s)
-        pd.io.json._json.ujson_loads = lambda s, *a, **kw: simplejson.loads(s)
+        Returns:
+            (fig_json, plot_code) of the rendered figure, the plot code can be
+            executed again on updated data
+        """
         
-        df = pd.read_json(file_path)
+        # Load the columnar result file, big integers are kept exact
+        df = await asyncio.to_thread(read_result, file_path)
         sample_data = df.head(5)
         
+        cache_key = None
+        if source_tool and self.plot_cache.enabled:
+            cache_key = make_plot_cache_key(source_tool, df, task)
+            cached_code = self.plot_cache.get(cache_key)
+            if cached_code:
+                result = await self.render_pool.execute_plot_code(cached_code, file_path, output_png_path, export_png)
+                if result["success"]:
+                    print(f"[INFO] Reused cached plot code for {source_tool}")
+                    return result["fig_json"], cached_code
+                # The new data does not fit the cached code, generate new code
+                print(f"[WARNING] Cached plot code failed, asking the LLM: {result['error']}")
+                self.plot_cache.invalidate(cache_key)
+        
         print(f"The sample data: {sample_data}")
         print(f"The column names: {sample_data.columns}")
         print(f"Conversation history length: {len(conversation_history) if conversation_history else 0}")
@@ -77,7 +101,9 @@ class VisualizerAgent:
                 context += f"{role}: {msg['content']}\n"
             prompt = prompt + context
         
-        response = self.visualize(
+        # The dspy call is blocking, keep it off the event loop
+        response = await asyncio.to_thread(
+            self.visualize,
             prompt=prompt,
             task=task,
             file_path=file_path,
@@ -91,81 +117,57 @@ class VisualizerAgent:
         plot_code = re.sub(r"```\s*", "", plot_code)
         
         try:
-            # Create a new namespace with all required imports
-            import plotly.graph_objects as go
-            import json
-            
-            namespace = {
-                'pd': pd,
-                'json': json,
-                'go': go,
-                'file_path': file_path  # Also provide the file path
-            }
-            
-            # Execute the code in the namespace with retry logic
+            # Execute the code with retry logic
             max_retries = 3
             retry_count = 0
-            last_error = None
             
             while retry_count < max_retries:
-                try:
-                    # Execute the code in the namespace
-                    exec(plot_code, namespace)
-                    
-                    # Get the figure from the namespace
-                    if 'fig' not in namespace:
-                        raise ValueError("Plot code did not create a 'fig' variable")
-                    
-                    fig = namespace['fig']
+                # Execute the plot code and export the PNG on a render worker
+                result = await self.render_pool.execute_plot_code(plot_code, file_path, output_png_path, export_png)
+                
+                if result["success"]:
                     print("[INFO] Successfully created plotly figure")
-                    
-                    # Convert to JSON
-                    fig_json = fig.to_json()
-                    print("[INFO] Successfully converted figure to JSON")
-                    
-                    # Save the figure to the output png path
-                    fig.write_image(output_png_path)
-                    print(f"[INFO] Successfully saved figure to {output_png_path}")
-                    
-                    return fig_json
-                    
-                except Exception as e:
-                    last_error = e
-                    retry_count += 1
-                    print(f"[ERROR] Attempt {retry_count}/{max_retries} failed: {str(e)}")
-                    import traceback
-                    error_traceback = traceback.format_exc()
-                    print(f"[ERROR] Traceback:\n{error_traceback}")
-                    print(f"[ERROR] Plot code that failed:\n{plot_code}")
-                    
-                    if retry_count < max_retries:
-                        # Prepare error context for the AI
-                        error_context = f"""
+                    if cache_key:
+                        self.plot_cache.set(cache_key, plot_code, tool_name=source_tool, task=task)
+                    if export_png:
+                        print(f"[INFO] Successfully saved figure to {output_png_path}")
+                    return result["fig_json"], plot_code
+                
+                retry_count += 1
+                error_traceback = result["traceback"]
+                print(f"[ERROR] Attempt {retry_count}/{max_retries} failed: {result['error']}")
+                print(f"[ERROR] Traceback:\n{error_traceback}")
+                print(f"[ERROR] Plot code that failed:\n{plot_code}")
+                
+                if retry_count < max_retries:
+                    # Prepare error context for the AI
+                    error_context = f"""
 The plot code failed with the following error:
-Error: {str(e)}
+Error: {result['error']}
 Traceback:
 {error_traceback}
 
 Please fix the code and try again. Here's the code that failed:
 {plot_code}
 """
-                        # Get fixed code from the AI
-                        response = self.visualize(
-                            prompt=error_context,
-                            task="Fix the plotting code based on the error message",
-                            file_path=file_path,
-                            sample_data=sample_data,
-                        )
-                        plot_code = response.plot_code
-                        print(f"[INFO] Retrying with fixed code:\n{plot_code}")
-                        
-                        # Clean up the code again
-                        plot_code = re.sub(r"```python\s*", "", plot_code)
-                        plot_code = re.sub(r"```\s*", "", plot_code)
-                        
-                    else:
-                        print("[ERROR] Max retries reached. Raising last error.")
-                        raise last_error
+                    # Get fixed code from the AI
+                    response = await asyncio.to_thread(
+                        self.visualize,
+                        prompt=error_context,
+                        task="Fix the plotting code based on the error message",
+                        file_path=file_path,
+                        sample_data=sample_data,
+                    )
+                    plot_code = response.plot_code
+                    print(f"[INFO] Retrying with fixed code:\n{plot_code}")
+                    
+                    # Clean up the code again
+                    plot_code = re.sub(r"```python\s*", "", plot_code)
+                    plot_code = re.sub(r"```\s*", "", plot_code)
+                    
+                else:
+                    print("[ERROR] Max retries reached. Raising last error.")
+                    raise RuntimeError(result["error"])
                     
         except Exception as e:
             print(f"[ERROR] Failed to create plot: {str(e)}")
@@ -3,11 +3,12 @@ import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from openai import OpenAI
 import importlib
 import asyncio
 from typing import List, Dict, Optional
 
+from agents.utils.openai_client import get_async_openai_client
+
 logger = logging.getLogger(__name__)
 
 SYSTEM_PROMPT = """
@@ -19,18 +20,15 @@ Your main tasks are:
 """
 
 class WebhookMonitorAgent:
-    def __init__(self) -> None:
+    def __init__(self, mcp_server: Optional[str] = None) -> None:
         try:
             logger.info("Initializing WebhookMonitorAgent...")
             
-            # Initialize OpenAI client
-            self.client = OpenAI(
-                api_key=os.getenv("OPENAI_API_KEY"),
-                base_url=os.getenv("OPENAI_BASE_URL"),
-            )
+            # Use the shared async OpenAI client
+            self.client = get_async_openai_client()
             
-            # Get current MCP server from backend state
-            self.mcp = self._get_mcp_server()
+            # Use the given MCP server, or the one selected in the backend
+            self.mcp = self._get_mcp_server(mcp_server)
             
             # Initialize empty lists
             self.tools = []
@@ -49,11 +47,12 @@ class WebhookMonitorAgent:
             logger.error(f"Failed to initialize WebhookMonitorAgent: {str(e)}")
             raise
             
-    def _get_mcp_server(self):
-        """Get the current MCP server based on backend state"""
-        from backend.routes.mcp import current_mcp_server
+    def _get_mcp_server(self, mcp_server: Optional[str] = None):
+        """Get the given MCP server, or the current one based on backend state"""
+        if mcp_server is None:
+            from backend.routes.mcp import current_mcp_server as mcp_server
         
-        module_name = f"agents.utils.mcp_server_{current_mcp_server}"
+        module_name = f"agents.utils.mcp_server_{mcp_server}"
         try:
             mcp_module = importlib.import_module(module_name)
             return mcp_module.mcp
@@ -97,13 +96,14 @@ class WebhookMonitorAgent:
         try:
             logger.info(f"Processing webhook prompt: {prompt}")
             
-            # Add the prompt to conversation history
-            self.conversation_history.append({"role": "user", "content": prompt})
+            # Build the messages for this call only, the agent is shared across requests
+            messages = self.conversation_history.copy()
+            messages.append({"role": "user", "content": prompt})
             
             # Get OpenAI's tool selection
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=os.getenv("MODEL_NAME"),
-                messages=self.conversation_history,
+                messages=messages,
                 tools=self.openai_tools,
                 tool_choice="auto"
             )
@@ -128,7 +128,11 @@ class WebhookMonitorAgent:
                     # Call the function
                     if tool_name in tool_map:
                         func = tool_map[tool_name]
-                        result = await func(**args) if asyncio.iscoroutinefunction(func) else func(**args)
+                        if asyncio.iscoroutinefunction(func):
+                            result = await func(**args)
+                        else:
+                            # Sync tools make blocking HTTP calls, run them in a thread
+                            result = await asyncio.to_thread(func, **args)
                         results.append({
                             "tool": tool_name,
                             "result": result
@@ -53,7 +53,7 @@ class AnalysisPipeline:
             print(f"Conversation history: {conversation_history}")
             
             # Call the analysis function with conversation history    
-            analysis = self.figure_analyzer.analyze_figures(image_paths, prompt, conversation_history)
+            analysis = await self.figure_analyzer.analyze_figures(image_paths, prompt, conversation_history)
             print(f"[INFO] Analysis complete: {analysis}")
             
             return {
@@ -68,7 +68,9 @@ class ModifierPipeline:
         file_path: str, 
         original_json_data: str,
         original_png_path: str,
-        conversation_history: List[Dict[str, str]] = None
+        conversation_history: List[Dict[str, str]] = None,
+        visualization_id: Optional[int] = None,
+        export_png: bool = True
     ):
         """
         Modify an existing visualization based on the provided data and prompt
@@ -80,11 +82,15 @@ class ModifierPipeline:
             original_json_data: JSON data of the original visualization
             original_png_path: Path to the original PNG image
             conversation_history: List of previous conversation messages
+            visualization_id: ID of the visualization being modified, used to keep output paths
+                unique when several visualizations are modified at the same time
+            export_png: Whether to export the PNG here, pass False to export it in a batch later
             
         Returns:
             Dictionary containing:
                 - success: Boolean indicating success
                 - fig_json: JSON representation of the modified figure
+                - plot_code: Plot code of the modified figure
                 - output_png_path: Path to the modified PNG image
                 - error: Error message if any
         """
@@ -104,7 +110,10 @@ class ModifierPipeline:
             
             # Generate a unique output path for the modified visualization
             file_name = Path(file_path).name
-            output_png_path = f"{os.getenv('VISUALIZATION_RESULTS_DIR')}/modified_{file_name}.png"
+            if visualization_id is not None:
+                output_png_path = f"{os.getenv('VISUALIZATION_RESULTS_DIR')}/modified_{visualization_id}_{file_name}.png"
+            else:
+                output_png_path = f"{os.getenv('VISUALIZATION_RESULTS_DIR')}/modified_{file_name}.png"
             
             # Add context about the original visualization to the prompt
             enhanced_prompt = f"""
@@ -116,12 +125,13 @@ The original visualization data: {original_json_data}
 """
             
             # Generate the modified visualization
-            fig_json = self.visualizer.visualize_by_prompt(
+            fig_json, plot_code = await self.visualizer.visualize_by_prompt(
                 prompt=enhanced_prompt,
                 task=task,
                 file_path=file_path,
                 output_png_path=output_png_path,
-                conversation_history=conversation_history
+                conversation_history=conversation_history,
+                export_png=export_png
             )
             
             print(f"[INFO] Successfully modified visualization")
@@ -129,6 +139,7 @@ The original visualization data: {original_json_data}
             return {
                 "success": True,
                 "fig_json": fig_json,
+                "plot_code": plot_code,
                 "output_png_path": output_png_path
             }
             
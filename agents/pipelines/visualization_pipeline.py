@@ -1,14 +1,19 @@
+import asyncio
 import logging
 import os
 from typing import Optional, List, Dict
 import dspy
 from pathlib import Path
 
+from agents.modules.chart_templates import CHART_TEMPLATES, build_chart
 from agents.modules.retriever import MCPRetrieverAgent
 from agents.modules.visualizer import VisualizerAgent
+from agents.utils.render_pool import get_render_pool
+from agents.utils.result_store import read_result
 
 class VisualizationPipeline:
-    def __init__(self):
+    def __init__(self, mcp_server: Optional[str] = None):
+        self.mcp_server = mcp_server
         self.retriever: Optional[MCPRetrieverAgent] = None
         self.visualizer: Optional[VisualizerAgent] = None
         self.is_initialized = False
@@ -26,7 +31,7 @@ class VisualizationPipeline:
             self._initialize_dspy()
             
             # Initialize agents
-            self.retriever = MCPRetrieverAgent()
+            self.retriever = MCPRetrieverAgent(self.mcp_server)
             await self.retriever.initialize_tools()
             self.visualizer = VisualizerAgent()
             
@@ -64,8 +69,13 @@ class VisualizationPipeline:
         )
         dspy.configure(lm=lm)
             
-    async def generate_visualization(self, prompt: str, conversation_history: List[Dict[str, str]] = None):
-        """Generate visualization for a given prompt"""
+    async def generate_visualization(self, prompt: str, conversation_history: List[Dict[str, str]] = None, export_png: bool = True):
+        """
+        Generate visualization for a given prompt
+        
+        When export_png is False the PNG at result["output_png_path"] is not written,
+        so that the caller can export all figures of a message in one batch.
+        """
         if not self.is_initialized:
             raise RuntimeError("Pipeline not initialized. Call initialize() first")
             
@@ -85,8 +95,15 @@ class VisualizationPipeline:
                 result["output_png_path"] = output_png_path
             
             if result["success"]:
-                fig_json = self.visualizer.visualize_by_prompt(prompt, prompt, result["file_path"], output_png_path, conversation_history)
-                print(f"[INFO] Successfully generated visualization")
+                # Known tool outputs get a pre-built chart, the LLM only writes code for ad-hoc data
+                fig_json = await self._render_chart_template(result, output_png_path, export_png)
+                if fig_json is None:
+                    fig_json, result["plot_code"] = await self.visualizer.visualize_by_prompt(
+                        prompt, prompt, result["file_path"], output_png_path, conversation_history, export_png,
+                        source_tool=result.get("tool_name")
+                    )
+                if result["success"]:
+                    print(f"[INFO] Successfully generated visualization")
                 result["fig_json"] = fig_json
             else:
                 print(f"[ERROR] Failed to retrieve data: {result.get('error', 'Unknown error')}")
@@ -101,4 +118,40 @@ class VisualizationPipeline:
             return {
                 "success": False,
                 "error": error_msg
-            }
\ No newline at end of file
+            }
+
+    async def _render_chart_template(self, result: Dict, output_png_path: str, export_png: bool) -> Optional[str]:
+        """
+        Render the chart template of the tool that produced the data.
+        
+        A failed PNG export marks the result as failed, like export_pngs_in_batch.
+        
+        Returns:
+            The figure JSON, or None if there is no template for the tool or the
+            data does not match it
+        """
+        tool_name = result.get("tool_name")
+        if tool_name not in CHART_TEMPLATES or os.getenv("CHART_TEMPLATES_ENABLED", "true").lower() == "false":
+            return None
+        
+        try:
+            df = await asyncio.to_thread(read_result, result["file_path"])
+            fig = await asyncio.to_thread(build_chart, tool_name, df, result.get("tool_args"))
+            if fig is None:
+                print(f"[INFO] Data of {tool_name} does not match its chart template, using the visualizer")
+                return None
+            fig_json = fig.to_json()
+        except Exception as e:
+            print(f"[WARNING] Chart template of {tool_name} failed, using the visualizer: {str(e)}")
+            return None
+        
+        if export_png:
+            export_result = (await get_render_pool().export_pngs([(fig_json, output_png_path)]))[0]
+            if not export_result["success"]:
+                print(f"[ERROR] {export_result['error']}")
+                result["success"] = False
+                result["error"] = export_result["error"]
+        
+        result["chart_template"] = tool_name
+        print(f"[INFO] Rendered chart template of {tool_name}")
+        return fig_json
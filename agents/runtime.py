@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+import dspy
+from dotenv import load_dotenv
+
+from agents.pipelines.visualization_pipeline import VisualizationPipeline
+from agents.pipelines.analysis_pipeline import AnalysisPipeline
+from agents.pipelines.modifier_pipeline import ModifierPipeline
+from agents.modules.router import ActionRouter
+from agents.modules.webhook_monitor import WebhookMonitorAgent
+
+logger = logging.getLogger(__name__)
+
+
+class AgentRuntime:
+    """
+    Long-lived holder for the pipelines, agents and tool schemas used by agents.main.main.
+
+    One runtime is built per MCP server and process, so that every message
+    reuses the same LM configuration, OpenAI clients and MCP tool listings
+    instead of constructing them per request.
+    """
+
+    def __init__(self, mcp_server: str) -> None:
+        self.mcp_server = mcp_server
+        self.analysis_pipeline: Optional[AnalysisPipeline] = None
+        self.visualization_pipeline: Optional[VisualizationPipeline] = None
+        self.modifier_pipeline: Optional[ModifierPipeline] = None
+        self.webhook_agent: Optional[WebhookMonitorAgent] = None
+        self.router = None
+        self.tools_prompt = ""
+        self.is_initialized = False
+
+    async def initialize(self):
+        """Initialize all pipelines and agents once"""
+        if self.is_initialized:
+            return
+
+        print(f"[INFO] Initializing agent runtime for MCP server: {self.mcp_server}")
+
+        analysis_pipeline = AnalysisPipeline()
+        await analysis_pipeline.initialize()
+
+        visualization_pipeline = VisualizationPipeline(self.mcp_server)
+        await visualization_pipeline.initialize()
+
+        modifier_pipeline = ModifierPipeline()
+        await modifier_pipeline.initialize()
+
+        webhook_agent = WebhookMonitorAgent(self.mcp_server)
+        await webhook_agent.initialize_tools()
+
+        self.analysis_pipeline = analysis_pipeline
+        self.visualization_pipeline = visualization_pipeline
+        self.modifier_pipeline = modifier_pipeline
+        self.webhook_agent = webhook_agent
+        self.router = self._build_router()
+
+        # The tool listing only changes with the MCP server, so build the prompt suffix once
+        self.tools_prompt = (
+            "\n\nAvailable MCP tools in RETRIEVE_AND_VISUALIZE_INFORMATION: "
+            + ", ".join([tool.name for tool in visualization_pipeline.retriever.tools])
+            + "\n\nAvailable MCP tools in USE_WEBHOOK: "
+            + ", ".join([tool.name for tool in webhook_agent.tools])
+        )
+
+        self.is_initialized = True
+        print("[INFO] Agent runtime initialization complete")
+
+    @staticmethod
+    def _build_router():
+        """
+        The action router, bound to its own OPENAI_MODEL LM.
+
+        The pipelines configure dspy with MODEL_NAME, so without its own LM the
+        router would use whichever model was configured last.
+        """
+        router = dspy.Predict(ActionRouter)
+        router_model = os.getenv("OPENAI_MODEL")
+        if router_model:
+            router.set_lm(dspy.LM(model=f"openai/{router_model}", api_key=os.getenv("OPENAI_API_KEY")))
+        else:
+            print("[WARNING] OPENAI_MODEL not set, the router uses MODEL_NAME")
+        return router
+
+
+_runtimes: Dict[str, AgentRuntime] = {}
+_runtime_lock = asyncio.Lock()
+
+
+async def get_runtime(mcp_server: Optional[str] = None) -> AgentRuntime:
+    """
+    Get the agent runtime of an MCP server, creating it on first use.
+
+    The retriever and webhook agent are bound to the server's tools, so each
+    server has its own runtime. Without a server, the one selected through
+    /mcp/select is used.
+    """
+    if mcp_server is None:
+        from backend.routes.mcp import current_mcp_server as mcp_server
+
+    runtime = _runtimes.get(mcp_server)
+    if runtime is not None and runtime.is_initialized:
+        return runtime
+
+    async with _runtime_lock:
+        runtime = _runtimes.get(mcp_server)
+        if runtime is None or not runtime.is_initialized:
+            load_dotenv()
+            runtime = AgentRuntime(mcp_server)
+            await runtime.initialize()
+            _runtimes[mcp_server] = runtime
+        return runtime
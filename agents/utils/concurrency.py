@@ -0,0 +1,49 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+
+def get_env_int(name: str, default: int, minimum: int = 1) -> int:
+    """Read an integer setting from the environment, clamped to `minimum`"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return max(minimum, int(value))
+    except ValueError:
+        return default
+
+
+def get_env_float(name: str, default: Optional[float] = None) -> Optional[float]:
+    """Read a float setting from the environment, returning the default when unset or invalid"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+async def gather_bounded(
+    items: Iterable[Any],
+    worker: Callable[[Any], Awaitable[Any]],
+    limit: int,
+    timeout: Optional[float] = None,
+) -> List[Any]:
+    """
+    Run worker(item) for every item with at most `limit` running at the same time.
+
+    Results are returned in the same order as the items. A worker that raises or
+    exceeds `timeout` seconds does not cancel the others; its exception is placed
+    in the result list instead, the same way asyncio.gather(return_exceptions=True) does.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _run(item):
+        async with semaphore:
+            if timeout:
+                return await asyncio.wait_for(worker(item), timeout=timeout)
+            return await worker(item)
+
+    return await asyncio.gather(*[_run(item) for item in items], return_exceptions=True)
@@ -0,0 +1,41 @@
+import os
+from typing import Dict, List, Optional
+
+from agents.utils.concurrency import get_env_int
+from agents.utils.openai_client import get_async_openai_client
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a blockchain data assistant.
+Update the summary with the new messages. Keep the facts later requests may refer to: blockchains, networks,
+addresses, contracts, tokens, time ranges, the charts that were created and the conclusions that were drawn.
+Drop greetings and repetitions. Answer with the updated summary only."""
+
+
+async def summarize_conversation(previous_summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+    """
+    Fold messages into the rolling summary of a conversation.
+
+    Settings:
+        HISTORY_SUMMARY_MODEL: model used for summaries (default: MODEL_NAME)
+        HISTORY_SUMMARY_MAX_TOKENS: maximum length of the summary (default: 500)
+        HISTORY_MESSAGE_MAX_CHARS: characters of a message sent to the summarizer (default: 4000)
+
+    Args:
+        previous_summary: The current summary, None for the first one
+        messages: Messages to fold in, oldest first, with "role" and "content"
+
+    Returns:
+        The updated summary
+    """
+    max_chars = get_env_int("HISTORY_MESSAGE_MAX_CHARS", 4000)
+    transcript = "\n".join(f"{msg['role']}: {msg['content'][:max_chars]}" for msg in messages)
+
+    response = await get_async_openai_client().chat.completions.create(
+        model=os.getenv("HISTORY_SUMMARY_MODEL") or os.getenv("MODEL_NAME"),
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"},
+        ],
+        max_tokens=get_env_int("HISTORY_SUMMARY_MAX_TOKENS", 500),
+        temperature=0,
+    )
+    return response.choices[0].message.content.strip()
@@ -1,4 +1,5 @@
 import decimal
+import re
 from decimal import Decimal
 
 
@@ -46,4 +47,193 @@ def format_obj(obj):
             # If conversion fails, return original string
             return obj
     # Return all other types as is
-    return obj
\ No newline at end of file
+    return obj
+
+
+# Batched normalization
+#
+# format_obj/flatten_json above convert one leaf at a time and rely on
+# exceptions to detect strings that are not numbers. normalize_records below
+# flattens every record in a single pass into columns, infers the type of each
+# column once with regular expressions and converts the whole column at a time.
+
+INT_PATTERN = re.compile(r"[+-]?\d+")
+DECIMAL_PATTERN = re.compile(r"[+-]?\d*\.\d+")
+SCIENTIFIC_PATTERN = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)[eE][+-]?\d+")
+
+# Strings that stand for a missing value in a number column, compared lowercased
+MISSING_VALUE_STRINGS = {"", "-", "n/a", "na", "nan", "none", "null"}
+
+
+def _flatten_into(record, columns, row_count, parent_key="", sep="."):
+    for key, value in record.items():
+        name = f"{parent_key}{sep}{key}" if parent_key else key
+        if isinstance(value, dict):
+            _flatten_into(value, columns, row_count, name, sep)
+            continue
+        column = columns.get(name)
+        if column is None:
+            # Columns first seen in a later row are back-filled with None
+            column = columns[name] = [None] * row_count
+        column.append(value)
+
+
+def flatten_records(records, sep="."):
+    """
+    Flatten a list of nested records into columns in one pass.
+
+    Returns:
+        Dictionary of dot-notation column name to list of values, one per record.
+        Keys missing in a record are None.
+    """
+    columns = {}
+    for row, record in enumerate(records):
+        if not isinstance(record, dict):
+            record = {"value": record}
+        _flatten_into(record, columns, row, sep=sep)
+        # Pad columns that this record did not have
+        for column in columns.values():
+            if len(column) == row:
+                column.append(None)
+    return columns
+
+
+def _scientific_to_number(value):
+    decimal_val = Decimal(value)
+    if decimal_val.as_tuple().exponent >= 0:
+        return int(decimal_val)
+    return float(decimal_val)
+
+
+def _is_missing(value):
+    return isinstance(value, str) and value.strip().lower() in MISSING_VALUE_STRINGS
+
+
+def _infer_column_kind(values):
+    """
+    Infer how the number strings of a column are converted: "int", "float",
+    "number" (scientific notation) or None when the strings are kept.
+    Missing value strings such as "" or "N/A" are ignored.
+    """
+    strings = [value for value in values if isinstance(value, str) and not _is_missing(value)]
+    if not strings:
+        return None
+    if all(map(INT_PATTERN.fullmatch, strings)):
+        return "int"
+    if all(INT_PATTERN.fullmatch(value) or DECIMAL_PATTERN.fullmatch(value) for value in strings):
+        return "float"
+    if all(
+        INT_PATTERN.fullmatch(value) or DECIMAL_PATTERN.fullmatch(value) or SCIENTIFIC_PATTERN.fullmatch(value)
+        for value in strings
+    ):
+        return "number"
+    return None
+
+
+def _convert_column(values, kind):
+    # Missing value strings become None, so the column stays numeric
+    values = [None if _is_missing(value) else value for value in values]
+    if kind == "int":
+        # int() is exact for arbitrarily large values, e.g. uint256 token amounts
+        return [int(value) if isinstance(value, str) else value for value in values]
+    if kind == "float":
+        return [
+            (int(value) if INT_PATTERN.fullmatch(value) else float(value)) if isinstance(value, str) else value
+            for value in values
+        ]
+    return [_scientific_to_number(value) if isinstance(value, str) else value for value in values]
+
+
+def normalize_records(result, sep="."):
+    """
+    Normalize a tool result into typed columns.
+
+    Number strings are converted like format_obj, but per column: a column is
+    converted only when all of its strings are numbers, otherwise it keeps its
+    strings, so a column never mixes numbers and strings. Missing value strings
+    ("", "N/A", "null", ...) do not prevent the conversion and become None.
+    Integers keep their exact value however large they are.
+
+    Args:
+        result: A list of records, a single record (e.g. Zircuit responses) or a
+            cursor page with its records under "items"
+        sep: Separator of the flattened column names
+
+    Returns:
+        Dictionary of column name to list of values
+    """
+    if result is None:
+        return {}
+    if isinstance(result, dict):
+        items = result.get("items")
+        result = items if isinstance(items, list) else [result]
+
+    columns = flatten_records(result, sep=sep)
+    for name, values in columns.items():
+        kind = _infer_column_kind(values)
+        if kind is not None:
+            columns[name] = _convert_column(values, kind)
+        elif any(isinstance(value, list) for value in values):
+            # Lists are kept as values, format their content like format_obj does
+            columns[name] = [format_obj(value) if isinstance(value, list) else value for value in values]
+    return columns
+
+
+def columns_to_records(columns):
+    """Turn a mapping of column name to values back into a list of flat records"""
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+# Benchmark against format_obj/flatten_json
+if __name__ == "__main__":
+    import random
+    import time
+
+    def make_transfer(i):
+        return {
+            "from": f"0x{random.getrandbits(160):040x}",
+            "to": f"0x{random.getrandbits(160):040x}",
+            "value": str(random.getrandbits(96)),
+            "timestamp": f"2025-04-{1 + i % 28:02d}T12:00:00.000Z",
+            "blockNumber": 22000000 + i,
+            "transactionHash": f"0x{random.getrandbits(256):064x}",
+            "logIndex": i % 300,
+            "contract": {
+                "address": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",
+                "name": "USD Coin",
+                "symbol": "USDC",
+                "decimals": 6,
+                "totalSupply": "45000000000000000000000000000000",
+                "type": "ERC20",
+                "deployedAt": "2018-08-03T19:28:24.000Z",
+            },
+        }
+
+    random.seed(0)
+    transfers = [make_transfer(i) for i in range(10000)]
+
+    def run_legacy():
+        return [flatten_json(format_obj(item)) for item in transfers]
+
+    def run_batched():
+        return normalize_records(transfers)
+
+    def best_of(fn, repeat=5):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    legacy_rows = run_legacy()
+    batched_rows = columns_to_records(run_batched())
+    assert legacy_rows == batched_rows, "normalize_records output differs from format_obj/flatten_json"
+
+    legacy_seconds = best_of(run_legacy)
+    batched_seconds = best_of(run_batched)
+    print(f"[INFO] {len(transfers)} transfers")
+    print(f"[INFO] format_obj + flatten_json: {legacy_seconds * 1000:.1f} ms")
+    print(f"[INFO] normalize_records:         {batched_seconds * 1000:.1f} ms")
+    print(f"[INFO] Speedup: {legacy_seconds / batched_seconds:.1f}x")
@@ -0,0 +1,62 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from agents.utils.concurrency import get_env_int, get_env_float
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session that applies a default (connect, read) timeout to every request"""
+
+    def __init__(self, timeout) -> None:
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(env_prefix: str, retry_post: bool = True) -> requests.Session:
+    """
+    Create a pooled keep-alive HTTP session for an upstream API.
+
+    Settings are read from the environment using the given prefix, e.g. for "NODIT":
+        NODIT_HTTP_POOL_SIZE: connections kept alive per host (default: 10)
+        NODIT_HTTP_CONNECT_TIMEOUT: connect timeout in seconds (default: 5)
+        NODIT_HTTP_READ_TIMEOUT: read timeout in seconds (default: 30)
+        NODIT_HTTP_MAX_RETRIES: retries on connection errors, 429 and 5xx (default: 3)
+        NODIT_HTTP_BACKOFF: exponential backoff factor in seconds (default: 0.5)
+
+    Args:
+        env_prefix: Prefix of the environment settings
+        retry_post: Whether POST requests are retried. Disable it for sessions that
+            create resources, where a retried POST could create duplicates
+    """
+    pool_size = get_env_int(f"{env_prefix}_HTTP_POOL_SIZE", 10)
+    timeout = (
+        get_env_float(f"{env_prefix}_HTTP_CONNECT_TIMEOUT", 5.0),
+        get_env_float(f"{env_prefix}_HTTP_READ_TIMEOUT", 30.0),
+    )
+
+    allowed_methods = set(Retry.DEFAULT_ALLOWED_METHODS)
+    if retry_post:
+        allowed_methods.add("POST")
+
+    retry = Retry(
+        total=get_env_int(f"{env_prefix}_HTTP_MAX_RETRIES", 3, minimum=0),
+        backoff_factor=get_env_float(f"{env_prefix}_HTTP_BACKOFF", 0.5),
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(allowed_methods),
+        respect_retry_after_header=True,
+        # Hand the last response back to the caller so raise_for_status() reports the real error
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = TimeoutSession(timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
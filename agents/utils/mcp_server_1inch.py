@@ -7,6 +7,10 @@ from typing import Dict, List, Optional, Any, Union
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 
+from agents.utils.http_client import create_session
+from agents.utils.tool_cache import cached_tool
+from agents.utils.token_metadata import get_token_metadata_store
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -26,6 +30,9 @@ if not API_KEY:
 BASE_URL = "https://api.1inch.dev/history/v2.0"
 PORTFOLIO_BASE_URL = "https://api.1inch.dev/portfolio/portfolio/v4"
 
+# Shared pooled HTTP session with keep-alive, timeouts and retries
+session = create_session("ONEINCH")
+
 # 创建 MCP 服务器
 mcp = FastMCP("1inch History API")
 
@@ -52,6 +59,7 @@ CHAIN_IDS = {
 #############################
 
 @mcp.tool()
+@cached_tool(ttl=60)
 def get_address_events(
     blockchain: str = "base", 
     address: str = None, 
@@ -120,7 +128,7 @@ def get_address_events(
     
     try:
         # Send request
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         response.raise_for_status()
         result = response.json()
         
@@ -133,6 +141,7 @@ def get_address_events(
 
 
 @mcp.tool()
+@cached_tool(ttl=60)
 def get_portfolio_protocols_value_by_account(blockchain: str = None, addresses: List[str] = None, chain_id: int = None, use_cache: bool = True) -> Dict[str, Any]:
     """
     Get the current asset value in different protocols for specified wallet addresses.
@@ -174,7 +183,7 @@ def get_portfolio_protocols_value_by_account(blockchain: str = None, addresses:
     
     try:
         # Send request
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         
         # Check for HTTP errors
         if response.status_code == 422:
@@ -195,6 +204,7 @@ def get_portfolio_protocols_value_by_account(blockchain: str = None, addresses:
 
 
 @mcp.tool()
+@cached_tool(ttl=300)
 def get_portfolio_protocol_profit_and_loss_by_account(
     blockchain: str = None, 
     addresses: List[str] = None, 
@@ -252,7 +262,7 @@ def get_portfolio_protocol_profit_and_loss_by_account(
     
     try:
         # Send request
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         
         # Check for HTTP errors
         if response.status_code == 422:
@@ -273,6 +283,7 @@ def get_portfolio_protocol_profit_and_loss_by_account(
 
 
 @mcp.tool()
+@cached_tool(ttl=300)
 def get_portfolio_token_profit_and_loss_by_account(
     blockchain: str = None, 
     addresses: List[str] = None, 
@@ -330,7 +341,7 @@ def get_portfolio_token_profit_and_loss_by_account(
     
     try:
         # Send request
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         
         # Check for HTTP errors
         if response.status_code == 422:
@@ -351,6 +362,7 @@ def get_portfolio_token_profit_and_loss_by_account(
 
 
 @mcp.tool()
+@cached_tool(ttl=60)
 def get_general_current_value_by_address(
     blockchain: str = None, 
     addresses: List[str] = None, 
@@ -397,7 +409,7 @@ def get_general_current_value_by_address(
     
     try:
         # Send request
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         
         # Check for HTTP errors
         if response.status_code == 422:
@@ -418,6 +430,7 @@ def get_general_current_value_by_address(
 
 
 @mcp.tool()
+@cached_tool(ttl=300)
 def get_general_profit_and_loss_by_address(
     blockchain: str = None, 
     addresses: List[str] = None, 
@@ -475,7 +488,7 @@ def get_general_profit_and_loss_by_address(
     
     try:
         # Send request
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         
         # Check for HTTP errors
         if response.status_code == 422:
@@ -496,6 +509,7 @@ def get_general_profit_and_loss_by_address(
 
 
 @mcp.tool()
+@cached_tool(ttl=600)
 def get_general_value_chart_by_address(
     blockchain: str = None, 
     addresses: List[str] = None, 
@@ -553,7 +567,7 @@ def get_general_value_chart_by_address(
     
     try:
         # Send request
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         
         # Check for HTTP errors
         if response.status_code == 422:
@@ -574,6 +588,7 @@ def get_general_value_chart_by_address(
 
 
 @mcp.tool()
+@cached_tool(ttl=60)
 def get_token_price_history(
     token0_address: str = None,
     token1_address: str = None,
@@ -642,11 +657,22 @@ def get_token_price_history(
     }
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         response.raise_for_status()
         result = response.json()
         
-        # Return the data directly
+        # Label the pair with the token symbols already in the token metadata store,
+        # without a metadata request on the path of the tool
+        chain = next((name for name, value in CHAIN_IDS.items() if value == str(chain_id)), None)
+        if chain and isinstance(result, list):
+            metadata = get_token_metadata_store().get_many(chain, [token0_address, token1_address], required=("symbol",), fetch=False)
+            token0_symbol = metadata.get(token0_address.lower(), {}).get("symbol")
+            token1_symbol = metadata.get(token1_address.lower(), {}).get("symbol")
+            for point in result:
+                if isinstance(point, dict):
+                    point["token0_symbol"] = token0_symbol
+                    point["token1_symbol"] = token1_symbol
+        
         return result
     except requests.exceptions.RequestException as e:
         logger.error(f"API request failed: {str(e)}")
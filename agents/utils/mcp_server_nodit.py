@@ -8,6 +8,12 @@ from typing import Dict, List, Optional, Any, Union
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 
+from agents.utils.http_client import create_session
+from agents.utils.pagination import stream_cursor_pages
+from agents.utils.tool_cache import cached_tool
+from agents.utils.token_metadata import chain_key, get_token_metadata_store
+from agents.utils.token_units import scale_amounts
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -26,6 +32,11 @@ if not API_KEY:
 # Base URL for Nodit.io API
 BASE_URL = "https://web3.nodit.io/v1"
 
+# Shared pooled HTTP session with keep-alive, timeouts and retries
+session = create_session("NODIT")
+# Creating a webhook is not idempotent, so its POST is never retried
+webhook_create_session = create_session("NODIT", retry_post=False)
+
 # Create an MCP server
 mcp = FastMCP("Nodit.io Web3 API")
 
@@ -35,13 +46,72 @@ NETWORKS = ["mainnet", "sepolia"]
 # Define supported blockchains
 BLOCKCHAINS = ["ethereum", "arbitrum", "optimism", "base", "polygon", "avalanche"]
 
+# Upper bound of rows a single tool call may page through
+MAX_PAGINATED_ROWS = int(os.getenv("NODIT_MAX_PAGINATED_ROWS", "10000"))
+
+
+def _stream_items(url: str, headers: Dict[str, str], data: Dict[str, Any], rpp: int, cursor: str = None, max_rows: int = None, max_seconds: float = None):
+    """
+    Stream the pages of a cursor-paginated Nodit endpoint.
+    
+    Without max_rows only one page of rpp items is fetched, as the API does. With
+    max_rows pages of up to 100 items are streamed, prefetching the next page while
+    the current one is processed, until max_rows items, max_seconds or the last
+    page. Whole pages are returned, so the cursor resumes after the last item.
+    
+    Yields:
+        (items, next_cursor) for every page
+    """
+    if max_rows:
+        max_rows = min(max_rows, MAX_PAGINATED_ROWS)
+        rpp = min(max_rows, 100)  # API limit, fewest round-trips
+        max_pages = None
+    else:
+        max_pages = 1
+
+    def fetch_page(page_cursor):
+        payload = dict(data, rpp=rpp)
+        if page_cursor:
+            payload["cursor"] = page_cursor
+        response = session.post(url, json=payload, headers=headers)
+        response.raise_for_status()
+        return response.json()
+
+    return stream_cursor_pages(fetch_page, cursor=cursor, max_rows=max_rows, max_pages=max_pages, max_seconds=max_seconds)
+
+
+def fetch_token_metadata(chain: str, contract_addresses: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch the metadata of several token contracts with one request per 100 contracts"""
+    blockchain, _, network = chain.partition("-")
+    network = network or "mainnet"
+    if blockchain not in BLOCKCHAINS or network not in NETWORKS:
+        return {}
+    
+    url = f"{BASE_URL}/{blockchain}/{network}/token/getTokenContractMetadataByContracts"
+    headers = {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "X-API-KEY": API_KEY
+    }
+    
+    metadata = {}
+    for start in range(0, len(contract_addresses), 100):
+        response = session.post(url, json={"contractAddresses": contract_addresses[start:start + 100]}, headers=headers)
+        response.raise_for_status()
+        for contract in response.json():
+            if contract and contract.get("address"):
+                metadata[contract["address"].lower()] = contract
+    return metadata
+
+
 #############################
 # TOOLS
 #############################
 
 
 @mcp.tool()
-def get_tokens_owned_by_account(blockchain: str = "arbitrum", network: str = "mainnet", account_address: str = None, rpp: int = 20, cursor: str = None) -> List[Dict[str, Any]]:
+@cached_tool(ttl=60)
+def get_tokens_owned_by_account(blockchain: str = "arbitrum", network: str = "mainnet", account_address: str = None, rpp: int = 20, cursor: str = None, max_rows: int = None, max_seconds: float = None) -> List[Dict[str, Any]]:
     """
     Get the list of ERC20 tokens owned by a specific account address.
     
@@ -51,6 +121,8 @@ def get_tokens_owned_by_account(blockchain: str = "arbitrum", network: str = "ma
         account_address: The address of the account to check the token holdings for
         rpp: The number of results per page (default: 20, max: 100)
         cursor: The cursor for pagination (default: None)
+        max_rows: Automatically fetch following pages until this many rows are collected (default: None, only one page of rpp rows)
+        max_seconds: Stop fetching following pages after this many seconds (default: None, no time limit)
         
     Returns:
         List of token ownership details
@@ -76,55 +148,15 @@ def get_tokens_owned_by_account(blockchain: str = "arbitrum", network: str = "ma
     }
     
     data = {
-        "accountAddress": account_address,
-        "rpp": rpp
+        "accountAddress": account_address
     }
     
-    # Add cursor for pagination if provided
-    if cursor:
-        data["cursor"] = cursor
-    
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        
-        # Get the items array
-        items = result.get("items", [])
-        
-        # Process each item to convert balance based on decimals
-        for item in items:
-            if "balance" in item and "contract" in item and "decimals" in item["contract"]:
-                try:
-                    # Convert the raw balance using the token's decimals
-                    decimals = int(item["contract"]["decimals"])
-                    raw_balance = item["balance"]
-                    
-                    # Only process if both values are valid
-                    if decimals > 0 and raw_balance:
-                        # Convert the raw balance to a human-readable format
-                        converted_balance = float(raw_balance) / (10 ** decimals)
-                        
-                        # Add the converted balance as a new field
-                        item["converted_balance"] = converted_balance
-                        
-                        # Replace the original balance with the converted balance
-                        item["balance"] = converted_balance
-                        
-                    # Also convert totalSupply if present in the contract data
-                    if "totalSupply" in item["contract"] and item["contract"]["totalSupply"]:
-                        try:
-                            raw_supply = item["contract"]["totalSupply"]
-                            # Convert the raw supply to a human-readable format
-                            converted_supply = float(raw_supply) / (10 ** decimals)
-                            # Replace the original supply with the converted supply
-                            item["contract"]["totalSupply"] = converted_supply
-                        except (ValueError, TypeError):
-                            # If conversion fails, keep the original supply
-                            pass
-                except (ValueError, TypeError):
-                    # If conversion fails, keep the original balance
-                    pass
+        items = []
+        for page_items, _ in _stream_items(url, headers, data, rpp, cursor, max_rows, max_seconds):
+            # Scale balances by the token decimals while the next page is being fetched
+            scale_amounts(page_items, ["balance"], chain_key(blockchain, network))
+            items.extend(page_items)
         
         # Return just the items array
         return items
@@ -135,7 +167,8 @@ def get_tokens_owned_by_account(blockchain: str = "arbitrum", network: str = "ma
 
 
 @mcp.tool()
-def get_token_holders_by_contract(blockchain: str = "arbitrum", network: str = "mainnet", contract_address: str = None, rpp: int = 20, cursor: str = None) -> Dict[str, Any]:
+@cached_tool(ttl=300)
+def get_token_holders_by_contract(blockchain: str = "arbitrum", network: str = "mainnet", contract_address: str = None, rpp: int = 20, cursor: str = None, max_rows: int = None, max_seconds: float = None) -> Dict[str, Any]:
     """
     Get the list of token holders for a specific ERC20 token contract.
     
@@ -145,6 +178,8 @@ def get_token_holders_by_contract(blockchain: str = "arbitrum", network: str = "
         contract_address: The contract address of the ERC20 token
         rpp: The number of results per page (default: 20, max: 100)
         cursor: The cursor for pagination (default: None)
+        max_rows: Automatically fetch following pages until this many rows are collected (default: None, only one page of rpp rows)
+        max_seconds: Stop fetching following pages after this many seconds (default: None, no time limit)
         
     Returns:
         Dictionary containing rpp, cursor, and items with token holder details
@@ -170,24 +205,22 @@ def get_token_holders_by_contract(blockchain: str = "arbitrum", network: str = "
     }
     
     data = {
-        "contractAddress": contract_address,
-        "rpp": rpp
+        "contractAddress": contract_address
     }
     
-    # Add cursor for pagination if provided
-    if cursor:
-        data["cursor"] = cursor
-    
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        
-        # Return the response in the expected format
+        items = []
+        next_cursor = None
+        for page_items, next_cursor in _stream_items(url, headers, data, rpp, cursor, max_rows, max_seconds):
+            # Scale balances by the token decimals while the next page is being fetched
+            scale_amounts(page_items, ["balance"], chain_key(blockchain, network), contract_address=contract_address)
+            items.extend(page_items)
+        
+        # Return the response in the expected format, cursor continues after the last fetched page
         return {
-            "rpp": result.get("rpp", rpp),
-            "cursor": result.get("cursor", None),
-            "items": result.get("items", [])
+            "rpp": rpp,
+            "cursor": next_cursor,
+            "items": items
         }
     except requests.exceptions.RequestException as e:
         raise Exception(f"API request failed: {str(e)}")
@@ -196,7 +229,8 @@ def get_token_holders_by_contract(blockchain: str = "arbitrum", network: str = "
 
 
 @mcp.tool()
-def get_token_transfers_by_account(blockchain: str = "arbitrum", network: str = "mainnet", account_address: str = None, rpp: int = 20, cursor: str = None, sort: str = "desc") -> List[Dict[str, Any]]:
+@cached_tool(ttl=30)
+def get_token_transfers_by_account(blockchain: str = "arbitrum", network: str = "mainnet", account_address: str = None, rpp: int = 20, cursor: str = None, sort: str = "desc", max_rows: int = None, max_seconds: float = None) -> List[Dict[str, Any]]:
     """
     Get the list of ERC20 token transfers for a specific account (sent or received).
     
@@ -206,6 +240,8 @@ def get_token_transfers_by_account(blockchain: str = "arbitrum", network: str =
         account_address: The address of the account to check the token transfers for
         rpp: The number of results per page (default: 20, max: 100)
         cursor: The cursor for pagination (default: None)
+        max_rows: Automatically fetch following pages until this many rows are collected (default: None, only one page of rpp rows)
+        max_seconds: Stop fetching following pages after this many seconds (default: None, no time limit)
         sort: The sort order for transfers (asc or desc by timestamp, default: desc)
         
     Returns:
@@ -236,55 +272,15 @@ def get_token_transfers_by_account(blockchain: str = "arbitrum", network: str =
     
     data = {
         "accountAddress": account_address,
-        "rpp": rpp,
         "sort": sort
     }
     
-    # Add cursor for pagination if provided
-    if cursor:
-        data["cursor"] = cursor
-    
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        
-        # Get the items array
-        items = result.get("items", [])
-        
-        # Process each item to convert value based on decimals
-        for item in items:
-            if "value" in item and "contract" in item and "decimals" in item["contract"]:
-                try:
-                    # Convert the raw value using the token's decimals
-                    decimals = int(item["contract"]["decimals"])
-                    raw_value = item["value"]
-                    
-                    # Only process if both values are valid
-                    if decimals > 0 and raw_value:
-                        # Convert the raw value to a human-readable format
-                        converted_value = float(raw_value) / (10 ** decimals)
-                        
-                        # Add the converted value as a new field
-                        item["converted_value"] = converted_value
-                        
-                        # Replace the original value with the converted value
-                        item["value"] = converted_value
-                        
-                    # Also convert totalSupply if present in the contract data
-                    if "totalSupply" in item["contract"] and item["contract"]["totalSupply"]:
-                        try:
-                            raw_supply = item["contract"]["totalSupply"]
-                            # Convert the raw supply to a human-readable format
-                            converted_supply = float(raw_supply) / (10 ** decimals)
-                            # Replace the original supply with the converted supply
-                            item["contract"]["totalSupply"] = converted_supply
-                        except (ValueError, TypeError):
-                            # If conversion fails, keep the original supply
-                            pass
-                except (ValueError, TypeError):
-                    # If conversion fails, keep the original value
-                    pass
+        items = []
+        for page_items, _ in _stream_items(url, headers, data, rpp, cursor, max_rows, max_seconds):
+            # Scale values by the token decimals while the next page is being fetched
+            scale_amounts(page_items, ["value"], chain_key(blockchain, network))
+            items.extend(page_items)
         
         # Return just the items array
         return items
@@ -295,7 +291,8 @@ def get_token_transfers_by_account(blockchain: str = "arbitrum", network: str =
 
 
 @mcp.tool()
-def get_token_transfers_by_contract(blockchain: str = "arbitrum", network: str = "mainnet", contract_address: str = None, rpp: int = 20, cursor: str = None, sort: str = "desc") -> List[Dict[str, Any]]:
+@cached_tool(ttl=30)
+def get_token_transfers_by_contract(blockchain: str = "arbitrum", network: str = "mainnet", contract_address: str = None, rpp: int = 20, cursor: str = None, sort: str = "desc", max_rows: int = None, max_seconds: float = None) -> List[Dict[str, Any]]:
     """
     Get the list of ERC20 token transfers for a specific token contract.
     
@@ -305,6 +302,8 @@ def get_token_transfers_by_contract(blockchain: str = "arbitrum", network: str =
         contract_address: The contract address of the ERC20 token
         rpp: The number of results per page (default: 20, max: 100)
         cursor: The cursor for pagination (default: None)
+        max_rows: Automatically fetch following pages until this many rows are collected (default: None, only one page of rpp rows)
+        max_seconds: Stop fetching following pages after this many seconds (default: None, no time limit)
         sort: The sort order for transfers (asc or desc by timestamp, default: desc)
         
     Returns:
@@ -335,21 +334,18 @@ def get_token_transfers_by_contract(blockchain: str = "arbitrum", network: str =
     
     data = {
         "contractAddress": contract_address,
-        "rpp": rpp,
         "sort": sort
     }
     
-    # Add cursor for pagination if provided
-    if cursor:
-        data["cursor"] = cursor
-    
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
+        items = []
+        for page_items, _ in _stream_items(url, headers, data, rpp, cursor, max_rows, max_seconds):
+            # Scale values by the token decimals while the next page is being fetched
+            scale_amounts(page_items, ["value"], chain_key(blockchain, network), contract_address=contract_address)
+            items.extend(page_items)
         
         # Return just the items array
-        return result.get("items", [])
+        return items
     except requests.exceptions.RequestException as e:
         raise Exception(f"API request failed: {str(e)}")
     except json.JSONDecodeError:
@@ -357,6 +353,7 @@ def get_token_transfers_by_contract(blockchain: str = "arbitrum", network: str =
 
 
 @mcp.tool()
+@cached_tool(ttl=15)
 def get_token_prices_by_contracts(blockchain: str = "arbitrum", network: str = "mainnet", contract_addresses: List[str] = None) -> Dict[str, Any]:
     """
     Get the prices of multiple ERC20 tokens by their contract addresses.
@@ -397,7 +394,7 @@ def get_token_prices_by_contracts(blockchain: str = "arbitrum", network: str = "
     }
     
     try:
-        response = requests.post(url, json=data, headers=headers)
+        response = session.post(url, json=data, headers=headers)
         response.raise_for_status()
         result = response.json()  # API returns an array directly
         
@@ -410,7 +407,8 @@ def get_token_prices_by_contracts(blockchain: str = "arbitrum", network: str = "
 
 
 @mcp.tool()
-def search_token_contract_by_keyword(blockchain: str = "arbitrum", network: str = "mainnet", keyword: str = None, rpp: int = 20, cursor: str = None) -> Dict[str, Any]:
+@cached_tool(ttl=3600)
+def search_token_contract_by_keyword(blockchain: str = "arbitrum", network: str = "mainnet", keyword: str = None, rpp: int = 20, cursor: str = None, max_rows: int = None, max_seconds: float = None) -> Dict[str, Any]:
     """
     Search for ERC20 token contracts by matching the keyword with token name or symbol.
     
@@ -420,6 +418,8 @@ def search_token_contract_by_keyword(blockchain: str = "arbitrum", network: str
         keyword: The keyword to search for in token names or symbols
         rpp: The number of results per page (default: 20, max: 100)
         cursor: The cursor for pagination (default: None)
+        max_rows: Automatically fetch following pages until this many rows are collected (default: None, only one page of rpp rows)
+        max_seconds: Stop fetching following pages after this many seconds (default: None, no time limit)
         
     Returns:
         List of token contract details
@@ -445,21 +445,18 @@ def search_token_contract_by_keyword(blockchain: str = "arbitrum", network: str
     }
     
     data = {
-        "keyword": keyword,
-        "rpp": rpp
+        "keyword": keyword
     }
     
-    # Add cursor for pagination if provided
-    if cursor:
-        data["cursor"] = cursor
-    
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
+        items = []
+        for page_items, _ in _stream_items(url, headers, data, rpp, cursor, max_rows, max_seconds):
+            # Remember the metadata of the found contracts for later conversions and charts
+            get_token_metadata_store().put_from_contracts(chain_key(blockchain, network), page_items)
+            items.extend(page_items)
         
         # Return just the items array
-        return result.get("items", [])
+        return items
     except requests.exceptions.RequestException as e:
         raise Exception(f"API request failed: {str(e)}")
     except json.JSONDecodeError:
@@ -561,7 +558,7 @@ def create_webhook(
         payload["description"] = description
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = webhook_create_session.post(url, json=payload, headers=headers)
         response.raise_for_status()
         result = response.json()
         
@@ -609,7 +606,7 @@ def get_webhook(
     }
     
     try:
-        response = requests.get(url, headers=headers)
+        response = session.get(url, headers=headers)
         response.raise_for_status()
         result = response.json()
         
@@ -680,7 +677,7 @@ def update_webhook(
         raise ValueError("At least one of description, webhook_url, or condition must be provided")
     
     try:
-        response = requests.patch(url, json=payload, headers=headers)
+        response = session.patch(url, json=payload, headers=headers)
         response.raise_for_status()
         result = response.json()
         
@@ -726,7 +723,7 @@ def delete_webhook(
     }
     
     try:
-        response = requests.delete(url, headers=headers)
+        response = session.delete(url, headers=headers)
         response.raise_for_status()
         
         # Return success message
@@ -784,7 +781,7 @@ def get_webhook_history(
         params["cursor"] = cursor
     
     try:
-        response = requests.get(url, params=params, headers=headers)
+        response = session.get(url, params=params, headers=headers)
         response.raise_for_status()
         result = response.json()
         
@@ -797,6 +794,7 @@ def get_webhook_history(
 
 
 @mcp.tool()
+@cached_tool(ttl=6 * 3600)
 def get_daily_transaction_stats(
     blockchain: str = "ethereum", 
     network: str = "mainnet",
@@ -847,7 +845,7 @@ def get_daily_transaction_stats(
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = session.post(url, json=payload, headers=headers)
         response.raise_for_status()
         result = response.json()
         
@@ -860,6 +858,7 @@ def get_daily_transaction_stats(
 
 
 @mcp.tool()
+@cached_tool(ttl=6 * 3600)
 def get_daily_active_accounts_stats_by_contract(
     blockchain: str = "ethereum", 
     network: str = "mainnet",
@@ -916,7 +915,7 @@ def get_daily_active_accounts_stats_by_contract(
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = session.post(url, json=payload, headers=headers)
         response.raise_for_status()
         result = response.json()
         
@@ -929,6 +928,7 @@ def get_daily_active_accounts_stats_by_contract(
 
 
 @mcp.tool()
+@cached_tool(ttl=6 * 3600)
 def get_daily_active_accounts_stats(
     blockchain: str = "ethereum", 
     network: str = "mainnet",
@@ -979,7 +979,7 @@ def get_daily_active_accounts_stats(
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = session.post(url, json=payload, headers=headers)
         response.raise_for_status()
         result = response.json()
         
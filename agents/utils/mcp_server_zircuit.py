@@ -7,6 +7,9 @@ from typing import Dict, List, Optional, Any, Union
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 
+from agents.utils.http_client import create_session
+from agents.utils.tool_cache import cached_tool
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -20,6 +23,9 @@ mcp = FastMCP("Zircuit API")
 # Base URL for Zircuit API
 BASE_URL = "https://api.mainnet.zircuit.com/v1"
 
+# Shared pooled HTTP session with keep-alive, timeouts and retries
+session = create_session("ZIRCUIT")
+
 # Valid period values for metrics
 VALID_PERIODS = ["30", "90", "180", "365"]
 
@@ -31,6 +37,7 @@ VALID_MONTHS = ["1", "3", "6", "12"]
 #############################
 
 @mcp.tool()
+@cached_tool(ttl=6 * 3600)
 def get_daily_metrics(period: str = "30") -> Dict[str, Any]:
     """
     Get daily metrics for the specified period.
@@ -55,7 +62,7 @@ def get_daily_metrics(period: str = "30") -> Dict[str, Any]:
     }
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         response.raise_for_status()
         result = response.json()
         
@@ -76,6 +83,7 @@ def get_daily_metrics(period: str = "30") -> Dict[str, Any]:
 
 
 @mcp.tool()
+@cached_tool(ttl=3600)
 def get_transaction_count(months: str = "1") -> Dict[str, Any]:
     """
     Get the total number of transactions grouped by day.
@@ -100,7 +108,7 @@ def get_transaction_count(months: str = "1") -> Dict[str, Any]:
     }
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         response.raise_for_status()
         result = response.json()
         
@@ -121,6 +129,7 @@ def get_transaction_count(months: str = "1") -> Dict[str, Any]:
 
 
 @mcp.tool()
+@cached_tool(ttl=300)
 def get_erc20_token_top_holders(token_addr: str, limit: int = 100) -> Dict[str, Any]:
     """
     Get top holders of an ERC-20 token.
@@ -146,7 +155,7 @@ def get_erc20_token_top_holders(token_addr: str, limit: int = 100) -> Dict[str,
         params["limit"] = limit
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         response.raise_for_status()
         result = response.json()
         
@@ -167,6 +176,7 @@ def get_erc20_token_top_holders(token_addr: str, limit: int = 100) -> Dict[str,
 
 
 @mcp.tool()
+@cached_tool(ttl=60)
 def get_internal_transactions_by_address(address: str, limit: int = 10, next: str = None, previous: str = None) -> Dict[str, Any]:
     """
     Get a list of internal transactions by address.
@@ -198,7 +208,7 @@ def get_internal_transactions_by_address(address: str, limit: int = 10, next: st
         params["previous"] = previous
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params)
         response.raise_for_status()
         result = response.json()
         
@@ -0,0 +1,45 @@
+import os
+from typing import Optional
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import httpx
+
+from agents.utils.concurrency import get_env_int, get_env_float
+
+_async_client: Optional[AsyncOpenAI] = None
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Get the process-wide AsyncOpenAI client shared by all agents.
+
+    The client keeps a pooled HTTP connection set so concurrent chats reuse
+    keep-alive connections instead of opening new ones per request. Settings:
+        OPENAI_TIMEOUT: default per-call timeout in seconds (default: 60)
+        OPENAI_MAX_RETRIES: retries on connection errors, 408/409/429 and 5xx (default: 2)
+        OPENAI_MAX_CONNECTIONS: maximum pooled connections (default: 100)
+        OPENAI_MAX_KEEPALIVE_CONNECTIONS: maximum idle keep-alive connections (default: 20)
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL"),
+            timeout=get_env_float("OPENAI_TIMEOUT", 60.0),
+            max_retries=get_env_int("OPENAI_MAX_RETRIES", 2, minimum=0),
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=get_env_int("OPENAI_MAX_CONNECTIONS", 100),
+                    max_keepalive_connections=get_env_int("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20),
+                )
+            ),
+        )
+    return _async_client
+
+
+async def close_async_openai_client():
+    """Close the shared client and its connection pool"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
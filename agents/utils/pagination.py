@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+def stream_cursor_pages(
+    fetch_page: Callable[[Optional[str]], Dict[str, Any]],
+    cursor: Optional[str] = None,
+    max_rows: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+) -> Iterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """
+    Stream the pages of a cursor-paginated API.
+
+    fetch_page(cursor) must return the API response with "items" and the "cursor"
+    of the next page. While the caller processes one page, the next page is
+    already being fetched in a background thread.
+
+    Streaming stops when there is no next cursor, a page is empty, or one of the
+    budgets is reached: `max_rows` items, `max_pages` pages or `max_seconds` seconds
+    since the first request. Pages are never cut, so the last page can take the
+    total past `max_rows`, and its next_cursor resumes right after it.
+
+    Yields:
+        (items, next_cursor) for every page, the last next_cursor can be used to resume
+    """
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    rows = 0
+    pages = 0
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") as executor:
+        future = executor.submit(fetch_page, cursor)
+        while future is not None:
+            page = future.result()
+            items = page.get("items", []) or []
+            next_cursor = page.get("cursor")
+            pages += 1
+
+            rows += len(items)
+
+            has_more = (
+                bool(next_cursor)
+                and bool(items)
+                and (max_rows is None or rows < max_rows)
+                and (max_pages is None or pages < max_pages)
+                and (deadline is None or time.monotonic() < deadline)
+            )
+            # Prefetch the next page before handing this one to the caller
+            future = executor.submit(fetch_page, next_cursor) if has_more else None
+
+            yield items, next_cursor
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+from agents.utils.concurrency import get_env_int
+
+logger = logging.getLogger(__name__)
+
+# Words that do not change what a chart shows. Period words such as "last" stay,
+# generated plot code writes them into titles and labels
+STOPWORDS = {
+    "a", "an", "the", "of", "on", "in", "for", "to", "and", "or", "by", "with", "over", "from",
+    "at", "as", "is", "are", "be", "me", "my", "show", "plot", "chart", "graph", "visualize",
+    "display", "get", "retrieve", "give", "please", "what", "how",
+}
+
+# Addresses, numbers and words
+_TOKEN_PATTERN = re.compile(r"0x[0-9a-f]+|\d+(?:\.\d+)?|[a-z]+")
+
+
+def task_fingerprint(task: str) -> str:
+    """
+    Normalize a task into a fingerprint of what it asks for.
+
+    Filler words are dropped and the remaining words are sorted, so "Daily
+    transactions on Zircuit for 30 days" and "show daily transactions on zircuit
+    over 30 days" match. Addresses, numbers and period words are kept: the plot
+    code hardcodes them in titles and annotations, so "7 days" must not reuse the
+    chart of "30 days".
+    """
+    words = {word for word in _TOKEN_PATTERN.findall(task.lower()) if word not in STOPWORDS}
+    return " ".join(sorted(words))
+
+
+def schema_fingerprint(df: pd.DataFrame) -> str:
+    """Column names and dtypes of a result, in order"""
+    return ",".join(f"{name}:{dtype}" for name, dtype in df.dtypes.items())
+
+
+def make_plot_cache_key(tool_name: str, df: pd.DataFrame, task: str) -> str:
+    """Build the key of plot code from the source tool, the data schema and the task"""
+    canonical = "\0".join([tool_name, schema_fingerprint(df), task_fingerprint(task)])
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PlotCodeCache:
+    """
+    Cache of generated plot code that worked, so repeated queries skip the LLM.
+
+    The first tier is an in-memory LRU, the optional second tier stores JSON files
+    on disk so plot code survives restarts and is shared between workers.
+
+    Settings:
+        PLOT_CACHE_ENABLED: set to "false" to always ask the LLM (default: true)
+        PLOT_CACHE_MAX_ENTRIES: maximum entries in the in-memory LRU (default: 256)
+        PLOT_CACHE_DIR: directory of the on-disk tier, disabled when unset
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, cache_dir: Optional[str] = None, enabled: Optional[bool] = None) -> None:
+        self.enabled = enabled if enabled is not None else os.getenv("PLOT_CACHE_ENABLED", "true").lower() != "false"
+        self.max_entries = max_entries or get_env_int("PLOT_CACHE_MAX_ENTRIES", 256)
+        cache_dir = cache_dir or os.getenv("PLOT_CACHE_DIR")
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = defaultdict(int)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _store_in_memory(self, key: str, plot_code: str):
+        with self._lock:
+            self._entries[key] = plot_code
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            plot_code = self._entries.get(key)
+            if plot_code is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return plot_code
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    plot_code = json.load(f)["plot_code"]
+                self._store_in_memory(key, plot_code)
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                return plot_code
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Failed to read plot cache entry {path}: {str(e)}")
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key: str, plot_code: str, tool_name: str = None, task: str = None):
+        self._store_in_memory(key, plot_code)
+        with self._lock:
+            self._stats["stores"] += 1
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                # Write to a temporary file first so readers never see a partial entry
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, delete=False, suffix=".tmp") as f:
+                    json.dump({"tool": tool_name, "task": task, "plot_code": plot_code}, f, ensure_ascii=False)
+                os.replace(f.name, path)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Failed to write plot cache entry: {str(e)}")
+
+    def invalidate(self, key: str):
+        """Drop plot code that failed on new data"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._stats["invalidations"] += 1
+        if self.cache_dir:
+            self._disk_path(key).unlink(missing_ok=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        hits = stats.get("hits", 0) + stats.get("disk_hits", 0)
+        lookups = hits + stats.get("misses", 0)
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "disk_tier": str(self.cache_dir) if self.cache_dir else None,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            **stats,
+        }
+
+
+_plot_cache: Optional[PlotCodeCache] = None
+_plot_cache_lock = threading.Lock()
+
+
+def get_plot_cache() -> PlotCodeCache:
+    """Get the process-wide plot code cache"""
+    global _plot_cache
+    if _plot_cache is None:
+        with _plot_cache_lock:
+            if _plot_cache is None:
+                _plot_cache = PlotCodeCache()
+    return _plot_cache
@@ -0,0 +1,325 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from agents.utils.concurrency import get_env_int, get_env_float
+from agents.utils.result_store import patch_pandas_json, read_result
+
+
+class RenderQueueFullError(Exception):
+    """Raised when the render queue stays full for longer than the queue timeout"""
+
+
+def _warm_renderer():
+    """Worker initializer, starts kaleido's Chromium once so later exports skip the startup cost"""
+    patch_pandas_json()
+    try:
+        go.Figure().to_image(format="png", width=16, height=16)
+    except Exception as e:
+        print(f"[WARNING] Failed to warm up kaleido renderer: {str(e)}")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def execute_plot_code(plot_code: str, file_path: str, output_png_path: str, export_png: bool = True) -> Dict:
+    """
+    Execute generated plot code, convert the figure to JSON and optionally export it as PNG.
+
+    Runs inside a render worker. The result file is loaded into `df` before the
+    plot code runs. Errors are returned instead of raised so the traceback text
+    survives the trip back from a worker process.
+
+    Returns:
+        Dictionary containing:
+            - success: Boolean indicating success
+            - fig_json: JSON representation of the figure
+            - export_seconds: Time spent in the PNG export, if exported
+            - error: Error message if any
+            - traceback: Formatted traceback if any
+    """
+    namespace = {
+        'pd': pd,
+        'json': json,
+        'go': go,
+        'file_path': file_path
+    }
+    try:
+        namespace['df'] = read_result(file_path)
+        exec(plot_code, namespace)
+
+        if 'fig' not in namespace:
+            raise ValueError("Plot code did not create a 'fig' variable")
+
+        fig = namespace['fig']
+        fig_json = fig.to_json()
+        result = {"success": True, "fig_json": fig_json}
+
+        if export_png:
+            export_started = time.perf_counter()
+            fig.write_image(output_png_path)
+            result["export_seconds"] = time.perf_counter() - export_started
+
+        return result
+    except Exception as e:
+        return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
+
+
+def export_pngs(figures: List[Tuple[str, str]]) -> List[Dict]:
+    """
+    Export a batch of figures to PNG with the worker's warm kaleido renderer.
+
+    Args:
+        figures: List of (fig_json, output_png_path) pairs
+
+    Returns:
+        One dictionary per figure, in order, containing success, output_png_path,
+        export_seconds and error if any
+    """
+    results = []
+    for fig_json, output_png_path in figures:
+        export_started = time.perf_counter()
+        try:
+            pio.from_json(fig_json).write_image(output_png_path)
+            results.append({
+                "success": True,
+                "output_png_path": output_png_path,
+                "export_seconds": time.perf_counter() - export_started
+            })
+        except Exception as e:
+            results.append({
+                "success": False,
+                "output_png_path": output_png_path,
+                "error": f"Failed to export PNG: {str(e)}"
+            })
+    return results
+
+
+class LatencyStats:
+    """Rolling latency samples with percentile summaries"""
+
+    def __init__(self, max_samples: int = 1000) -> None:
+        self._samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total_seconds = 0.0
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+        self.total_seconds += seconds
+
+    def summary(self) -> Dict:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"count": 0}
+
+        def percentile(p: float) -> float:
+            return samples[min(len(samples) - 1, int(round(p * (len(samples) - 1))))]
+
+        return {
+            "count": self.count,
+            "mean_seconds": self.total_seconds / self.count,
+            "p50_seconds": percentile(0.50),
+            "p95_seconds": percentile(0.95),
+            "p99_seconds": percentile(0.99),
+            "max_seconds": samples[-1],
+        }
+
+
+class RenderPool:
+    """
+    Bounded worker pool for CPU-bound plot execution and kaleido PNG export.
+
+    At most `max_workers` renders run at once and at most `max_queue` more wait
+    for a worker. Callers beyond that wait for a free slot (backpressure) and get
+    RenderQueueFullError after `queue_timeout` seconds.
+
+    Settings:
+        RENDER_POOL_MODE: "process" (default) or "thread"
+        RENDER_WORKERS: number of render workers (default: 2)
+        RENDER_QUEUE_SIZE: renders allowed to wait for a worker (default: 16)
+        RENDER_QUEUE_TIMEOUT: seconds to wait for a queue slot (default: 60)
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+    ) -> None:
+        self.mode = mode or os.getenv("RENDER_POOL_MODE", "process")
+        self.max_workers = max_workers or get_env_int("RENDER_WORKERS", 2)
+        self.max_queue = max_queue if max_queue is not None else get_env_int("RENDER_QUEUE_SIZE", 16, minimum=0)
+        self.queue_timeout = queue_timeout or get_env_float("RENDER_QUEUE_TIMEOUT", 60.0)
+
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+
+        # Backpressure metrics
+        self._pending = 0
+        self._waiting = 0
+        self._max_pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait_seconds = 0.0
+
+        # Render latency statistics
+        self._plot_latency = LatencyStats()
+        self._export_latency = LatencyStats()
+        self._batch_latency = LatencyStats()
+        self._batched_figures = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "thread":
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="render",
+                    initializer=_warm_renderer,
+                )
+            else:
+                # Spawn instead of fork, the API process has threads (uvicorn, kaleido) that fork would copy
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_renderer,
+                )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        """Run fn(*args) on a render worker, waiting for a queue slot first"""
+        loop = asyncio.get_running_loop()
+
+        self._waiting += 1
+        wait_started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise RenderQueueFullError(
+                f"Render queue is full ({self._pending} pending), waited {self.queue_timeout}s"
+            )
+        finally:
+            self._waiting -= 1
+            self._total_wait_seconds += time.perf_counter() - wait_started
+
+        self._pending += 1
+        self._submitted += 1
+        self._max_pending = max(self._max_pending, self._pending)
+        try:
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. Chromium crashed), start a fresh pool for the next render
+            self._executor = None
+            raise
+        finally:
+            self._pending -= 1
+            self._slots.release()
+
+    async def execute_plot_code(self, plot_code: str, file_path: str, output_png_path: str, export_png: bool = True) -> Dict:
+        """Execute plot code and optionally export the PNG on a render worker, see execute_plot_code"""
+        started = time.perf_counter()
+        try:
+            result = await self._run(execute_plot_code, plot_code, file_path, output_png_path, export_png)
+        except Exception:
+            self._failed += 1
+            raise
+        if result["success"]:
+            self._completed += 1
+            self._plot_latency.record(time.perf_counter() - started)
+            if "export_seconds" in result:
+                self._export_latency.record(result["export_seconds"])
+        else:
+            self._failed += 1
+        return result
+
+    async def export_pngs(self, figures: List[Tuple[str, str]]) -> List[Dict]:
+        """
+        Export a batch of figures to PNG in a single round-trip to one render worker.
+
+        Args:
+            figures: List of (fig_json, output_png_path) pairs
+
+        Returns:
+            One result dictionary per figure, in order, see export_pngs
+        """
+        if not figures:
+            return []
+
+        started = time.perf_counter()
+        try:
+            results = await self._run(export_pngs, list(figures))
+        except Exception:
+            self._failed += len(figures)
+            raise
+
+        self._batch_latency.record(time.perf_counter() - started)
+        self._batched_figures += len(figures)
+        for result in results:
+            if result["success"]:
+                self._completed += 1
+                self._export_latency.record(result["export_seconds"])
+            else:
+                self._failed += 1
+        return results
+
+    async def warm_up(self):
+        """Start all workers so that their renderers are warm before the first request"""
+        await asyncio.gather(*[self._run(_ping) for _ in range(self.max_workers)], return_exceptions=True)
+
+    def stats(self) -> Dict:
+        """Queue and throughput metrics for monitoring backpressure"""
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "running": min(self._pending, self.max_workers),
+            "queued": max(0, self._pending - self.max_workers),
+            "waiting_for_slot": self._waiting,
+            "max_pending": self._max_pending,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_slot_wait_seconds": self._total_wait_seconds / self._submitted if self._submitted else 0.0,
+            "latency": {
+                "plot": self._plot_latency.summary(),
+                "png_export": self._export_latency.summary(),
+                "batch_round_trip": self._batch_latency.summary(),
+            },
+            "avg_batch_size": (
+                self._batched_figures / self._batch_latency.count if self._batch_latency.count else 0.0
+            ),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_render_pool: Optional[RenderPool] = None
+
+
+def get_render_pool() -> RenderPool:
+    """Get the process-wide render pool"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = RenderPool()
+    return _render_pool
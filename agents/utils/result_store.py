@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RESULT_FILE_SUFFIX = ".parquet"
+
+# Field metadata key describing how a column was encoded
+ENCODING_KEY = b"unisight.encoding"
+# Integers outside the int64 range (e.g. uint256 token amounts) are stored as decimal strings
+BIGINT_ENCODING = b"bigint"
+# Nested lists/dicts and columns with mixed value types are stored as JSON strings
+JSON_ENCODING = b"json"
+
+INT64_MIN = -(2 ** 63)
+INT64_MAX = 2 ** 63 - 1
+
+
+def patch_pandas_json():
+    """Use simplejson in pandas.read_json so that large ints in legacy JSON result files are read exactly"""
+    import simplejson
+    pd.io.json._json.loads = lambda s, *a, **kw: simplejson.loads(s)
+    pd.io.json._json.ujson_loads = lambda s, *a, **kw: simplejson.loads(s)
+
+
+def _infer_field(name: str, values: List[Any]) -> pa.Field:
+    """Infer the Arrow field of one column from its Python values"""
+    kinds = set()
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            kinds.add("bool")
+        elif isinstance(value, int):
+            kinds.add("int" if INT64_MIN <= value <= INT64_MAX else "bigint")
+        elif isinstance(value, float):
+            kinds.add("float")
+        elif isinstance(value, str):
+            kinds.add("str")
+        else:
+            kinds.add("json")
+
+    if not kinds or kinds == {"str"}:
+        return pa.field(name, pa.string())
+    if kinds == {"bool"}:
+        return pa.field(name, pa.bool_())
+    if kinds == {"int"}:
+        return pa.field(name, pa.int64())
+    if kinds <= {"int", "float"}:
+        return pa.field(name, pa.float64())
+    if kinds <= {"int", "bigint"}:
+        return pa.field(name, pa.string(), metadata={ENCODING_KEY: BIGINT_ENCODING})
+    return pa.field(name, pa.string(), metadata={ENCODING_KEY: JSON_ENCODING})
+
+
+def _encode_column(field: pa.Field, values: List[Any]) -> pa.Array:
+    encoding = (field.metadata or {}).get(ENCODING_KEY)
+    if encoding == BIGINT_ENCODING:
+        values = [None if value is None else str(value) for value in values]
+    elif encoding == JSON_ENCODING:
+        values = [None if value is None else json.dumps(value, ensure_ascii=False, default=str) for value in values]
+    return pa.array(values, type=field.type)
+
+
+def columns_to_table(columns: Dict[str, List[Any]]) -> pa.Table:
+    """Build an Arrow table with an explicit schema from a mapping of column name to values"""
+    fields = [_infer_field(name, values) for name, values in columns.items()]
+    arrays = [_encode_column(field, columns[field.name]) for field in fields]
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def write_columns(columns: Dict[str, List[Any]], file_path: Union[str, Path]) -> Path:
+    """
+    Persist retriever results as a Parquet file, in columns from format_utils.normalize_records.
+
+    Args:
+        columns: Mapping of column name to values, all columns have the same length
+        file_path: Output path, should end with RESULT_FILE_SUFFIX
+
+    Returns:
+        The path of the written file
+    """
+    file_path = Path(file_path)
+    pq.write_table(columns_to_table(columns), file_path)
+    return file_path
+
+
+def read_result(file_path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Load a retriever result file into a DataFrame.
+
+    Parquet files are memory-mapped so numeric columns are loaded without copying.
+    Big-integer columns come back as exact Python ints and JSON-encoded columns as
+    Python objects. Legacy JSON result files are still supported.
+    """
+    file_path = Path(file_path)
+    if file_path.suffix == ".json":
+        patch_pandas_json()
+        return pd.read_json(file_path)
+
+    table = pq.read_table(file_path, memory_map=True)
+    df = table.to_pandas()
+    for field in table.schema:
+        encoding = (field.metadata or {}).get(ENCODING_KEY)
+        if encoding == BIGINT_ENCODING:
+            df[field.name] = df[field.name].map(lambda value: None if value is None else int(value)).astype(object)
+        elif encoding == JSON_ENCODING:
+            df[field.name] = df[field.name].map(lambda value: None if value is None else json.loads(value)).astype(object)
+    return df
@@ -0,0 +1,272 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from agents.utils.concurrency import get_env_int
+
+logger = logging.getLogger(__name__)
+
+METADATA_FIELDS = ("decimals", "symbol", "name")
+
+# fetcher(chain, contract_addresses) -> {contract_address: {"decimals": ..., "symbol": ..., "name": ...}}
+MetadataFetcher = Callable[[str, List[str]], Dict[str, Dict[str, Any]]]
+
+
+def chain_key(blockchain: str, network: str = "mainnet") -> str:
+    """Chain name used as key of the metadata store, e.g. "ethereum" or "ethereum-sepolia" """
+    blockchain = blockchain.lower()
+    return blockchain if network == "mainnet" else f"{blockchain}-{network}"
+
+
+def fetch_from_nodit(chain: str, contract_addresses: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Default fetcher, the Nodit token metadata API"""
+    # Imported on use, the Nodit server module imports this one
+    from agents.utils.mcp_server_nodit import fetch_token_metadata
+    return fetch_token_metadata(chain, contract_addresses)
+
+
+def _clean_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    cleaned = {}
+    for field in METADATA_FIELDS:
+        value = metadata.get(field)
+        if value is None or value == "":
+            continue
+        if field == "decimals":
+            try:
+                value = int(value)
+            except (ValueError, TypeError):
+                continue
+        cleaned[field] = value
+    return cleaned
+
+
+class TokenMetadataStore:
+    """
+    Token metadata (decimals, symbol, name) per (chain, contract).
+
+    Lookups go to an in-process LRU first, then to a SQLite file shared by
+    processes and restarts, then to the registered fetcher, in one batch for
+    all contracts still unknown. Token metadata does not change, so entries do
+    not expire. Contracts the fetcher does not know, e.g. native tokens, are
+    not fetched again until TOKEN_METADATA_MISS_TTL has passed.
+
+    Settings:
+        TOKEN_METADATA_CACHE_SIZE: maximum contracts in the in-process LRU (default: 10000)
+        TOKEN_METADATA_DB: path of the SQLite file (default: data/token_metadata.sqlite)
+        TOKEN_METADATA_MISS_TTL: seconds a contract unknown to the fetcher is not fetched again (default: 3600)
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: Optional[int] = None, fetcher: Optional[MetadataFetcher] = None) -> None:
+        self.max_entries = max_entries or get_env_int("TOKEN_METADATA_CACHE_SIZE", 10000)
+        self.db_path = Path(db_path or os.getenv("TOKEN_METADATA_DB", "data/token_metadata.sqlite"))
+        self.miss_ttl = get_env_int("TOKEN_METADATA_MISS_TTL", 3600)
+        self.fetcher = fetcher
+
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        # (chain, address) -> time after which an unknown contract is fetched again
+        self._unknown: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._stats = {"hits": 0, "db_hits": 0, "misses": 0, "unknown_hits": 0, "fetches": 0, "fetch_errors": 0}
+
+    def set_fetcher(self, fetcher: MetadataFetcher):
+        self.fetcher = fetcher
+
+    def _get_db(self) -> sqlite3.Connection:
+        # Called with the lock held
+        if self._db is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS token_metadata ("
+                "chain TEXT NOT NULL, address TEXT NOT NULL, decimals INTEGER, symbol TEXT, name TEXT, "
+                "PRIMARY KEY (chain, address))"
+            )
+            self._db.commit()
+        return self._db
+
+    def _is_unknown(self, key: tuple, now: float) -> bool:
+        # Called with the lock held
+        expires_at = self._unknown.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del self._unknown[key]
+            return False
+        return True
+
+    def _remember_unknown(self, keys: Iterable[tuple]):
+        # Called with the lock held
+        expires_at = time.monotonic() + self.miss_ttl
+        for key in keys:
+            self._unknown[key] = expires_at
+            self._unknown.move_to_end(key)
+        while len(self._unknown) > self.max_entries:
+            self._unknown.popitem(last=False)
+
+    def _remember(self, key: tuple, metadata: Dict[str, Any]):
+        # Called with the lock held
+        entry = self._entries.get(key)
+        self._entries[key] = dict(entry or {}, **metadata)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put_many(self, chain: str, metadata_by_contract: Dict[str, Dict[str, Any]]):
+        """Store the metadata of several contracts, known fields are never overwritten with None"""
+        rows = []
+        with self._lock:
+            for address, metadata in metadata_by_contract.items():
+                if not address:
+                    continue
+                metadata = _clean_metadata(metadata or {})
+                if not metadata:
+                    continue
+                key = (chain, address.lower())
+                if all(self._entries.get(key, {}).get(field) == value for field, value in metadata.items()):
+                    continue
+                self._remember(key, metadata)
+                rows.append((chain, address.lower(), metadata.get("decimals"), metadata.get("symbol"), metadata.get("name")))
+
+            if not rows:
+                return
+            try:
+                db = self._get_db()
+                db.executemany(
+                    "INSERT INTO token_metadata (chain, address, decimals, symbol, name) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(chain, address) DO UPDATE SET "
+                    "decimals = COALESCE(excluded.decimals, decimals), "
+                    "symbol = COALESCE(excluded.symbol, symbol), "
+                    "name = COALESCE(excluded.name, name)",
+                    rows,
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist token metadata: {str(e)}")
+
+    def put_from_contracts(self, chain: str, contracts: Iterable[Dict[str, Any]]):
+        """Store the metadata of Nodit contract objects, e.g. the `contract` field of transfers"""
+        self.put_many(chain, {
+            contract.get("address"): contract
+            for contract in contracts
+            if isinstance(contract, dict) and contract.get("address")
+        })
+
+    def get_many(self, chain: str, contract_addresses: Iterable[str], required: Iterable[str] = ("decimals",), fetch: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the metadata of several contracts.
+
+        Args:
+            chain: Chain key, see chain_key
+            contract_addresses: Contract addresses, in any case
+            required: Fields that must be known, contracts missing one of them are fetched
+            fetch: Whether unknown contracts are fetched with the registered fetcher
+
+        Returns:
+            Dictionary of lowercase contract address to metadata, contracts that
+            are still unknown are left out
+        """
+        required = tuple(required)
+        addresses = {address.lower() for address in contract_addresses if address}
+
+        def is_complete(metadata):
+            return metadata is not None and all(metadata.get(field) is not None for field in required)
+
+        found = {}
+        with self._lock:
+            for address in addresses:
+                metadata = self._entries.get((chain, address))
+                if is_complete(metadata):
+                    self._entries.move_to_end((chain, address))
+                    found[address] = dict(metadata)
+            self._stats["hits"] += len(found)
+
+            missing = [address for address in addresses if address not in found]
+            if missing:
+                try:
+                    db = self._get_db()
+                    placeholders = ",".join("?" * len(missing))
+                    rows = db.execute(
+                        f"SELECT address, decimals, symbol, name FROM token_metadata WHERE chain = ? AND address IN ({placeholders})",
+                        [chain, *missing],
+                    ).fetchall()
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to read token metadata: {str(e)}")
+                    rows = []
+                for address, decimals, symbol, name in rows:
+                    metadata = _clean_metadata({"decimals": decimals, "symbol": symbol, "name": name})
+                    self._remember((chain, address), metadata)
+                    if is_complete(metadata):
+                        found[address] = metadata
+                        self._stats["db_hits"] += 1
+                missing = [address for address in missing if address not in found]
+                self._stats["misses"] += len(missing)
+
+            if missing and fetch:
+                # Skip the contracts the fetcher did not know recently
+                now = time.monotonic()
+                to_fetch = [address for address in missing if not self._is_unknown((chain, address), now)]
+                self._stats["unknown_hits"] += len(missing) - len(to_fetch)
+                missing = to_fetch
+
+        if missing and fetch and self.fetcher is not None:
+            with self._lock:
+                self._stats["fetches"] += 1
+            try:
+                fetched = self.fetcher(chain, missing) or {}
+            except Exception as e:
+                # Not remembered as unknown, the next lookup tries again
+                with self._lock:
+                    self._stats["fetch_errors"] += 1
+                logger.warning(f"Failed to fetch token metadata on {chain}: {str(e)}")
+                return found
+            self.put_many(chain, fetched)
+            for address, metadata in fetched.items():
+                metadata = _clean_metadata(metadata or {})
+                if is_complete(metadata):
+                    found[address.lower()] = metadata
+            with self._lock:
+                self._remember_unknown((chain, address) for address in missing if address not in found)
+        return found
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+            unknown_entries = len(self._unknown)
+        lookups = stats["hits"] + stats["db_hits"] + stats["misses"]
+        return {
+            "entries": entries,
+            "unknown_entries": unknown_entries,
+            "max_entries": self.max_entries,
+            "db_path": str(self.db_path),
+            "hit_ratio": (stats["hits"] + stats["db_hits"]) / lookups if lookups else 0.0,
+            **stats,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_metadata_store: Optional[TokenMetadataStore] = None
+_metadata_store_lock = threading.Lock()
+
+
+def get_token_metadata_store() -> TokenMetadataStore:
+    """Get the process-wide token metadata store"""
+    global _metadata_store
+    if _metadata_store is None:
+        with _metadata_store_lock:
+            if _metadata_store is None:
+                # Contracts missing from the store are looked up on Nodit, whichever MCP server is used
+                _metadata_store = TokenMetadataStore(fetcher=fetch_from_nodit)
+    return _metadata_store
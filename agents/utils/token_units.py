@@ -0,0 +1,84 @@
+import decimal
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from agents.utils.token_metadata import TokenMetadataStore, get_token_metadata_store
+
+# Enough precision to scale any uint256 amount without rounding
+_CONTEXT = decimal.Context(prec=100)
+
+
+def scale_amount(raw_amount: Any, decimals: int) -> Optional[float]:
+    """
+    Scale a raw integer token amount by the token's decimals.
+
+    The division is exact, the result is rounded once when converted to float,
+    instead of rounding the raw amount to float first and then dividing.
+
+    Returns:
+        The scaled amount, or None if the raw amount is not a number
+    """
+    if raw_amount is None or raw_amount == "":
+        return None
+    try:
+        return float(Decimal(str(raw_amount)).scaleb(-int(decimals), _CONTEXT))
+    except (decimal.InvalidOperation, ValueError, TypeError):
+        return None
+
+
+def scale_amounts(
+    items: List[Dict[str, Any]],
+    fields: Iterable[str],
+    chain: str,
+    contract_address: Optional[str] = None,
+    store: Optional[TokenMetadataStore] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Add scaled amounts to token records in place.
+
+    For every raw amount `field` a `converted_{field}` value is added, and
+    `contract.converted_totalSupply` when the record has a contract totalSupply.
+    The raw values are kept unchanged. Records are grouped by contract so the
+    decimals are resolved once per contract: the record's `contract` fields are
+    added to the token metadata store, which then answers from its LRU, its
+    SQLite file or one batched fetch for all contracts still unknown.
+
+    Args:
+        items: Token records, e.g. balances, transfers or holders
+        fields: Names of the raw amount fields
+        chain: Chain key of the records, see token_metadata.chain_key
+        contract_address: Contract of records without a `contract` object, e.g. holders
+        store: Token metadata store (default: the process-wide store)
+
+    Returns:
+        The same items
+    """
+    store = store or get_token_metadata_store()
+    fields = list(fields)
+
+    groups = defaultdict(list)
+    contracts = {}
+    for item in items:
+        contract = item.get("contract") if isinstance(item.get("contract"), dict) else {}
+        address = (contract.get("address") or contract_address or "").lower()
+        if not address:
+            continue
+        if contract:
+            contracts[address] = contract
+        groups[address].append(item)
+
+    store.put_many(chain, contracts)
+    metadata_by_contract = store.get_many(chain, groups.keys())
+    for address, group in groups.items():
+        decimals = metadata_by_contract.get(address, {}).get("decimals")
+        if decimals is None:
+            continue
+        for item in group:
+            for field in fields:
+                if field in item:
+                    item[f"converted_{field}"] = scale_amount(item[field], decimals)
+            contract = item.get("contract")
+            if isinstance(contract, dict) and contract.get("totalSupply"):
+                contract["converted_totalSupply"] = scale_amount(contract["totalSupply"], decimals)
+    return items
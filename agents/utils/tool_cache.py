@@ -0,0 +1,212 @@
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from agents.utils.concurrency import get_env_int, get_env_float
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_value(value: Any) -> Any:
+    """Normalize tool arguments so that equivalent calls produce the same cache key"""
+    if isinstance(value, str):
+        value = value.strip()
+        # Addresses and hashes are case-insensitive hex
+        if value.startswith("0x") or value.startswith("0X"):
+            return value.lower()
+        return value
+    if isinstance(value, dict):
+        return {str(k): _normalize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(v) for v in value]
+    return value
+
+
+def make_cache_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+    """Build a content-addressed key from the tool name and its normalized arguments"""
+    canonical = json.dumps(_normalize_value(arguments), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{tool_name}\0{canonical}".encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """
+    Two-tier cache for MCP tool results.
+
+    The first tier is an in-memory LRU, the optional second tier stores JSON files
+    on disk so results survive restarts and are shared between workers.
+
+    Settings:
+        TOOL_CACHE_ENABLED: set to "false" to bypass the cache (default: true)
+        TOOL_CACHE_MAX_ENTRIES: maximum entries in the in-memory LRU (default: 512)
+        TOOL_CACHE_DIR: directory of the on-disk tier, disabled when unset
+        TOOL_CACHE_TTL_<TOOL_NAME>: override the TTL in seconds of one tool
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, cache_dir: Optional[str] = None, enabled: Optional[bool] = None) -> None:
+        self.enabled = enabled if enabled is not None else os.getenv("TOOL_CACHE_ENABLED", "true").lower() != "false"
+        self.max_entries = max_entries or get_env_int("TOOL_CACHE_MAX_ENTRIES", 512)
+        cache_dir = cache_dir or os.getenv("TOOL_CACHE_DIR")
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        )
+
+    def get_ttl(self, tool_name: str, default_ttl: float) -> float:
+        return get_env_float(f"TOOL_CACHE_TTL_{tool_name.upper()}", default_ttl)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, tool_name: str, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value), a hit value is a copy that the caller may modify"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats[tool_name]["hits"] += 1
+                    return True, copy.deepcopy(value)
+                del self._entries[key]
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                if record["expires_at"] > now:
+                    self._store_in_memory(key, record["expires_at"], record["value"])
+                    with self._lock:
+                        self._stats[tool_name]["disk_hits"] += 1
+                    return True, record["value"]
+                path.unlink(missing_ok=True)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Failed to read tool cache entry {path}: {str(e)}")
+
+        with self._lock:
+            self._stats[tool_name]["misses"] += 1
+        return False, None
+
+    def _store_in_memory(self, key: str, expires_at: float, value: Any) -> int:
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires_at, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def set(self, tool_name: str, key: str, value: Any, ttl: float):
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        evicted = self._store_in_memory(key, expires_at, value)
+        with self._lock:
+            self._stats[tool_name]["stores"] += 1
+            self._stats[tool_name]["evictions"] += evicted
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Write to a temporary file first so readers never see a partial entry
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, delete=False, suffix=".tmp") as f:
+                    json.dump({"tool": tool_name, "expires_at": expires_at, "value": value}, f, ensure_ascii=False)
+                os.replace(f.name, path)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Failed to write tool cache entry for {tool_name}: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters per tool and in total"""
+        with self._lock:
+            per_tool = {tool_name: dict(counters) for tool_name, counters in self._stats.items()}
+            entries = len(self._entries)
+        totals = defaultdict(int)
+        for counters in per_tool.values():
+            for name, value in counters.items():
+                totals[name] += value
+        lookups = totals["hits"] + totals["disk_hits"] + totals["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "disk_tier": str(self.cache_dir) if self.cache_dir else None,
+            "hit_ratio": (totals["hits"] + totals["disk_hits"]) / lookups if lookups else 0.0,
+            "totals": dict(totals),
+            "tools": per_tool,
+        }
+
+
+_tool_cache: Optional[ToolResultCache] = None
+_tool_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> ToolResultCache:
+    """Get the process-wide tool result cache"""
+    global _tool_cache
+    if _tool_cache is None:
+        with _tool_cache_lock:
+            if _tool_cache is None:
+                _tool_cache = ToolResultCache()
+    return _tool_cache
+
+
+def cached_tool(ttl: float, name: Optional[str] = None):
+    """
+    Cache the results of a tool function for `ttl` seconds.
+
+    Place it under @mcp.tool() so FastMCP still sees the original signature:
+
+        @mcp.tool()
+        @cached_tool(ttl=60)
+        def get_something(...):
+    """
+    def decorator(func):
+        tool_name = name or func.__name__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_tool_cache()
+            if not cache.enabled:
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = make_cache_key(tool_name, bound.arguments)
+
+            hit, value = cache.get(tool_name, key)
+            if hit:
+                logger.info(f"Tool cache hit: {tool_name}")
+                return value
+
+            result = func(*args, **kwargs)
+            cache.set(tool_name, key, result, cache.get_ttl(tool_name, ttl))
+            return result
+
+        return wrapper
+
+    return decorator
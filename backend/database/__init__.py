@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -12,19 +13,94 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("No DATABASE_URL set in environment")
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+# Async driver URL used by the routes, derived from DATABASE_URL by default
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL.replace(
+    "postgresql+psycopg2://", "postgresql+asyncpg://", 1
+).replace("postgresql://", "postgresql+asyncpg://", 1).replace("postgres://", "postgresql+asyncpg://", 1)
+
+# Connection pool settings, per engine and worker process. The routes use the
+# async engine, the sync engine only serves migrations and background threads
+# (webhook ingestion, SSE catch-up) and gets DB_SYNC_POOL_SIZE. Keep
+# workers * (DB_POOL_SIZE + DB_SYNC_POOL_SIZE + 2 * DB_MAX_OVERFLOW) below the
+# Postgres max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds after which a connection is replaced, before the server or a proxy drops it
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Check connections before use, so a restarted database does not fail requests
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() != "false"
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", "2"))
+
+_pool_settings = dict(
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+# Create the SQLAlchemy engines shared by the whole process
+engine = create_engine(DATABASE_URL, pool_size=DB_SYNC_POOL_SIZE, **_pool_settings)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=DB_POOL_SIZE, **_pool_settings)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay usable after commit, async sessions cannot lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Create Base class
 Base = declarative_base()
 
+# Pool usage counters per engine, reported by /metrics
+_pool_events = {}
+
+def _track_pool(name, sync_engine):
+    counters = _pool_events[name] = {"connects": 0, "checkouts": 0, "invalidated": 0}
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        counters["connects"] += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        counters["invalidated"] += 1
+
+_track_pool("async", async_engine.sync_engine)
+_track_pool("sync", engine)
+
+def _pool_stats(name, pool):
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "open": pool.checkedin() + pool.checkedout(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        **_pool_events[name],
+    }
+
+def get_pool_stats():
+    """Connection usage of this worker process"""
+    return {
+        "pid": os.getpid(),
+        "async": _pool_stats("async", async_engine.sync_engine.pool),
+        "sync": _pool_stats("sync", engine.pool),
+    }
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async database session, for the async routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,148 @@
+"""
+Show the query plans and timings of the hot canvas, message and visualization queries.
+
+Runs EXPLAIN ANALYZE on the queries issued on every page load and chat turn
+against DATABASE_URL and reports whether they use an index. With --seed the
+tables are first filled with synthetic rows, everything runs in one
+transaction that is rolled back, so the database is left unchanged.
+
+    python -m backend.database.benchmark_queries --seed-users 1000 --canvases-per-user 10 --messages-per-canvas 50
+"""
+
+import argparse
+import json
+import time
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from backend.database import SessionLocal
+from backend.database.models import CanvasDB, MessageDB, VisualizationDB
+
+SEED_STATEMENTS = [
+    """
+    INSERT INTO users (wallet_address, created_at)
+    SELECT 'benchmark-' || md5(random()::text || g), now() - (g || ' minutes')::interval
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO canvases (user_id, created_at)
+    SELECT u.user_id, now() - (random() * 365 || ' days')::interval
+    FROM users u, generate_series(1, :canvases_per_user)
+    WHERE u.wallet_address LIKE 'benchmark-%'
+    """,
+    """
+    INSERT INTO messages (canvas_id, user_id, text, created_at)
+    SELECT c.canvas_id, c.user_id, 'benchmark message ' || g, c.created_at + (g || ' minutes')::interval
+    FROM canvases c JOIN users u ON u.user_id = c.user_id, generate_series(1, :messages_per_canvas) g
+    WHERE u.wallet_address LIKE 'benchmark-%'
+    """,
+    """
+    INSERT INTO visualizations (canvas_id, json_data, png_path, file_path, created_at)
+    SELECT c.canvas_id, '{}'::json, '', '', c.created_at + (g || ' minutes')::interval
+    FROM canvases c JOIN users u ON u.user_id = c.user_id, generate_series(1, :visualizations_per_canvas) g
+    WHERE u.wallet_address LIKE 'benchmark-%'
+    """,
+    "ANALYZE users",
+    "ANALYZE canvases",
+    "ANALYZE messages",
+    "ANALYZE visualizations",
+]
+
+
+def _compile(query) -> str:
+    return str(query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def hot_queries(db, canvas_id: int, user_id: int, window: int = 30):
+    """The queries of backend.database.* that run on every page load and chat turn"""
+    return {
+        "messages of a canvas": db.query(MessageDB)
+            .filter(MessageDB.canvas_id == canvas_id)
+            .order_by(MessageDB.created_at.asc()),
+        "history window of a canvas": db.query(MessageDB)
+            .filter(MessageDB.canvas_id == canvas_id)
+            .order_by(MessageDB.message_id.desc())
+            .limit(window),
+        "visualizations of a canvas": db.query(VisualizationDB)
+            .filter(VisualizationDB.canvas_id == canvas_id)
+            .order_by(VisualizationDB.created_at.asc()),
+        "canvases of a user": db.query(CanvasDB)
+            .filter(CanvasDB.user_id == user_id)
+            .order_by(CanvasDB.created_at.asc()),
+    }
+
+
+def _scan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _scan_nodes(child)
+
+
+def explain(db, query) -> dict:
+    rows = db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {_compile(query)}")).scalar()
+    plan = rows[0] if isinstance(rows, list) else json.loads(rows)[0]
+    scans = [
+        f"{node['Node Type']} on {node.get('Relation Name')}" + (f" using {node['Index Name']}" if node.get("Index Name") else "")
+        for node in _scan_nodes(plan["Plan"])
+        if "Scan" in node["Node Type"]
+    ]
+    return {
+        "execution_ms": plan["Execution Time"],
+        "planning_ms": plan["Planning Time"],
+        "scans": scans,
+        "uses_index": all("Seq Scan" not in scan for scan in scans),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed-users", type=int, default=0, help="synthetic users to insert, 0 uses the existing data")
+    parser.add_argument("--canvases-per-user", type=int, default=10)
+    parser.add_argument("--messages-per-canvas", type=int, default=50)
+    parser.add_argument("--visualizations-per-canvas", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.seed_users:
+            started = time.perf_counter()
+            for statement in SEED_STATEMENTS:
+                db.execute(text(statement), {
+                    "users": args.seed_users,
+                    "canvases_per_user": args.canvases_per_user,
+                    "messages_per_canvas": args.messages_per_canvas,
+                    "visualizations_per_canvas": args.visualizations_per_canvas,
+                })
+            print(f"[INFO] Seeded synthetic rows in {time.perf_counter() - started:.1f}s")
+
+        for table in ("users", "canvases", "messages", "visualizations"):
+            print(f"[INFO] {table}: {db.execute(text(f'SELECT count(*) FROM {table}')).scalar()} rows")
+
+        # Benchmark the busiest canvas
+        canvas_id, user_id = db.execute(text(
+            "SELECT c.canvas_id, c.user_id FROM canvases c JOIN messages m ON m.canvas_id = c.canvas_id "
+            "GROUP BY c.canvas_id, c.user_id ORDER BY count(*) DESC LIMIT 1"
+        )).first() or (None, None)
+        if canvas_id is None:
+            print("[ERROR] No messages to benchmark, run with --seed-users")
+            return
+
+        all_indexed = True
+        for name, query in hot_queries(db, canvas_id, user_id).items():
+            result = explain(db, query)
+            all_indexed = all_indexed and result["uses_index"]
+            print(f"\n=== {name} ===")
+            print(f"execution: {result['execution_ms']:.3f} ms, planning: {result['planning_ms']:.3f} ms")
+            for scan in result["scans"]:
+                print(f"  {scan}")
+
+        print(f"\n[INFO] All hot queries use an index: {all_indexed}")
+    finally:
+        # Never keep the synthetic rows
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,47 @@
 from datetime import datetime
 from typing import List
-from sqlalchemy import Column, Integer, String, DateTime, text, ForeignKey
+from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError
 from backend.database.models import CanvasDB
 
 # Database operations for canvas
-def create_canvas(db, user_id: int):
+async def create_canvas(db, user_id: int):
     try:
         new_canvas = CanvasDB(user_id=user_id)
         db.add(new_canvas)
-        db.commit()
-        db.refresh(new_canvas)
+        await db.commit()
+        await db.refresh(new_canvas)
         return new_canvas
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise Exception("Failed to create canvas")
     
-def get_canvas(db, canvas_id: int):
-    return db.query(CanvasDB).filter(CanvasDB.canvas_id == canvas_id).first()
+async def get_canvas(db, canvas_id: int):
+    result = await db.execute(select(CanvasDB).where(CanvasDB.canvas_id == canvas_id))
+    return result.scalars().first()
 
-def get_canvases_for_user(db, user_id: int):
-    return db.query(CanvasDB).filter(CanvasDB.user_id == user_id).all()
\ No newline at end of file
+async def get_canvases_for_user(db, user_id: int):
+    # Creation order, read from the (user_id, created_at) index without a sort
+    result = await db.execute(
+        select(CanvasDB).where(CanvasDB.user_id == user_id).order_by(CanvasDB.created_at.asc())
+    )
+    return result.scalars().all()
+
+async def update_canvas_summary(db, canvas_id: int, history_summary: str, summary_message_id: int, previous_summary_message_id: int = None) -> bool:
+    """
+    Store a new rolling summary of the canvas history.
+
+    The update only applies if the summary was not advanced meanwhile by another
+    worker, returns whether it was applied.
+    """
+    statement = update(CanvasDB).where(CanvasDB.canvas_id == canvas_id)
+    if previous_summary_message_id is None:
+        statement = statement.where(CanvasDB.summary_message_id.is_(None))
+    else:
+        statement = statement.where(CanvasDB.summary_message_id == previous_summary_message_id)
+    result = await db.execute(
+        statement.values(history_summary=history_summary, summary_message_id=summary_message_id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount > 0
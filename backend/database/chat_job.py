@@ -0,0 +1,138 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import delete, select, update, or_
+from backend.database.models import ChatJobDB
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_JOB_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+# Database operations for chat jobs
+async def create_chat_job(db, request: Dict[str, Any]) -> ChatJobDB:
+    job = ChatJobDB(
+        job_id=str(uuid.uuid4()),
+        status=JOB_QUEUED,
+        request=request,
+        attempts=0,
+        created_at=datetime.utcnow()
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def get_chat_job(db, job_id: str) -> Optional[ChatJobDB]:
+    result = await db.execute(select(ChatJobDB).where(ChatJobDB.job_id == job_id))
+    return result.scalars().first()
+
+async def claim_next_chat_job(db, worker_id: str):
+    """
+    Mark the oldest queued job as running for this worker.
+
+    SKIP LOCKED lets several workers claim jobs at the same time without
+    getting the same one. Returns (job_id, request, attempts), or None when
+    the queue is empty.
+    """
+    now = datetime.utcnow()
+    next_job = select(ChatJobDB.job_id)\
+        .where(ChatJobDB.status == JOB_QUEUED)\
+        .order_by(ChatJobDB.created_at.asc())\
+        .limit(1)\
+        .with_for_update(skip_locked=True)\
+        .scalar_subquery()
+    result = await db.execute(
+        update(ChatJobDB)
+        .where(ChatJobDB.job_id == next_job)
+        .values(
+            status=JOB_RUNNING,
+            worker_id=worker_id,
+            attempts=ChatJobDB.attempts + 1,
+            started_at=now,
+            heartbeat_at=now
+        )
+        .returning(ChatJobDB.job_id, ChatJobDB.request, ChatJobDB.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.first()
+    await db.commit()
+    return tuple(row) if row else None
+
+async def update_chat_job_progress(db, job_id: str, progress: str):
+    await db.execute(
+        update(ChatJobDB)
+        .where(ChatJobDB.job_id == job_id)
+        .values(progress=progress, heartbeat_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+async def touch_chat_job(db, job_id: str):
+    """Record that the worker of a running job is alive"""
+    await db.execute(
+        update(ChatJobDB)
+        .where(ChatJobDB.job_id == job_id)
+        .values(heartbeat_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+async def finish_chat_job(db, job_id: str, worker_id: str, result: Dict[str, Any] = None, error: str = None) -> bool:
+    """
+    Store the outcome of a job run by `worker_id`.
+
+    Returns False when the job no longer belongs to the worker, e.g. it was
+    recovered after missed heartbeats and claimed again, and nothing is stored.
+    """
+    finished = await db.execute(
+        update(ChatJobDB)
+        .where(ChatJobDB.job_id == job_id)
+        .where(ChatJobDB.worker_id == worker_id)
+        .where(ChatJobDB.status == JOB_RUNNING)
+        .values(
+            status=JOB_FAILED if error else JOB_SUCCEEDED,
+            progress="done",
+            result=result,
+            error=error,
+            finished_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return finished.rowcount > 0
+
+async def recover_stale_chat_jobs(db, timeout_seconds: float, max_attempts: int) -> int:
+    """
+    Requeue the running jobs whose worker stopped sending heartbeats, or fail
+    them once they used all their attempts. Returns the number of recovered jobs.
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    stale = (ChatJobDB.status == JOB_RUNNING) & or_(ChatJobDB.heartbeat_at.is_(None), ChatJobDB.heartbeat_at < stale_before)
+
+    failed = await db.execute(
+        update(ChatJobDB)
+        .where(stale & (ChatJobDB.attempts >= max_attempts))
+        .values(status=JOB_FAILED, error="Job timed out", finished_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    requeued = await db.execute(
+        update(ChatJobDB)
+        .where(stale & (ChatJobDB.attempts < max_attempts))
+        .values(status=JOB_QUEUED, progress=None, worker_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return failed.rowcount + requeued.rowcount
+
+async def delete_chat_jobs_older_than(db, days: int) -> int:
+    """Delete the finished jobs older than `days` days, returns the number of deleted jobs"""
+    result = await db.execute(
+        delete(ChatJobDB)
+        .where(ChatJobDB.status.in_(FINISHED_JOB_STATES))
+        .where(ChatJobDB.created_at < datetime.utcnow() - timedelta(days=days))
+    )
+    await db.commit()
+    return result.rowcount
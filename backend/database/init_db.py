@@ -1,12 +1,13 @@
 from backend.database import engine, Base, get_db
-from backend.database.user import get_user
+from backend.database.models import UserDB
+from backend.database.migrations import run_migrations
 from backend.constants import AI_USER_ID, AI_WALLET_ADDRESS
 from sqlalchemy import text
 
 def create_ai_user(db):
     """Create the AI user if it doesn't exist"""
     # Check if AI user exists
-    ai_user = get_user(db, AI_WALLET_ADDRESS)
+    ai_user = db.query(UserDB).filter(UserDB.wallet_address == AI_WALLET_ADDRESS).first()
     if not ai_user:
         print("Creating AI user...")
         # Set the specific ID for AI user
@@ -35,6 +36,8 @@ def create_ai_user(db):
 def init_db():
     # Create all tables
     Base.metadata.create_all(bind=engine)
+    # Add the columns and indexes of newer versions to existing tables
+    run_migrations(engine)
     
     # Create AI user
     db = next(get_db())
@@ -1,19 +1,11 @@
-import os
 from typing import List, Optional
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from backend.database import get_db
+from sqlalchemy import func, select
 from datetime import datetime
-from sqlalchemy.exc import IntegrityError
 from backend.database.models import MessageDB
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-Base = declarative_base()
-
 
 # Database operations for message
-def create_message(db, canvas_id: int, user_id: int, text: str):
+async def create_message(db, canvas_id: int, user_id: int, text: str):
     new_message = MessageDB(
         canvas_id=canvas_id,
         user_id=user_id,
@@ -21,18 +13,40 @@ def create_message(db, canvas_id: int, user_id: int, text: str):
         created_at=datetime.utcnow()
     )
     db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
+    await db.commit()
+    await db.refresh(new_message)
     return new_message
 
-def get_messages_for_canvas(db, canvas_id: int):
-    return db.query(MessageDB)\
-        .filter(MessageDB.canvas_id == canvas_id)\
-        .order_by(MessageDB.created_at.asc())\
-        .all()
+async def get_messages_for_canvas(db, canvas_id: int):
+    result = await db.execute(
+        select(MessageDB)
+        .where(MessageDB.canvas_id == canvas_id)
+        .order_by(MessageDB.created_at.asc())
+    )
+    return result.scalars().all()
         
-def get_message_by_id(db, message_id: int):
-    return db.query(MessageDB)\
-        .filter(MessageDB.message_id == message_id)\
-        .first()
+async def get_message_by_id(db, message_id: int):
+    result = await db.execute(select(MessageDB).where(MessageDB.message_id == message_id))
+    return result.scalars().first()
+
+async def get_recent_messages_for_canvas(db, canvas_id: int, limit: int, after_message_id: Optional[int] = None) -> List[MessageDB]:
+    """The last `limit` messages of a canvas after `after_message_id`, oldest first"""
+    statement = select(MessageDB).where(MessageDB.canvas_id == canvas_id)
+    if after_message_id:
+        statement = statement.where(MessageDB.message_id > after_message_id)
+    result = await db.execute(statement.order_by(MessageDB.message_id.desc()).limit(limit))
+    return list(reversed(result.scalars().all()))
+
+async def count_messages_after(db, canvas_id: int, after_message_id: Optional[int] = None) -> int:
+    statement = select(func.count(MessageDB.message_id)).where(MessageDB.canvas_id == canvas_id)
+    if after_message_id:
+        statement = statement.where(MessageDB.message_id > after_message_id)
+    return (await db.execute(statement)).scalar()
 
+async def get_oldest_messages_after(db, canvas_id: int, limit: int, after_message_id: Optional[int] = None) -> List[MessageDB]:
+    """The first `limit` messages of a canvas after `after_message_id`, oldest first"""
+    statement = select(MessageDB).where(MessageDB.canvas_id == canvas_id)
+    if after_message_id:
+        statement = statement.where(MessageDB.message_id > after_message_id)
+    result = await db.execute(statement.order_by(MessageDB.message_id.asc()).limit(limit))
+    return result.scalars().all()
@@ -0,0 +1,56 @@
+from sqlalchemy import text
+
+# Key of the advisory lock that lets one process at a time apply the migrations
+MIGRATION_LOCK_ID = 4815162342
+
+# Schema changes to tables that create_all does not alter once they exist.
+# Every statement must be idempotent, they run on each startup.
+MIGRATIONS = [
+    # Webhook-driven chart refresh
+    "ALTER TABLE visualizations ADD COLUMN IF NOT EXISTS plot_code TEXT",
+    "ALTER TABLE visualizations ADD COLUMN IF NOT EXISTS source_server VARCHAR(50)",
+    "ALTER TABLE visualizations ADD COLUMN IF NOT EXISTS source_tool VARCHAR(100)",
+    "ALTER TABLE visualizations ADD COLUMN IF NOT EXISTS source_args JSON",
+    "ALTER TABLE visualizations ADD COLUMN IF NOT EXISTS refreshed_at TIMESTAMP",
+    # Windowed conversation history
+    "ALTER TABLE canvases ADD COLUMN IF NOT EXISTS history_summary TEXT",
+    "ALTER TABLE canvases ADD COLUMN IF NOT EXISTS summary_message_id INTEGER",
+]
+
+# Indexes on tables that may already be large, by name. They are built
+# CONCURRENTLY so writes are not blocked, which cannot run inside a transaction.
+# A build that was interrupted leaves an invalid index, it is dropped and built again.
+INDEX_MIGRATIONS = [
+    ("ix_canvases_user_id_created_at", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_canvases_user_id_created_at ON canvases (user_id, created_at)"),
+    ("ix_messages_canvas_id_created_at", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_canvas_id_created_at ON messages (canvas_id, created_at)"),
+    ("ix_messages_canvas_id_message_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_canvas_id_message_id ON messages (canvas_id, message_id)"),
+    ("ix_visualizations_canvas_id_created_at", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_visualizations_canvas_id_created_at ON visualizations (canvas_id, created_at)"),
+]
+
+def _is_invalid_index(connection, name: str) -> bool:
+    valid = connection.execute(
+        text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+        {"name": name}
+    ).scalar()
+    return valid is False
+
+def run_migrations(engine):
+    """
+    Apply the schema changes to existing tables.
+
+    Every API process calls this on startup, an advisory lock makes the others
+    wait until the first one is done, so the same index is never built twice
+    at the same time.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            for statement in MIGRATIONS:
+                connection.execute(text(statement))
+            for name, statement in INDEX_MIGRATIONS:
+                if _is_invalid_index(connection, name):
+                    print(f"[INFO] Rebuilding invalid index {name}")
+                    connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                connection.execute(text(statement))
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, JSON, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from backend.database import Base
 
@@ -22,10 +22,18 @@ class UserDB(Base):
 
 class CanvasDB(Base):
     __tablename__ = "canvases"
+    __table_args__ = (
+        # Canvases of a user, by creation date
+        Index("ix_canvases_user_id_created_at", "user_id", "created_at"),
+    )
 
     canvas_id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Rolling summary of the messages before the history window
+    history_summary = Column(Text)
+    # Last message folded into the summary
+    summary_message_id = Column(Integer)
 
     # Relationships
     user = relationship("UserDB", back_populates="canvases")
@@ -34,6 +42,11 @@ class CanvasDB(Base):
 
 class MessageDB(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Messages of a canvas, by creation date or by id for the history window
+        Index("ix_messages_canvas_id_created_at", "canvas_id", "created_at"),
+        Index("ix_messages_canvas_id_message_id", "canvas_id", "message_id"),
+    )
 
     message_id = Column(Integer, primary_key=True, index=True)
     canvas_id = Column(Integer, ForeignKey("canvases.canvas_id"))
@@ -47,6 +60,10 @@ class MessageDB(Base):
 
 class VisualizationDB(Base):
     __tablename__ = "visualizations"
+    __table_args__ = (
+        # Visualizations of a canvas, by creation date
+        Index("ix_visualizations_canvas_id_created_at", "canvas_id", "created_at"),
+    )
 
     visualization_id = Column(Integer, primary_key=True, index=True)
     canvas_id = Column(Integer, ForeignKey("canvases.canvas_id"))
@@ -54,6 +71,87 @@ class VisualizationDB(Base):
     png_path = Column(String)
     file_path = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # How the chart was built, so it can be refreshed without the LLM
+    plot_code = Column(Text)
+    source_server = Column(String(50))
+    source_tool = Column(String(100))
+    source_args = Column(JSON)
+    refreshed_at = Column(DateTime)
 
     # Relationships
-    canvas = relationship("CanvasDB", back_populates="visualizations") 
\ No newline at end of file
+    canvas = relationship("CanvasDB", back_populates="visualizations")
+    subscriptions = relationship("VisualizationSubscriptionDB", back_populates="visualization", cascade="all, delete-orphan")
+
+class VisualizationSubscriptionDB(Base):
+    __tablename__ = "visualization_subscriptions"
+    __table_args__ = (UniqueConstraint("visualization_id", "subscription_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    visualization_id = Column(Integer, ForeignKey("visualizations.visualization_id"), index=True)
+    # Nodit webhook subscription whose events refresh the visualization
+    subscription_id = Column(String(100), index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    visualization = relationship("VisualizationDB", back_populates="subscriptions") 
+
+class WebhookEventDB(Base):
+    __tablename__ = "webhook_events"
+
+    # Monotonic key used as pagination cursor, newest events have the largest seq
+    seq = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_id = Column(String(36), unique=True, nullable=False)
+    # Id of the Nodit delivery, a redelivered webhook is stored only once
+    delivery_id = Column(String(128), unique=True, index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    event_type = Column(String(100), index=True)
+    subscription_id = Column(String(100), index=True)
+    status = Column(String(20))
+    data = Column(JSON)
+
+    def to_dict(self):
+        return {
+            "id": self.event_id,
+            "seq": self.seq,
+            "timestamp": self.timestamp.isoformat(),
+            "event_type": self.event_type,
+            "subscription_id": self.subscription_id,
+            "data": self.data,
+            "status": self.status
+        }
+
+class ChatJobDB(Base):
+    __tablename__ = "chat_jobs"
+    __table_args__ = (
+        # Oldest queued job first, for the workers
+        Index("ix_chat_jobs_status_created_at", "status", "created_at"),
+    )
+
+    job_id = Column(String(36), primary_key=True)
+    # queued, running, succeeded or failed
+    status = Column(String(20), nullable=False, default="queued")
+    # Stage of a running job, e.g. "running_agents"
+    progress = Column(String(50))
+    request = Column(JSON, nullable=False)
+    result = Column(JSON)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(100))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    # Updated on every progress change, a running job without updates is requeued
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
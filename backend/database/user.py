@@ -1,20 +1,21 @@
 from datetime import datetime
 from typing import List
-from sqlalchemy import Column, Integer, String, DateTime, text
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from backend.database.models import UserDB
 
 # Database operations for user
-def create_user(db, wallet_address: str):
+async def create_user(db, wallet_address: str):
     try:
         new_user = UserDB(wallet_address=wallet_address)
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         return new_user
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise Exception("Failed to create user")
 
-def get_user(db, wallet_address: str):
-    return db.query(UserDB).filter(UserDB.wallet_address == wallet_address).first()
\ No newline at end of file
+async def get_user(db, wallet_address: str):
+    result = await db.execute(select(UserDB).where(UserDB.wallet_address == wallet_address))
+    return result.scalars().first()
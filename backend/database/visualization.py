@@ -1,30 +1,31 @@
-import os
-from typing import List
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
+from typing import Dict, List
 from datetime import datetime
-from backend.database.models import VisualizationDB
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-Base = declarative_base()
+from sqlalchemy import delete, select
+from backend.database.models import VisualizationDB, VisualizationSubscriptionDB
 
 # Database operations for visualization
-def create_visualization(db, canvas_id: int, json_data: str, png_path: str, file_path: str):
+async def create_visualization(
+    db, canvas_id: int, json_data: str, png_path: str, file_path: str,
+    plot_code: str = None, source_server: str = None, source_tool: str = None, source_args: dict = None
+):
     new_visualization = VisualizationDB(
         canvas_id=canvas_id,
         json_data=json_data,
         png_path=png_path,
         file_path=file_path,
+        plot_code=plot_code,
+        source_server=source_server,
+        source_tool=source_tool,
+        source_args=source_args,
         created_at=datetime.utcnow()
     )
     db.add(new_visualization)
-    db.commit()
-    db.refresh(new_visualization)
+    await db.commit()
+    await db.refresh(new_visualization)
     return new_visualization
 
-def update_visualization(db, visualization_id: int, canvas_id: int, json_data: str, png_path: str, file_path: str):
-    visualization = db.query(VisualizationDB).filter(VisualizationDB.visualization_id == visualization_id).first()
+async def update_visualization(db, visualization_id: int, canvas_id: int, json_data: str, png_path: str, file_path: str, plot_code: str = None):
+    visualization = await get_visualization_by_id(db, visualization_id)
     
     if not visualization:
         raise ValueError("Visualization not found")
@@ -33,18 +34,84 @@ def update_visualization(db, visualization_id: int, canvas_id: int, json_data: s
     visualization.json_data = json_data
     visualization.png_path = png_path
     visualization.file_path = file_path
+    if plot_code is not None:
+        visualization.plot_code = plot_code
     
-    db.commit()
-    db.refresh(visualization)
+    await db.commit()
+    await db.refresh(visualization)
     return visualization
 
-def get_visualization_by_id(db, visualization_id: int) -> VisualizationDB:
-    return db.query(VisualizationDB)\
-        .filter(VisualizationDB.visualization_id == visualization_id)\
-        .first()
+async def get_visualization_by_id(db, visualization_id: int) -> VisualizationDB:
+    result = await db.execute(
+        select(VisualizationDB).where(VisualizationDB.visualization_id == visualization_id)
+    )
+    return result.scalars().first()
+
+async def get_visualizations_for_canvas(db, canvas_id: int) -> List[VisualizationDB]:
+    result = await db.execute(
+        select(VisualizationDB)
+        .where(VisualizationDB.canvas_id == canvas_id)
+        .order_by(VisualizationDB.created_at.asc())
+    )
+    return result.scalars().all()
+
+async def update_visualization_figure(db, visualization_id: int, json_data: str):
+    """Store a refreshed figure, the data file and PNG are updated in place"""
+    visualization = await get_visualization_by_id(db, visualization_id)
+    if not visualization:
+        raise ValueError("Visualization not found")
+    
+    visualization.json_data = json_data
+    visualization.refreshed_at = datetime.utcnow()
+    
+    await db.commit()
+    await db.refresh(visualization)
+    return visualization
 
-def get_visualizations_for_canvas(db, canvas_id: int) -> List[VisualizationDB]:
-    return db.query(VisualizationDB)\
-        .filter(VisualizationDB.canvas_id == canvas_id)\
-        .order_by(VisualizationDB.created_at.asc())\
-        .all()
\ No newline at end of file
+# Database operations for visualization subscriptions
+async def add_visualization_subscription(db, visualization_id: int, subscription_id: str):
+    result = await db.execute(
+        select(VisualizationSubscriptionDB)
+        .where(VisualizationSubscriptionDB.visualization_id == visualization_id)
+        .where(VisualizationSubscriptionDB.subscription_id == subscription_id)
+    )
+    subscription = result.scalars().first()
+    if subscription:
+        return subscription
+    
+    subscription = VisualizationSubscriptionDB(
+        visualization_id=visualization_id,
+        subscription_id=subscription_id,
+        created_at=datetime.utcnow()
+    )
+    db.add(subscription)
+    await db.commit()
+    await db.refresh(subscription)
+    return subscription
+
+async def remove_visualization_subscription(db, visualization_id: int, subscription_id: str) -> bool:
+    result = await db.execute(
+        delete(VisualizationSubscriptionDB)
+        .where(VisualizationSubscriptionDB.visualization_id == visualization_id)
+        .where(VisualizationSubscriptionDB.subscription_id == subscription_id)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+async def get_subscriptions_for_visualization(db, visualization_id: int) -> List[VisualizationSubscriptionDB]:
+    result = await db.execute(
+        select(VisualizationSubscriptionDB)
+        .where(VisualizationSubscriptionDB.visualization_id == visualization_id)
+    )
+    return result.scalars().all()
+
+async def get_visualization_ids_by_subscription(db, subscription_ids: List[str]) -> Dict[str, List[int]]:
+    result = await db.execute(
+        select(VisualizationSubscriptionDB.subscription_id, VisualizationSubscriptionDB.visualization_id)
+        .where(VisualizationSubscriptionDB.subscription_id.in_(subscription_ids))
+        .distinct()
+    )
+    visualization_ids: Dict[str, List[int]] = {}
+    for subscription_id, visualization_id in result.all():
+        visualization_ids.setdefault(subscription_id, []).append(visualization_id)
+    return visualization_ids
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from typing import Collection, Dict, List, Optional
+from sqlalchemy.dialects.postgresql import insert
+from backend.database.models import WebhookEventDB
+
+
+# Database operations for webhook events
+def create_webhook_events_batch(db, events: List[Dict]) -> Dict[str, int]:
+    """
+    Insert several events in one statement, skipping deliveries that are already stored.
+
+    Args:
+        events: Rows with event_id, delivery_id, timestamp, event_type, subscription_id, status and data
+
+    Returns:
+        Dictionary of event_id to seq of the inserted events
+    """
+    if not events:
+        return {}
+    statement = insert(WebhookEventDB)\
+        .values(events)\
+        .on_conflict_do_nothing(index_elements=["delivery_id"])\
+        .returning(WebhookEventDB.event_id, WebhookEventDB.seq)
+    inserted = {event_id: seq for event_id, seq in db.execute(statement)}
+    db.commit()
+    return inserted
+
+def get_webhook_events(
+    db, limit: int = 50, before_seq: Optional[int] = None, event_type: str = None, subscription_id: str = None
+) -> List[WebhookEventDB]:
+    """Get events newest first, starting after the cursor `before_seq` if given"""
+    query = db.query(WebhookEventDB)
+    if before_seq is not None:
+        query = query.filter(WebhookEventDB.seq < before_seq)
+    if event_type:
+        query = query.filter(WebhookEventDB.event_type == event_type)
+    if subscription_id:
+        query = query.filter(WebhookEventDB.subscription_id == subscription_id)
+    return query.order_by(WebhookEventDB.seq.desc()).limit(limit).all()
+
+def get_latest_webhook_event(db) -> Optional[WebhookEventDB]:
+    # Reads the last entry of the primary key index, no sort of the table
+    return db.query(WebhookEventDB)\
+        .order_by(WebhookEventDB.seq.desc())\
+        .first()
+
+def delete_webhook_events_older_than(db, days: int) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = db.query(WebhookEventDB)\
+        .filter(WebhookEventDB.timestamp < cutoff)\
+        .delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+def get_webhook_events_after(
+    db, after_seq: int, limit: int = 500, event_type: str = None, subscription_id: str = None,
+    exclude_seqs: Optional[Collection[int]] = None
+) -> List[WebhookEventDB]:
+    """Get events newer than `after_seq` except `exclude_seqs`, oldest first, to replay them in order"""
+    query = db.query(WebhookEventDB).filter(WebhookEventDB.seq > after_seq)
+    if exclude_seqs:
+        query = query.filter(WebhookEventDB.seq.notin_(list(exclude_seqs)))
+    if event_type:
+        query = query.filter(WebhookEventDB.event_type == event_type)
+    if subscription_id:
+        query = query.filter(WebhookEventDB.subscription_id == subscription_id)
+    return query.order_by(WebhookEventDB.seq.asc()).limit(limit).all()
+
+def get_webhook_event_by_event_id(db, event_id: str) -> Optional[WebhookEventDB]:
+    return db.query(WebhookEventDB)\
+        .filter(WebhookEventDB.event_id == event_id)\
+        .first()
@@ -1,10 +1,21 @@
+import asyncio
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.routes import canvas_router, user_router, message_router, visualization_router, mcp_router, webhooks
+from backend.routes import canvas_router, user_router, message_router, visualization_router, mcp_router, metrics_router, jobs_router, webhooks
+from backend.database import async_engine
 from backend.database.init_db import init_db
+from agents.runtime import get_runtime
+from agents.utils.openai_client import close_async_openai_client
+from agents.utils.render_pool import get_render_pool
+from backend.utils.chart_refresher import chart_refresher
+from backend.utils.chat_job_queue import chat_job_queue
+from backend.utils.webhook_ingestor import webhook_ingestor
 
-# Initialize the database
-init_db()
+# Initialize the database, DB_INIT_ON_STARTUP=false leaves it to
+# `python -m backend.database.init_db` run once per deployment
+if os.getenv("DB_INIT_ON_STARTUP", "true").lower() != "false":
+    init_db()
 
 app = FastAPI()
 
@@ -15,6 +26,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # Cursor of the next page of webhook events
 )
 
 # Include routers
@@ -23,8 +35,36 @@ app.include_router(user_router)
 app.include_router(message_router)
 app.include_router(visualization_router)
 app.include_router(mcp_router)
+app.include_router(metrics_router)
+app.include_router(jobs_router)
 app.include_router(webhooks.router, prefix="/api/webhook", tags=["webhooks"])
 
+@app.on_event("startup")
+async def start_webhook_retention():
+    # Keep the task referenced so it is not garbage collected
+    app.state.webhook_retention_task = asyncio.create_task(webhooks.prune_webhook_events_periodically())
+    # Write queued webhook deliveries to the database in batches
+    webhook_ingestor.start()
+
+@app.on_event("startup")
+async def warm_agent_runtime():
+    # Build the pipelines, clients and tool schemas once instead of on the first message
+    await get_runtime()
+    # Start the render workers so kaleido is warm before the first chart
+    await get_render_pool().warm_up()
+    # Run queued chat turns in this process, CHAT_JOB_WORKERS=0 leaves them to python -m backend.worker
+    chat_job_queue.start()
+
+@app.on_event("shutdown")
+async def close_agent_clients():
+    app.state.webhook_retention_task.cancel()
+    await chat_job_queue.stop()
+    await webhook_ingestor.stop()
+    await chart_refresher.stop()
+    await async_engine.dispose()
+    await close_async_openai_client()
+    get_render_pool().shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
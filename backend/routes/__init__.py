@@ -3,5 +3,7 @@ from .user import router as user_router
 from .message import router as message_router
 from .visualization import router as visualization_router
 from .mcp import router as mcp_router
+from .metrics import router as metrics_router
+from .jobs import router as jobs_router
 
-__all__ = ["canvas_router", "user_router", "message_router", "visualization_router", "mcp_router"]
+__all__ = ["canvas_router", "user_router", "message_router", "visualization_router", "mcp_router", "metrics_router", "jobs_router"]
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import os
+
+from backend.database import AsyncSessionLocal
+from backend.database.chat_job import FINISHED_JOB_STATES, get_chat_job
+from backend.routes.message import MessageRequest
+from backend.utils.chat_job_queue import chat_job_queue
+
+router = APIRouter()
+
+# Seconds between two checks of a streamed job
+CHAT_JOB_STREAM_INTERVAL = float(os.getenv("CHAT_JOB_STREAM_INTERVAL", "1"))
+# Seconds between two keepalive comments of an unchanged job stream
+CHAT_JOB_STREAM_KEEPALIVE = float(os.getenv("CHAT_JOB_STREAM_KEEPALIVE", "15"))
+
+async def _load_job(job_id: str):
+    async with AsyncSessionLocal() as db:
+        job = await get_chat_job(db, job_id)
+    return job.to_dict() if job else None
+
+@router.post("/message/jobs", status_code=202)
+async def submit_message_job(message: MessageRequest):
+    """
+    Queue a user message and return at once.
+
+    Poll GET /message/jobs/{job_id} or subscribe to its stream to get the
+    progress and, once succeeded, the same response as POST /message.
+    """
+    job = await chat_job_queue.submit(message)
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+@router.get("/message/jobs/{job_id}")
+async def get_message_job(job_id: str):
+    job = await _load_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@router.get("/message/jobs/{job_id}/stream")
+async def stream_message_job(job_id: str, request: Request):
+    """Stream the job as Server-Sent Events on every change, until it is finished"""
+    job = await _load_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def event_stream():
+        current = job
+        last_sent = None
+        idle = 0.0
+        while True:
+            state = (current["status"], current["progress"])
+            if state != last_sent:
+                last_sent = state
+                idle = 0.0
+                yield f"event: job\ndata: {json.dumps(current)}\n\n"
+            elif idle >= CHAT_JOB_STREAM_KEEPALIVE:
+                idle = 0.0
+                yield ": keepalive\n\n"
+
+            if current["status"] in FINISHED_JOB_STATES or await request.is_disconnected():
+                break
+
+            await asyncio.sleep(CHAT_JOB_STREAM_INTERVAL)
+            idle += CHAT_JOB_STREAM_INTERVAL
+            current = await _load_job(job_id) or current
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
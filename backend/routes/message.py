@@ -1,16 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Optional, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Awaitable, Callable, Dict, Optional, List
 from pydantic import BaseModel
 from datetime import datetime
 import json
 
-from backend.database import get_db
+from backend.database import AsyncSessionLocal, get_async_db
 from backend.database.user import get_user, create_user
 from backend.database.canvas import get_canvas, create_canvas
 from backend.database.visualization import create_visualization, get_visualization_by_id, update_visualization
 from backend.constants import AI_USER_ID
 from backend.database.message import create_message, get_messages_for_canvas, get_message_by_id
+from backend.utils.conversation_history import conversation_history_loader
 
 from agents.main import main as agent_main
 
@@ -38,66 +39,74 @@ class MessageResponseWithAIResponse(BaseModel):
     visualization_ids: List[int]
     ai_message_id: int
     
-@router.post("/message", response_model=MessageResponseWithAIResponse)
-async def send_message(
+async def process_message(
     message: MessageRequest,
-    db: Session = Depends(get_db)
-):
-    try:
+    on_progress: Optional[Callable[[str], Awaitable[None]]] = None,
+    mcp_server: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Handle a user message: run the agents and store the message, the
+    visualizations and the reply.
+
+    The database is used in short transactional phases and no session is open
+    while the agents run, so a pooled connection is never held for the length
+    of an LLM call. `on_progress` is awaited with the name of each stage.
+    The agents use `mcp_server`, or the selected MCP server when it is None.
+    """
+    async def report(stage: str):
+        if on_progress:
+            await on_progress(stage)
+
+    # Phase 1: load the context and store the user message
+    await report("loading_context")
+    async with AsyncSessionLocal() as db:
         # Get or create user from wallet address
-        user = get_user(db, message.wallet_address)
+        user = await get_user(db, message.wallet_address)
         if not user:
-            user = create_user(db, message.wallet_address)
+            user = await create_user(db, message.wallet_address)
 
         # If no canvas_id, create new canvas
         if message.canvas_id is None:
-            canvas = create_canvas(db, user.user_id)
+            canvas = await create_canvas(db, user.user_id)
         else:
             # Get existing canvas
-            canvas = get_canvas(db, message.canvas_id)
+            canvas = await get_canvas(db, message.canvas_id)
             if not canvas:
                 raise HTTPException(
                     status_code=404, 
                     detail=f"Canvas with id {message.canvas_id} not found"
                 )
-            
+        
             # Verify user has access to this canvas
             if canvas.user_id != user.user_id:
                 raise HTTPException(
                     status_code=403, 
                     detail="Not authorized to access this canvas"
                 )
-        
-        # Get conversation history for this canvas
-        conversation_history = []
-        previous_messages = get_messages_for_canvas(db, canvas.canvas_id)
-        for msg in previous_messages:
-            role = "assistant" if msg.user_id == AI_USER_ID else "user"
-            conversation_history.append({
-                "role": role,
-                "content": msg.text
-            })
-        
+    
+        # Get the summary and the last messages of this canvas
+        conversation_history = await conversation_history_loader.load(db, canvas)
+    
         # Create the message
-        new_message = create_message(
+        new_message = await create_message(
             db,
             canvas_id=canvas.canvas_id,
             user_id=user.user_id,
             text=message.text
         )
-        
+    
         # Add current message to conversation history
         conversation_history.append({
             "role": "user",
             "content": message.text
         })
-        
+    
         # Process mentioned visualization IDs if provided
         mentioned_visualizations = []
         if message.mentioned_visualization_ids and len(message.mentioned_visualization_ids) > 0:
             print(f"Processing mentioned visualization IDs: {message.mentioned_visualization_ids}")
             for viz_id in message.mentioned_visualization_ids:
-                visualization = get_visualization_by_id(db, viz_id)
+                visualization = await get_visualization_by_id(db, viz_id)
                 if visualization:
                     mentioned_visualizations.append({
                         "visualization_id": visualization.visualization_id,
@@ -108,114 +117,152 @@ async def send_message(
                     print(f"Found visualization with ID {viz_id}: {visualization.png_path}")
                 else:
                     print(f"Visualization with ID {viz_id} not found")
+    
+    # Pass mentioned visualizations to the agent, outside of any session
+    await report("running_agents")
+    results = await agent_main(
+        message.text, 
+        conversation_history,
+        mentioned_visualizations=mentioned_visualizations,
+        mcp_server=mcp_server
+    )
+    visualization_ids = []  # empty list for visualization ids
+    
+    if results["action"] == "GENERAL_CHAT":
+        ai_message_text = results["message"]
         
-        # Pass mentioned visualizations to the agent
-        results = await agent_main(
-            message.text, 
-            conversation_history,
-            mentioned_visualizations=mentioned_visualizations
-        )
-        visualization_ids = []  # empty list for visualization ids
+    elif results["action"] == "RETRIEVE_AND_VISUALIZE_INFORMATION":
+        visualization_results_list = results["visualization_results_list"]
+        print("visualization_results_list: ", visualization_results_list)
         
-        if results["action"] == "GENERAL_CHAT":
-            ai_message_text = results["message"]
-            
-        elif results["action"] == "RETRIEVE_AND_VISUALIZE_INFORMATION":
-            visualization_results_list = results["visualization_results_list"]
-            print("visualization_results_list: ", visualization_results_list)
-            
-            img_paths = []
-            
+        img_paths = []
+        
+        # Phase 2: store the visualizations
+        await report("saving_visualizations")
+        async with AsyncSessionLocal() as db:
             for viz_result in visualization_results_list:
+                # Skip sub-tasks that failed, the others are still saved and analyzed
+                if not viz_result.get("success") or not viz_result.get("fig_json"):
+                    print(f"Skipping failed visualization: {viz_result.get('error', 'Unknown error')}")
+                    continue
                 # Parse the json data
                 json_data = json.loads(viz_result['fig_json'])
                 # Save the json visualization to the database
-                visualization = create_visualization(db, canvas.canvas_id, json_data, viz_result["output_png_path"], viz_result["file_path"])
+                # Keep how the chart was built, so webhook events can refresh it without the LLM
+                visualization = await create_visualization(
+                    db, canvas.canvas_id, json_data, viz_result["output_png_path"], viz_result["file_path"],
+                    plot_code=viz_result.get("plot_code"),
+                    source_server=viz_result.get("mcp_server"),
+                    source_tool=viz_result.get("tool_name"),
+                    source_args=viz_result.get("tool_args")
+                )
                 visualization_ids.append(visualization.visualization_id)
                 # To be used for analysis later
                 img_paths.append(viz_result["output_png_path"])
-                
-            # call the ai agent again to get the analysis
-            prompt = "Please analyze the figures and reply the user. Here is the user's original prompt: " + message.text + ". Here is the img paths for the generated figures: " + ", ".join(img_paths)
-            second_ai_results = await agent_main(prompt)
-            ai_message_text = second_ai_results["analysis"]
-            
-        elif results["action"] == "ANALYZE_GRAPH":
-            ai_message_text = results["analysis"]
             
-        elif results["action"] == "MODIFY_VISUALIZATION":
-            modification_results_list = results["modification_results_list"]
-            
-            img_paths = []
-            
-            for mod_result in modification_results_list:
+        # call the ai agent again to get the analysis
+        await report("analyzing")
+        prompt = "Please analyze the figures and reply the user. Here is the user's original prompt: " + message.text + ". Here is the img paths for the generated figures: " + ", ".join(img_paths)
+        second_ai_results = await agent_main(prompt, mcp_server=mcp_server)
+        ai_message_text = second_ai_results["analysis"]
+        
+    elif results["action"] == "ANALYZE_GRAPH":
+        ai_message_text = results["analysis"]
+        
+    elif results["action"] == "MODIFY_VISUALIZATION":
+        modification_results = results.get("modification_results", {})
+        
+        img_paths = []
+        
+        # Phase 2: store the modified visualizations
+        await report("saving_visualizations")
+        async with AsyncSessionLocal() as db:
+            for visualization_id, mod_result in modification_results.items():
                 if mod_result["success"]:
                     # Parse the json data
                     json_data = json.loads(mod_result['fig_json'])
                     # Save the json data to update the visualization
-                    visualization = update_visualization(db, mod_result["visualization_id"], canvas.canvas_id, json_data, mod_result["output_png_path"], mod_result["file_path"])
+                    visualization = await update_visualization(db, visualization_id, canvas.canvas_id, json_data, mod_result["output_png_path"], mod_result["file_path"], plot_code=mod_result.get("plot_code"))
                     visualization_ids.append(visualization.visualization_id)   # which is the original visualization id since this is an update
                     # to be used for analysis later
                     img_paths.append(mod_result["output_png_path"])
-                    
-            # call the ai agent again to get the analysis
-            prompt = "You have already modified the figure(s). Now, please analyze the modified figure(s) and reply the user. Here is the user's original prompt: " + message.text + ". Here is the img paths for the modified figures: " + ", ".join(img_paths)
-            second_ai_results = await agent_main(prompt)
-            ai_message_text = second_ai_results["analysis"]
+                else:
+                    print(f"Failed to modify visualization {visualization_id}: {mod_result.get('error', 'Unknown error')}")
                 
-        elif results["action"] == "USE_WEBHOOK":
-            # Handle webhook results
-            webhook_results = results.get("webhook_results", {})
+        # call the ai agent again to get the analysis
+        await report("analyzing")
+        prompt = "You have already modified the figure(s). Now, please analyze the modified figure(s) and reply the user. Here is the user's original prompt: " + message.text + ". Here is the img paths for the modified figures: " + ", ".join(img_paths)
+        second_ai_results = await agent_main(prompt, mcp_server=mcp_server)
+        ai_message_text = second_ai_results["analysis"]
             
-            if webhook_results.get("success"):
-                # If there's a message from the AI, use that
-                if "message" in webhook_results:
-                    ai_message_text = webhook_results["message"]
-                else:
-                    # Format the webhook tool results into a readable message
-                    tool_results = webhook_results.get("results", [])
-                    result_messages = []
-                    for tool_result in tool_results:
-                        tool_name = tool_result.get("tool", "unknown tool")
-                        result = tool_result.get("result", {})
-                        result_messages.append(f"Executed {tool_name}. Result: {result}")
-                        if "webhook_id" in result:
-                            result_messages.append(f"Webhook ID: {result['webhook_id']}")
-                    
-                    ai_message_text = "\n".join(result_messages)
+    elif results["action"] == "USE_WEBHOOK":
+        # Handle webhook results
+        webhook_results = results.get("webhook_results", {})
+        
+        if webhook_results.get("success"):
+            # If there's a message from the AI, use that
+            if "message" in webhook_results:
+                ai_message_text = webhook_results["message"]
             else:
-                ai_message_text = f"Failed to execute webhook operation: {webhook_results.get('error', 'Unknown error')}"
+                # Format the webhook tool results into a readable message
+                tool_results = webhook_results.get("results", [])
+                result_messages = []
+                for tool_result in tool_results:
+                    tool_name = tool_result.get("tool", "unknown tool")
+                    result = tool_result.get("result", {})
+                    result_messages.append(f"Executed {tool_name}. Result: {result}")
+                    if "webhook_id" in result:
+                        result_messages.append(f"Webhook ID: {result['webhook_id']}")
                 
+                ai_message_text = "\n".join(result_messages)
         else:
-            raise HTTPException(status_code=400, detail="Invalid action")
+            ai_message_text = f"Failed to execute webhook operation: {webhook_results.get('error', 'Unknown error')}"
             
-        # Save the analysis as a message from the AI to the database
-        ai_message = create_message(
+    else:
+        raise HTTPException(status_code=400, detail="Invalid action")
+        
+    # Phase 3: save the analysis as a message from the AI to the database
+    await report("saving_reply")
+    async with AsyncSessionLocal() as db:
+        ai_message = await create_message(
             db,
             canvas_id=canvas.canvas_id,
             user_id=AI_USER_ID,
             text=ai_message_text
         )
+    # Keep the history bounded for the next messages
+    conversation_history_loader.schedule_summary(canvas.canvas_id)
+    
+    print("sending these as response: ", {
+        "message_id": new_message.message_id,
+        "canvas_id": canvas.canvas_id,  # Include the canvas_id here
+        "text": new_message.text,
+        "created_at": new_message.created_at,
+        "visualization_ids": visualization_ids,  # optional TODO:
+        "ai_message_id": ai_message.message_id
+    })
         
-        print("sending these as response: ", {
-            "message_id": new_message.message_id,
-            "canvas_id": canvas.canvas_id,  # Include the canvas_id here
-            "text": new_message.text,
-            "created_at": new_message.created_at,
-            "visualization_ids": visualization_ids,  # optional TODO:
-            "ai_message_id": ai_message.message_id
-        })
-            
-        # Make sure the response includes the canvas_id
-        return {
-            "message_id": new_message.message_id,
-            "canvas_id": canvas.canvas_id,  # Include the canvas_id here
-            "text": new_message.text,
-            "created_at": new_message.created_at,
-            "visualization_ids": visualization_ids,
-            "ai_message_id": ai_message.message_id
-        }
+    # Make sure the response includes the canvas_id
+    return {
+        "message_id": new_message.message_id,
+        "canvas_id": canvas.canvas_id,  # Include the canvas_id here
+        "text": new_message.text,
+        "created_at": new_message.created_at,
+        "visualization_ids": visualization_ids,
+        "ai_message_id": ai_message.message_id
+    }
+
 
+@router.post("/message", response_model=MessageResponseWithAIResponse)
+async def send_message(message: MessageRequest):
+    """
+    Handle a user message and wait for the reply.
+
+    The chain can take longer than a proxy timeout, POST /message/jobs runs it
+    in the background instead.
+    """
+    try:
+        return await process_message(message)
     except Exception as e:
         print(f"Error in send_message: {str(e)}")
         import traceback
@@ -226,9 +273,9 @@ async def send_message(
 @router.get("/canvas/{canvas_id}/messages", response_model=List[MessageResponse])
 async def get_canvas_messages(
     canvas_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    messages = get_messages_for_canvas(db, canvas_id)
+    messages = await get_messages_for_canvas(db, canvas_id)
     return [{
         "message_id": msg.message_id,
         "canvas_id": msg.canvas_id,
@@ -240,9 +287,9 @@ async def get_canvas_messages(
 @router.get("/canvas/{canvas_id}/first-message", response_model=Optional[MessageResponse])
 async def get_canvas_first_message(
     canvas_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    messages = get_messages_for_canvas(db, canvas_id)
+    messages = await get_messages_for_canvas(db, canvas_id)
     if not messages:
         return None
     return messages[0]
@@ -251,10 +298,10 @@ async def get_canvas_first_message(
 @router.get("/message/{message_id}", response_model=MessageResponse)
 async def get_message(
     message_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        message = get_message_by_id(db, message_id)
+        message = await get_message_by_id(db, message_id)
         if not message:
             raise HTTPException(
                 status_code=404,
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+
+from agents.utils.plot_cache import get_plot_cache
+from agents.utils.render_pool import get_render_pool
+from agents.utils.tool_cache import get_tool_cache
+from agents.utils.token_metadata import get_token_metadata_store
+from backend.database import get_pool_stats
+from backend.utils.event_broker import webhook_event_broker
+from backend.utils.chart_refresher import chart_refresher
+from backend.utils.chat_job_queue import chat_job_queue
+from backend.utils.webhook_ingestor import webhook_ingestor
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Get runtime metrics of the worker pools and caches"""
+    return {
+        "database": get_pool_stats(),
+        "render_pool": get_render_pool().stats(),
+        "tool_cache": get_tool_cache().stats(),
+        "token_metadata": get_token_metadata_store().stats(),
+        "plot_cache": get_plot_cache().stats(),
+        "webhook_stream": webhook_event_broker.stats(),
+        "webhook_ingest": webhook_ingestor.stats(),
+        "chart_refresh": chart_refresher.stats(),
+        "chat_jobs": chat_job_queue.stats()
+    }
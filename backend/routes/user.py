@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from backend.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import get_async_db
 from backend.database.user import get_user, create_user
 from pydantic import BaseModel
 
@@ -13,9 +13,9 @@ class UserResponse(BaseModel):
 @router.post("/users/{wallet_address}", response_model=UserResponse)
 async def get_or_create_user(
     wallet_address: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = get_user(db, wallet_address)
+    user = await get_user(db, wallet_address)
     if not user:
-        user = create_user(db, wallet_address)
+        user = await create_user(db, wallet_address)
     return user
\ No newline at end of file
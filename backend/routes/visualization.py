@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from backend.database import get_db 
-from backend.database.visualization import get_visualizations_for_canvas, get_visualization_by_id
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import AsyncSessionLocal, get_async_db
+from backend.database.visualization import (
+    get_visualizations_for_canvas,
+    get_visualization_by_id,
+    add_visualization_subscription,
+    remove_visualization_subscription,
+    get_subscriptions_for_visualization
+)
+from backend.utils.chart_refresher import chart_refresher
 
 from typing import Optional, List
 from pydantic import BaseModel
@@ -15,13 +22,21 @@ class VisualizationResponse(BaseModel):
     json_data: dict
     png_path: str
     created_at: datetime
+
+class VisualizationSubscriptionRequest(BaseModel):
+    subscription_id: str
+
+class VisualizationSubscriptionResponse(BaseModel):
+    visualization_id: int
+    subscription_id: str
+    created_at: datetime
     
 @router.get("/canvas/{canvas_id}/first-visualization", response_model=Optional[VisualizationResponse])
 async def get_canvas_first_visualization(
     canvas_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    visualizations = get_visualizations_for_canvas(db, canvas_id)
+    visualizations = await get_visualizations_for_canvas(db, canvas_id)
     print("visualizations in get_canvas_first_visualization: ", visualizations)
     if not visualizations:
         return None
@@ -30,22 +45,22 @@ async def get_canvas_first_visualization(
 @router.get("/canvas/{canvas_id}/visualizations", response_model=List[VisualizationResponse])
 async def get_canvas_visualizations(
     canvas_id: int, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    visualizations = get_visualizations_for_canvas(db, canvas_id)
+    visualizations = await get_visualizations_for_canvas(db, canvas_id)
     return visualizations
 
 @router.get("/visualization/{visualization_id}")
 async def get_visualization(
     visualization_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Add logging here
     print(f"Received request for visualization {visualization_id}")
     
     try:
         # Your existing code...
-        visualization = get_visualization_by_id(db, visualization_id)
+        visualization = await get_visualization_by_id(db, visualization_id)
         
         print("visualization from db: ", visualization)
         
@@ -70,3 +85,48 @@ async def get_visualization(
             status_code=500
         )
 
+async def _get_refreshable_visualization(db: AsyncSession, visualization_id: int):
+    visualization = await get_visualization_by_id(db, visualization_id)
+    if not visualization:
+        raise HTTPException(status_code=404, detail=f"Visualization {visualization_id} not found")
+    if not visualization.source_tool:
+        raise HTTPException(status_code=400, detail=f"Visualization {visualization_id} has no source tool to refresh from")
+    return visualization
+
+@router.get("/visualization/{visualization_id}/subscriptions", response_model=List[VisualizationSubscriptionResponse])
+async def get_visualization_subscriptions(
+    visualization_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await get_subscriptions_for_visualization(db, visualization_id)
+
+@router.post("/visualization/{visualization_id}/subscriptions", response_model=VisualizationSubscriptionResponse)
+async def subscribe_visualization(
+    visualization_id: int,
+    request: VisualizationSubscriptionRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Refresh the visualization whenever an event of the webhook subscription is received"""
+    await _get_refreshable_visualization(db, visualization_id)
+    return await add_visualization_subscription(db, visualization_id, request.subscription_id)
+
+@router.delete("/visualization/{visualization_id}/subscriptions/{subscription_id}")
+async def unsubscribe_visualization(
+    visualization_id: int,
+    subscription_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not await remove_visualization_subscription(db, visualization_id, subscription_id):
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    return {"status": "success"}
+
+@router.post("/visualization/{visualization_id}/refresh")
+async def refresh_visualization(visualization_id: int):
+    """Refresh the visualization now from its source tool, without the LLM"""
+    # Release the connection before the tool call and the render
+    async with AsyncSessionLocal() as db:
+        await _get_refreshable_visualization(db, visualization_id)
+    result = await chart_refresher.refresh(visualization_id)
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
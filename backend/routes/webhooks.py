@@ -1,87 +1,241 @@
-from fastapi import APIRouter, Request, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, Request, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional
+import asyncio
+import json
 import logging
-from datetime import datetime
+import os
 import uuid
 
+from backend.database import get_db, SessionLocal
+from backend.database.webhook_event import (
+    get_webhook_events as get_webhook_events_page,
+    get_latest_webhook_event as get_latest_event,
+    get_webhook_events_after,
+    get_webhook_event_by_event_id,
+    delete_webhook_events_older_than
+)
+from backend.utils.event_broker import webhook_event_broker
+from backend.utils.webhook_ingestor import webhook_ingestor, get_delivery_id
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# In-memory storage for webhook events (for MVP)
-# In production, this should be replaced with a proper database
-webhook_events = []
+# Events older than this many days are deleted, 0 keeps all events
+WEBHOOK_EVENT_RETENTION_DAYS = int(os.getenv("WEBHOOK_EVENT_RETENTION_DAYS", "30"))
+# Seconds between two retention runs
+WEBHOOK_EVENT_PRUNE_INTERVAL = int(os.getenv("WEBHOOK_EVENT_PRUNE_INTERVAL", "3600"))
+# Seconds an idle stream waits before checking the database for events ingested by other workers
+WEBHOOK_STREAM_POLL_INTERVAL = float(os.getenv("WEBHOOK_STREAM_POLL_INTERVAL", "5"))
+# Seqs below the last sent event that a stream checks again for late commits.
+# seq is assigned at insert, so a batch can commit after a later one
+WEBHOOK_STREAM_LAG_WINDOW = int(os.getenv("WEBHOOK_STREAM_LAG_WINDOW", "2000"))
+# Milliseconds the browser waits before reconnecting a dropped stream
+WEBHOOK_STREAM_RETRY_MS = int(os.getenv("WEBHOOK_STREAM_RETRY_MS", "3000"))
 
 @router.post("/nodit")
 async def receive_nodit_webhook(request: Request):
     """
     Endpoint to receive webhooks from Nodit.
+
+    The delivery is acknowledged as soon as it is queued, it is written to the
+    database in a batch right after. Redelivered webhooks are ignored.
     """
     try:
         # Get the raw body
         body = await request.json()
-
-        # Create a new event entry
-        event = {
-            "id": str(uuid.uuid4()),
-            "timestamp": datetime.utcnow().isoformat(),
-            "event_type": body.get("type", "unknown"),
-            "data": body,
-            "status": "success"
-        }
-        
-        # Store the event (in memory for MVP)
-        webhook_events.append(event)
-        logger.info(f"Total webhook events after append: {len(webhook_events)}")
-        
-        # Keep only the last 100 events
-        if len(webhook_events) > 100:
-            webhook_events.pop(0)
-            logger.info("Removed oldest event to maintain 100 event limit")
-        
-        return {"status": "success", "message": "Webhook received"}
-    
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}")
         # Store the error event
-        error_event = {
-            "id": str(uuid.uuid4()),
-            "timestamp": datetime.utcnow().isoformat(),
-            "event_type": "error",
-            "data": {"error": str(e)},
-            "status": "error"
-        }
-        webhook_events.append(error_event)
-        raise HTTPException(status_code=500, detail=str(e))
+        webhook_ingestor.submit(str(uuid.uuid4()), "error", {"error": str(e)}, status="error")
+        raise HTTPException(status_code=400, detail=str(e))
 
+    outcome = webhook_ingestor.submit(
+        get_delivery_id(request.headers, body),
+        event_type=body.get("type") or body.get("eventType") or "unknown",
+        data=body,
+        subscription_id=str(body["subscriptionId"]) if body.get("subscriptionId") is not None else None
+    )
+    if outcome == "rejected":
+        # Nodit retries the delivery later, nothing is lost
+        logger.warning("Webhook queue is full, asking Nodit to retry")
+        raise HTTPException(status_code=503, detail="Webhook queue is full", headers={"Retry-After": "1"})
+    if outcome == "duplicate":
+        return {"status": "success", "message": "Duplicate webhook ignored"}
+
+    return {"status": "success", "message": "Webhook received"}
+
+# The event queries share the sync session with the ingestor, plain def runs them in the threadpool
 @router.get("/events")
-async def get_webhook_events() -> List[Dict[str, Any]]:
+def get_webhook_events(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    event_type: Optional[str] = None,
+    subscription_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
     """
-    Retrieve the list of webhook events.
-    Returns the events in reverse chronological order (newest first).
+    Retrieve webhook events in reverse chronological order (newest first).
+
+    Pass the X-Next-Cursor response header as `cursor` to get the next page,
+    the header is missing on the last page.
     """
     try:
-        logger.info(f"Getting webhook events. Current count: {len(webhook_events)}")
-        # Return events in reverse chronological order
-        sorted_events = sorted(webhook_events, key=lambda x: x["timestamp"], reverse=True)
-        logger.info(f"Returning {len(sorted_events)} webhook events")
-        return sorted_events
+        before_seq = int(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    try:
+        # Fetch one extra row to know whether there is a next page
+        events = get_webhook_events_page(db, limit + 1, before_seq, event_type, subscription_id)
+        if len(events) > limit:
+            events = events[:limit]
+            response.headers["X-Next-Cursor"] = str(events[-1].seq)
+        logger.info(f"Returning {len(events)} webhook events")
+        return [event.to_dict() for event in events]
     except Exception as e:
         logger.error(f"Error retrieving webhook events: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/nodit/latest")
-async def get_latest_webhook_event():
+def get_latest_webhook_event(db: Session = Depends(get_db)):
     """
     Get the most recent webhook event.
     """
     try:
-        if not webhook_events:
-            return None
-        # Return the most recent event
-        return sorted(webhook_events, key=lambda x: x["timestamp"], reverse=True)[0]
+        event = get_latest_event(db)
+        return event.to_dict() if event else None
     except Exception as e:
         logger.error(f"Error retrieving latest webhook event: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+def _resolve_last_seq(last_event_id: Optional[str]) -> int:
+    """Map a Last-Event-ID (seq or event id) to a seq, without one the stream starts after the latest event"""
+    db = SessionLocal()
+    try:
+        if last_event_id:
+            if last_event_id.isdigit():
+                return int(last_event_id)
+            event = get_webhook_event_by_event_id(db, last_event_id)
+            if event:
+                return event.seq
+        latest = get_latest_event(db)
+        return latest.seq if latest else 0
+    finally:
+        db.close()
+
+def _load_events_after(
+    after_seq: int, event_type: Optional[str], subscription_id: Optional[str], exclude_seqs: Optional[set] = None
+) -> List[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        events = get_webhook_events_after(
+            db, after_seq, event_type=event_type, subscription_id=subscription_id, exclude_seqs=exclude_seqs
+        )
+        return [event.to_dict() for event in events]
+    finally:
+        db.close()
+
+def _format_sse(event: Dict[str, Any], last_seq: int) -> str:
+    # The id is the highest seq sent, a late event must not move the resume point back
+    return f"id: {last_seq}\nevent: webhook\ndata: {json.dumps(event, default=str)}\n\n"
+
+@router.get("/stream")
+async def stream_webhook_events(
+    request: Request,
+    subscription_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    last_event_id: Optional[str] = None
+):
+    """
+    Stream webhook events as Server-Sent Events as soon as they are ingested.
+
+    Events can be filtered by subscription id and event type. A reconnecting
+    client sends the Last-Event-ID header (or the last_event_id parameter) and
+    first receives the events it missed.
+
+    seq is assigned when an event is inserted, not when it is committed, so an
+    event can become visible after events with a higher seq were sent. Catch-up
+    queries look again at the last WEBHOOK_STREAM_LAG_WINDOW seqs and send the
+    events not sent yet. Events committed later than that, or before a
+    reconnect below the resumed seq, are not sent.
+    """
+    last_seq = await asyncio.to_thread(_resolve_last_seq, request.headers.get("last-event-id") or last_event_id)
+    subscriber = webhook_event_broker.subscribe(subscription_id, event_type)
+
+    async def event_stream():
+        nonlocal last_seq
+        # Events sent before were received by the client before it reconnected
+        resume_seq = last_seq
+        # Seqs sent within the lag window
+        sent = set()
+
+        def lag_floor() -> int:
+            return max(resume_seq, last_seq - WEBHOOK_STREAM_LAG_WINDOW)
+
+        try:
+            yield f"retry: {WEBHOOK_STREAM_RETRY_MS}\n\n"
+            # Replay the events the client missed
+            events = await asyncio.to_thread(_load_events_after, last_seq, event_type, subscription_id)
+
+            while True:
+                for event in events:
+                    # Skip events already sent, e.g. pushed and found again in the database
+                    if event["seq"] in sent or event["seq"] <= lag_floor():
+                        continue
+                    sent.add(event["seq"])
+                    last_seq = max(last_seq, event["seq"])
+                    yield _format_sse(event, last_seq)
+                floor = lag_floor()
+                sent = {seq for seq in sent if seq > floor}
+
+                if await request.is_disconnected():
+                    break
+
+                try:
+                    events = [await asyncio.wait_for(subscriber.queue.get(), timeout=WEBHOOK_STREAM_POLL_INTERVAL)]
+                except asyncio.TimeoutError:
+                    events = []
+
+                if not events or subscriber.overflowed:
+                    # Catch up on events ingested by other workers or dropped for this slow client
+                    subscriber.overflowed = False
+                    events = events + await asyncio.to_thread(_load_events_after, lag_floor(), event_type, subscription_id, set(sent))
+                    events.sort(key=lambda event: event["seq"])
+                    if not events:
+                        yield ": keepalive\n\n"
+        finally:
+            webhook_event_broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def prune_webhook_events() -> int:
+    """Delete the events older than the retention period"""
+    if WEBHOOK_EVENT_RETENTION_DAYS <= 0:
+        return 0
+    db = SessionLocal()
+    try:
+        deleted = delete_webhook_events_older_than(db, WEBHOOK_EVENT_RETENTION_DAYS)
+        if deleted:
+            logger.info(f"Deleted {deleted} webhook events older than {WEBHOOK_EVENT_RETENTION_DAYS} days")
+        return deleted
+    finally:
+        db.close()
+
+async def prune_webhook_events_periodically():
+    """Apply the retention period in the background"""
+    while True:
+        try:
+            await asyncio.to_thread(prune_webhook_events)
+        except Exception as e:
+            logger.error(f"Error pruning webhook events: {str(e)}")
+        await asyncio.sleep(WEBHOOK_EVENT_PRUNE_INTERVAL)
@@ -0,0 +1,373 @@
+import asyncio
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from agents.modules.chart_templates import build_chart
+from agents.utils.format_utils import normalize_records
+from agents.utils.render_pool import get_render_pool
+from agents.utils.result_store import RESULT_FILE_SUFFIX, read_result, write_columns
+from backend.database import AsyncSessionLocal
+from backend.database.visualization import (
+    get_visualization_by_id,
+    get_visualization_ids_by_subscription,
+    update_visualization_figure
+)
+
+logger = logging.getLogger(__name__)
+
+# Columns that identify a row of a tool result, checked in order. New rows
+# replace stored rows with the same key, the other stored rows are kept.
+ROW_KEY_COLUMNS = [
+    ("transactionHash", "logIndex"),
+    ("transactionHash",),
+    ("ownerAddress",),
+    ("contract.address",),
+    ("date",),
+    ("timestamp",),
+]
+
+# Tool arguments that select an older page, dropped so a refresh gets the latest data
+PAGING_ARGS = ("cursor",)
+
+
+def _load_source_tool(server: str, tool: str):
+    """The undecorated tool function, so the tool cache does not return stale data"""
+    module = importlib.import_module(f"agents.utils.mcp_server_{server}")
+    func = getattr(module, tool)
+    return getattr(func, "__wrapped__", func)
+
+
+def _row_key(df: pd.DataFrame) -> Optional[List[str]]:
+    for columns in ROW_KEY_COLUMNS:
+        if all(column in df.columns for column in columns):
+            return list(columns)
+    return None
+
+
+def _time_order(df: pd.DataFrame) -> Optional[tuple]:
+    """(column, ascending) when the rows are sorted by a time column"""
+    for column in ("timestamp", "date"):
+        if column in df.columns and len(df) > 1:
+            if df[column].is_monotonic_increasing:
+                return column, True
+            if df[column].is_monotonic_decreasing:
+                return column, False
+    return None
+
+
+def merge_rows(stored: pd.DataFrame, fresh: pd.DataFrame, max_rows: int) -> pd.DataFrame:
+    """
+    Merge freshly retrieved rows into the stored result.
+
+    Without key columns in both frames the fresh rows replace the stored ones.
+    The stored time order is kept, and the oldest rows are dropped past max_rows.
+    """
+    key = _row_key(stored)
+    if key is None or _row_key(fresh) != key:
+        return fresh
+    order = _time_order(stored)
+    merged = pd.concat([fresh, stored], ignore_index=True)
+    merged = merged.drop_duplicates(subset=key, keep="first")
+    if order:
+        merged = merged.sort_values(order[0], ascending=order[1], kind="stable")
+    # Trim once ordered, the newest rows are last in ascending order and first
+    # otherwise (the fresh rows lead an unordered result)
+    if order and order[1]:
+        merged = merged.tail(max_rows)
+    else:
+        merged = merged.head(max_rows)
+    return merged.reset_index(drop=True)
+
+
+def event_rows(data: Any) -> List[Dict[str, Any]]:
+    """The rows carried by a Nodit webhook payload, under event.messages"""
+    event = data.get("event") if isinstance(data, dict) else None
+    messages = event.get("messages") if isinstance(event, dict) else None
+    if not isinstance(messages, list):
+        return []
+    return [message for message in messages if isinstance(message, dict)]
+
+
+def _frame_to_columns(df: pd.DataFrame) -> Dict[str, List[Any]]:
+    df = df.astype(object).where(df.notna(), None)
+    return {column: df[column].tolist() for column in df.columns}
+
+
+class ChartRefresher:
+    """
+    Refresh the charts subscribed to webhook subscriptions.
+
+    When events of a subscription are stored, the rows they carry are merged
+    into the data file of every subscribed visualization, and the chart is
+    re-rendered with its chart template or its cached plot code. No LLM call
+    is made. Refreshes are debounced, so a burst of events leads to a single
+    refresh per chart.
+
+    Event rows are only applied when they have the row key and every column of
+    the stored result, e.g. transfers keyed by transactionHash and logIndex.
+    Otherwise (aggregates such as holder lists or daily stats, whose values an
+    event does not carry, or an event without rows) the source tool is run
+    again and its rows are merged instead.
+
+    Settings:
+        CHART_REFRESH_ENABLED: set to "false" to disable refreshes (default: true)
+        CHART_REFRESH_DEBOUNCE: seconds to wait for more events before a refresh (default: 2)
+        CHART_REFRESH_MIN_INTERVAL: minimum seconds between two refreshes of a chart (default: 10)
+        CHART_REFRESH_CONCURRENCY: maximum refreshes running at the same time (default: 4)
+        CHART_REFRESH_MAX_ROWS: maximum rows kept in a refreshed data file (default: 100000)
+    """
+
+    def __init__(self) -> None:
+        self.enabled = os.getenv("CHART_REFRESH_ENABLED", "true").lower() != "false"
+        self.debounce = float(os.getenv("CHART_REFRESH_DEBOUNCE", "2"))
+        self.min_interval = float(os.getenv("CHART_REFRESH_MIN_INTERVAL", "10"))
+        self.concurrency = int(os.getenv("CHART_REFRESH_CONCURRENCY", "4"))
+        self.max_rows = int(os.getenv("CHART_REFRESH_MAX_ROWS", "100000"))
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: Dict[int, asyncio.Task] = {}
+        # Event rows waiting for the pending refresh of a chart, None when it needs the source tool
+        self._pending_rows: Dict[int, Optional[List[Dict[str, Any]]]] = {}
+        # Refreshes of charts sharing a data file run one at a time
+        self._file_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._file_locks_guard = threading.Lock()
+        self._tasks = set()
+        self._last_refresh: Dict[int, float] = {}
+
+        self._stats = {
+            "notified": 0,
+            "scheduled": 0,
+            "coalesced": 0,
+            "refreshed": 0,
+            "failed": 0,
+            "rows_added": 0,
+            "applied_from_events": 0,
+            "total_refresh_seconds": 0.0,
+        }
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def notify(self, events: Iterable[Dict[str, Any]]):
+        """Schedule a refresh of the charts subscribed to these stored events, must be called from the event loop"""
+        rows_by_subscription: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+        for event in events:
+            if not event.get("subscription_id"):
+                continue
+            subscription_id = str(event["subscription_id"])
+            rows = event_rows(event.get("data"))
+            if not rows or (subscription_id in rows_by_subscription and rows_by_subscription[subscription_id] is None):
+                # Without rows the chart is refreshed from its source tool
+                rows_by_subscription[subscription_id] = None
+            else:
+                rows_by_subscription.setdefault(subscription_id, []).extend(rows)
+        if not self.enabled or not rows_by_subscription:
+            return
+        self._stats["notified"] += 1
+        self._spawn(self._schedule_subscriptions(rows_by_subscription))
+
+    async def _schedule_subscriptions(self, rows_by_subscription: Dict[str, Optional[List[Dict[str, Any]]]]):
+        subscription_ids = sorted(rows_by_subscription)
+        try:
+            async with AsyncSessionLocal() as db:
+                visualization_ids = await get_visualization_ids_by_subscription(db, subscription_ids)
+        except Exception as e:
+            logger.error(f"Error finding the charts of subscriptions {subscription_ids}: {str(e)}")
+            return
+        for subscription_id, ids in visualization_ids.items():
+            for visualization_id in ids:
+                self.schedule(visualization_id, rows_by_subscription.get(subscription_id))
+
+    def schedule(self, visualization_id: int, rows: Optional[List[Dict[str, Any]]] = None):
+        """
+        Refresh a chart after the debounce delay, events arriving meanwhile share the refresh.
+
+        The rows of these events are applied to the data file, without rows the
+        source tool is run again.
+        """
+        if visualization_id in self._pending:
+            self._stats["coalesced"] += 1
+            pending_rows = self._pending_rows.get(visualization_id)
+            if rows is None or pending_rows is None:
+                self._pending_rows[visualization_id] = None
+            else:
+                pending_rows.extend(rows)
+            return
+        self._stats["scheduled"] += 1
+        self._pending_rows[visualization_id] = list(rows) if rows is not None else None
+        self._pending[visualization_id] = self._spawn(self._refresh_later(visualization_id))
+
+    async def _refresh_later(self, visualization_id: int):
+        try:
+            next_allowed = self._last_refresh.get(visualization_id, 0.0) + self.min_interval
+            await asyncio.sleep(max(self.debounce, next_allowed - time.monotonic()))
+        finally:
+            # Events stored from now on schedule another refresh
+            self._pending.pop(visualization_id, None)
+            rows = self._pending_rows.pop(visualization_id, None)
+        result = await self.refresh(visualization_id, rows)
+        if not result["success"]:
+            logger.error(f"Error refreshing visualization {visualization_id}: {result['error']}")
+
+    async def refresh(self, visualization_id: int, rows: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Refresh a chart now.
+
+        Args:
+            visualization_id: ID of the visualization
+            rows: Event rows to apply, the source tool is run again when None
+                or when they do not match the stored result
+
+        Returns:
+            Dictionary containing:
+                - success: Boolean indicating success
+                - rows_added: Number of new rows in the data file
+                - source: "events" or "tool"
+                - renderer: "template" or "plot_code"
+                - error: Error message if any
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            self._last_refresh[visualization_id] = time.monotonic()
+            try:
+                visualization = await self._load_visualization(visualization_id)
+                rows_added, source = await asyncio.to_thread(self._refresh_data, visualization, rows)
+                fig_json, renderer = await self._render(visualization)
+                await self._save_figure(visualization_id, fig_json)
+            except Exception as e:
+                self._stats["failed"] += 1
+                return {"success": False, "error": str(e)}
+
+            self._stats["refreshed"] += 1
+            self._stats["rows_added"] += rows_added
+            if source == "events":
+                self._stats["applied_from_events"] += 1
+            self._stats["total_refresh_seconds"] += time.perf_counter() - started
+            logger.info(f"Refreshed visualization {visualization_id} with {rows_added} new rows from {source} ({renderer})")
+            return {"success": True, "rows_added": rows_added, "source": source, "renderer": renderer}
+
+    async def _load_visualization(self, visualization_id: int) -> Dict[str, Any]:
+        async with AsyncSessionLocal() as db:
+            visualization = await get_visualization_by_id(db, visualization_id)
+            if not visualization:
+                raise ValueError(f"Visualization {visualization_id} not found")
+            if not visualization.source_tool or not visualization.file_path:
+                raise ValueError(f"Visualization {visualization_id} has no source tool to refresh from")
+            if Path(visualization.file_path).suffix != RESULT_FILE_SUFFIX:
+                raise ValueError(f"Visualization {visualization_id} uses a legacy data file")
+            return {
+                "file_path": visualization.file_path,
+                "png_path": visualization.png_path,
+                "plot_code": visualization.plot_code,
+                "source_server": visualization.source_server or "nodit",
+                "source_tool": visualization.source_tool,
+                "source_args": dict(visualization.source_args or {}),
+            }
+
+    def _file_lock(self, file_path: Path) -> threading.Lock:
+        with self._file_locks_guard:
+            return self._file_locks[str(file_path.resolve())]
+
+    @staticmethod
+    def _rows_from_events(stored: pd.DataFrame, rows: Optional[List[Dict[str, Any]]]) -> Optional[pd.DataFrame]:
+        """The event rows in the shape of the stored result, None when they cannot be applied"""
+        if not rows or stored.empty or _row_key(stored) is None:
+            return None
+        fresh = pd.DataFrame(normalize_records(rows) or {})
+        if not set(stored.columns) <= set(fresh.columns):
+            return None
+        return fresh[list(stored.columns)]
+
+    def _refresh_data(self, visualization: Dict[str, Any], rows: Optional[List[Dict[str, Any]]] = None) -> tuple:
+        """
+        Merge the event rows, or the rows of the source tool run again, into the
+        data file. Returns (number of new rows, "events" or "tool").
+        """
+        file_path = Path(visualization["file_path"])
+        with self._file_lock(file_path):
+            stored = read_result(file_path) if file_path.exists() else pd.DataFrame()
+            fresh, source = self._rows_from_events(stored, rows), "events"
+            if fresh is None:
+                tool = _load_source_tool(visualization["source_server"], visualization["source_tool"])
+                args = {name: value for name, value in visualization["source_args"].items() if name not in PAGING_ARGS}
+                fresh, source = pd.DataFrame(normalize_records(tool(**args)) or {}), "tool"
+            merged = merge_rows(stored, fresh, self.max_rows)
+
+            # Write next to the data file and swap, readers never see a partial file.
+            # The name is unique, so refreshes in other processes do not share it
+            tmp_path = file_path.with_name(f"{file_path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                write_columns(_frame_to_columns(merged), tmp_path)
+                os.replace(tmp_path, file_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+        key = _row_key(stored)
+        if key is None or key != _row_key(merged):
+            return len(merged), source
+        stored_keys = set(stored[key].astype(str).itertuples(index=False, name=None))
+        return sum(1 for row in merged[key].astype(str).itertuples(index=False, name=None) if row not in stored_keys), source
+
+    async def _render(self, visualization: Dict[str, Any]) -> tuple:
+        """Re-render the chart from the refreshed data, returns (figure JSON, renderer)"""
+        render_pool = get_render_pool()
+        df = await asyncio.to_thread(read_result, visualization["file_path"])
+        fig = await asyncio.to_thread(build_chart, visualization["source_tool"], df, visualization["source_args"])
+        if fig is not None:
+            fig_json = fig.to_json()
+            if visualization["png_path"]:
+                export_result = (await render_pool.export_pngs([(fig_json, visualization["png_path"])]))[0]
+                if not export_result["success"]:
+                    logger.warning(f"Error exporting refreshed chart: {export_result['error']}")
+            return fig_json, "template"
+
+        if not visualization["plot_code"]:
+            raise ValueError("No chart template or plot code to render the chart")
+        result = await render_pool.execute_plot_code(
+            visualization["plot_code"], visualization["file_path"], visualization["png_path"],
+            export_png=bool(visualization["png_path"])
+        )
+        if not result["success"]:
+            raise ValueError(f"Cached plot code failed on the refreshed data: {result['error']}")
+        return result["fig_json"], "plot_code"
+
+    async def _save_figure(self, visualization_id: int, fig_json: str):
+        async with AsyncSessionLocal() as db:
+            await update_visualization_figure(db, visualization_id, json.loads(fig_json))
+
+    async def stop(self):
+        """Cancel the refreshes waiting for their debounce delay"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._pending.clear()
+        self._pending_rows.clear()
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        total_refresh_seconds = stats.pop("total_refresh_seconds")
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "avg_refresh_seconds": total_refresh_seconds / stats["refreshed"] if stats["refreshed"] else 0.0,
+            **stats,
+        }
+
+
+chart_refresher = ChartRefresher()
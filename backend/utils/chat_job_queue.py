@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import socket
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+import backend.routes.mcp as mcp_routes
+from backend.database import AsyncSessionLocal
+from backend.database.chat_job import (
+    claim_next_chat_job,
+    create_chat_job,
+    delete_chat_jobs_older_than,
+    finish_chat_job,
+    recover_stale_chat_jobs,
+    touch_chat_job,
+    update_chat_job_progress
+)
+from backend.routes.message import MessageRequest, process_message
+
+logger = logging.getLogger(__name__)
+
+
+class ChatJobQueue:
+    """
+    Database-backed queue of chat turns.
+
+    POST /message/jobs stores the request as a queued job and returns at once.
+    Workers claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, run the
+    agent chain and store the result, so the only broker is the database.
+    Workers run inside the API process, in `python -m backend.worker`
+    processes, or both, and scale independently of the API.
+
+    A worker that dies leaves its job without heartbeats. Such jobs are queued
+    again, or failed once they used CHAT_JOB_MAX_ATTEMPTS attempts. A job that
+    raises is failed right away, since the user message may already be stored.
+
+    Settings:
+        CHAT_JOB_WORKERS: jobs run at the same time by the API process, 0 leaves
+            them to worker processes (default: 4)
+        CHAT_JOB_POLL_INTERVAL: seconds between two checks of an empty queue (default: 1)
+        CHAT_JOB_HEARTBEAT_INTERVAL: seconds between two heartbeats of a running job (default: 15)
+        CHAT_JOB_TIMEOUT: seconds without heartbeat after which a job is recovered (default: 120)
+        CHAT_JOB_MAX_ATTEMPTS: runs of a job whose worker died (default: 1)
+        CHAT_JOB_RETENTION_DAYS: days finished jobs are kept, 0 keeps all jobs (default: 7)
+    """
+
+    def __init__(self) -> None:
+        self.default_workers = int(os.getenv("CHAT_JOB_WORKERS", "4"))
+        self.poll_interval = float(os.getenv("CHAT_JOB_POLL_INTERVAL", "1"))
+        self.heartbeat_interval = float(os.getenv("CHAT_JOB_HEARTBEAT_INTERVAL", "15"))
+        self.timeout = float(os.getenv("CHAT_JOB_TIMEOUT", "120"))
+        self.max_attempts = int(os.getenv("CHAT_JOB_MAX_ATTEMPTS", "1"))
+        self.retention_days = int(os.getenv("CHAT_JOB_RETENTION_DAYS", "7"))
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._stopping = False
+
+        self._stats = {
+            "submitted": 0,
+            "running": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "recovered": 0,
+            "lost_leases": 0,
+        }
+
+    async def submit(self, message: MessageRequest) -> Dict[str, Any]:
+        """Queue a chat turn, returns the job"""
+        request = message.dict()
+        # The MCP server selected when the message was sent, workers may run in other processes
+        request["mcp_server"] = mcp_routes.current_mcp_server
+        async with AsyncSessionLocal() as db:
+            job = await create_chat_job(db, request)
+        self._stats["submitted"] += 1
+        # Wake up an idle local worker instead of waiting for its next poll
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job.to_dict()
+
+    def start(self, workers: Optional[int] = None):
+        """Start the workers and the recovery of stale jobs in this process"""
+        workers = self.default_workers if workers is None else workers
+        if self._tasks or workers <= 0:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work(index)) for index in range(workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+        logger.info(f"Started {workers} chat job workers ({self.worker_id})")
+
+    async def stop(self):
+        """Stop claiming jobs and wait for the running ones"""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._stopped.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self, index: int):
+        while not self._stopping:
+            try:
+                async with AsyncSessionLocal() as db:
+                    claimed = await claim_next_chat_job(db, f"{self.worker_id}/{index}")
+            except Exception as e:
+                logger.error(f"Error claiming a chat job: {str(e)}")
+                claimed = None
+
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(*claimed, worker_id=f"{self.worker_id}/{index}")
+
+    async def _set_progress(self, job_id: str, stage: str):
+        try:
+            async with AsyncSessionLocal() as db:
+                await update_chat_job_progress(db, job_id, stage)
+        except Exception as e:
+            # Progress is informative, the job keeps running
+            logger.warning(f"Error updating the progress of chat job {job_id}: {str(e)}")
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await touch_chat_job(db, job_id)
+            except Exception as e:
+                logger.warning(f"Error sending the heartbeat of chat job {job_id}: {str(e)}")
+
+    async def _run(self, job_id: str, request: Dict[str, Any], attempts: int, worker_id: str):
+        logger.info(f"Running chat job {job_id} (attempt {attempts})")
+        self._stats["running"] += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        result, error = None, None
+        try:
+            request = dict(request)
+            mcp_server = request.pop("mcp_server", None)
+            result = jsonable_encoder(await process_message(
+                MessageRequest(**request),
+                on_progress=lambda stage: self._set_progress(job_id, stage),
+                mcp_server=mcp_server
+            ))
+        except HTTPException as e:
+            error = str(e.detail)
+        except Exception as e:
+            logger.exception(f"Error in chat job {job_id}")
+            error = str(e) or e.__class__.__name__
+        finally:
+            heartbeat.cancel()
+            self._stats["running"] -= 1
+
+        try:
+            async with AsyncSessionLocal() as db:
+                finished = await finish_chat_job(db, job_id, worker_id, result=result, error=error)
+        except Exception as e:
+            # The job is recovered as stale once its heartbeats stop
+            logger.error(f"Error storing the result of chat job {job_id}: {str(e)}")
+            return
+        if not finished:
+            # The job was recovered meanwhile, its current run owns the result
+            self._stats["lost_leases"] += 1
+            logger.warning(f"Chat job {job_id} was recovered from {worker_id}, dropping its result")
+            return
+        self._stats["failed" if error else "succeeded"] += 1
+
+    async def _maintain(self):
+        """Recover the jobs of dead workers and delete old jobs"""
+        while not self._stopping:
+            try:
+                async with AsyncSessionLocal() as db:
+                    recovered = await recover_stale_chat_jobs(db, self.timeout, self.max_attempts)
+                    if recovered:
+                        self._stats["recovered"] += recovered
+                        logger.warning(f"Recovered {recovered} stale chat jobs")
+                        self._wakeup.set()
+                    if self.retention_days > 0:
+                        await delete_chat_jobs_older_than(db, self.retention_days)
+            except Exception as e:
+                logger.error(f"Error recovering stale chat jobs: {str(e)}")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=self.timeout / 2)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict:
+        return {
+            "worker_id": self.worker_id,
+            "workers": max(0, len(self._tasks) - 1),
+            **self._stats,
+        }
+
+
+chat_job_queue = ChatJobQueue()
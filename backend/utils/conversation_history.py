@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List
+
+from agents.utils.conversation_summary import summarize_conversation
+from backend.constants import AI_USER_ID
+from backend.database import AsyncSessionLocal
+from backend.database.canvas import get_canvas, update_canvas_summary
+from backend.database.message import (
+    count_messages_after,
+    get_oldest_messages_after,
+    get_recent_messages_for_canvas
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationHistory:
+    """
+    Bounded conversation history of a canvas.
+
+    The prompt history is the rolling summary of the older messages followed by
+    the messages after it, loaded with a LIMIT query. Once more than a batch of
+    messages has fallen out of the window, they are folded into the summary in
+    the background, so the history of a long-lived canvas stays the same size.
+
+    Settings:
+        HISTORY_WINDOW_MESSAGES: recent messages always sent verbatim (default: 20)
+        HISTORY_SUMMARY_BATCH: messages folded into the summary at once, the history
+            holds at most window + batch messages (default: 10)
+        HISTORY_SUMMARY_ENABLED: set to "false" to only keep the window (default: true)
+    """
+
+    def __init__(self) -> None:
+        self.window = max(1, int(os.getenv("HISTORY_WINDOW_MESSAGES", "20")))
+        self.batch = max(1, int(os.getenv("HISTORY_SUMMARY_BATCH", "10")))
+        self.summary_enabled = os.getenv("HISTORY_SUMMARY_ENABLED", "true").lower() != "false"
+
+        self._summarizing = set()
+        self._tasks = set()
+
+    @staticmethod
+    def _to_history(messages) -> List[Dict[str, str]]:
+        return [
+            {"role": "assistant" if msg.user_id == AI_USER_ID else "user", "content": msg.text}
+            for msg in messages
+        ]
+
+    async def load(self, db, canvas) -> List[Dict[str, str]]:
+        """The prompt history of a canvas, oldest first"""
+        after_message_id = canvas.summary_message_id if self.summary_enabled else None
+        messages = await get_recent_messages_for_canvas(db, canvas.canvas_id, self.window + self.batch, after_message_id)
+        if not self.summary_enabled:
+            messages = messages[-self.window:]
+
+        history = self._to_history(messages)
+        if self.summary_enabled and canvas.history_summary:
+            history.insert(0, {
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{canvas.history_summary}"
+            })
+        return history
+
+    def schedule_summary(self, canvas_id: int):
+        """Fold the messages that left the window into the summary, in the background"""
+        if not self.summary_enabled or canvas_id in self._summarizing:
+            return
+        self._summarizing.add(canvas_id)
+        task = asyncio.create_task(self._summarize(canvas_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load_unsummarized(self, canvas_id: int):
+        async with AsyncSessionLocal() as db:
+            canvas = await get_canvas(db, canvas_id)
+            if not canvas:
+                return None
+            pending = await count_messages_after(db, canvas_id, canvas.summary_message_id) - self.window
+            if pending < self.batch:
+                return None
+            # A summary that fell behind catches up over several messages
+            messages = await get_oldest_messages_after(db, canvas_id, min(pending, self.batch * 10), canvas.summary_message_id)
+            return canvas.history_summary, canvas.summary_message_id, messages[-1].message_id, self._to_history(messages)
+
+    async def _store_summary(self, canvas_id: int, summary: str, summary_message_id: int, previous_summary_message_id: int) -> bool:
+        async with AsyncSessionLocal() as db:
+            return await update_canvas_summary(db, canvas_id, summary, summary_message_id, previous_summary_message_id)
+
+    async def _summarize(self, canvas_id: int):
+        try:
+            unsummarized = await self._load_unsummarized(canvas_id)
+            if unsummarized is None:
+                return
+            previous_summary, previous_message_id, last_message_id, messages = unsummarized
+            summary = await summarize_conversation(previous_summary, messages)
+            stored = await self._store_summary(canvas_id, summary, last_message_id, previous_message_id)
+            if stored:
+                logger.info(f"Folded {len(messages)} messages into the summary of canvas {canvas_id}")
+        except Exception as e:
+            # The messages stay in the history and are folded on the next message
+            logger.error(f"Error summarizing the history of canvas {canvas_id}: {str(e)}")
+        finally:
+            self._summarizing.discard(canvas_id)
+
+
+conversation_history_loader = ConversationHistory()
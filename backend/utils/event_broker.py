@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class EventSubscriber:
+    """Queue of one stream client, with optional filters on the events it receives"""
+
+    def __init__(self, subscription_id: Optional[str] = None, event_type: Optional[str] = None, max_queue: int = 1000) -> None:
+        self.subscription_id = subscription_id
+        self.event_type = event_type
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        # Set when events were dropped because the client is too slow, it then catches up from the database
+        self.overflowed = False
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.subscription_id and event.get("subscription_id") != self.subscription_id:
+            return False
+        if self.event_type and event.get("event_type") != self.event_type:
+            return False
+        return True
+
+
+class EventBroker:
+    """
+    In-process fan-out of ingested events to the connected stream clients.
+
+    Publishing never blocks ingestion: a client whose queue is full misses the
+    event and is flagged to catch up from the database instead.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: Set[EventSubscriber] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, subscription_id: Optional[str] = None, event_type: Optional[str] = None) -> EventSubscriber:
+        subscriber = EventSubscriber(subscription_id, event_type)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: EventSubscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event: Dict[str, Any]):
+        """Deliver an event to every matching subscriber, must be called from the event loop"""
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            if not subscriber.matches(event):
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+                self.dropped += 1
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+webhook_event_broker = EventBroker()
@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from backend.database import SessionLocal
+from backend.database.webhook_event import create_webhook_events_batch
+from backend.utils.chart_refresher import chart_refresher
+from backend.utils.event_broker import webhook_event_broker
+
+logger = logging.getLogger(__name__)
+
+# Headers that carry the id of a delivery, checked in order
+DELIVERY_ID_HEADERS = ["x-nodit-delivery-id", "x-delivery-id"]
+
+
+def get_delivery_id(headers, body: Dict[str, Any]) -> str:
+    """
+    Id of a webhook delivery, the same for every retry of one delivery.
+
+    Uses a delivery id header or an id field of the body when there is one,
+    otherwise a hash of the body.
+    """
+    for header in DELIVERY_ID_HEADERS:
+        if headers.get(header):
+            return headers[header]
+    for field in ("deliveryId", "eventId", "id"):
+        if body.get(field):
+            return f"{body.get('subscriptionId', '')}:{body[field]}"
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class WebhookIngestor:
+    """
+    Acknowledge-first webhook ingestion.
+
+    Deliveries are deduplicated and put on an in-process queue, and a background
+    task writes them to the database in batches and then pushes them to the
+    stream clients and the chart refresher. When the queue is full the delivery is rejected, so that
+    Nodit retries it later instead of it being lost.
+
+    Settings:
+        WEBHOOK_QUEUE_SIZE: maximum events waiting to be written (default: 10000)
+        WEBHOOK_FLUSH_BATCH_SIZE: maximum events written per statement (default: 500)
+        WEBHOOK_FLUSH_INTERVAL: seconds to wait for more events before a write (default: 0.05)
+        WEBHOOK_DEDUPE_WINDOW: recent delivery ids remembered in memory (default: 50000)
+        WEBHOOK_DEAD_LETTER_FILE: JSON lines file of the events the database rejects
+            (default: data/webhook_dead_letters.jsonl)
+
+    The deliveries are already acknowledged, so a write that fails because the
+    database is unavailable is retried until it succeeds. Meanwhile the queue
+    fills up and new deliveries are rejected, so Nodit keeps them. A batch the
+    database rejects for its data is split in halves written separately, and an
+    event rejected on its own is appended to the dead-letter file.
+    """
+
+    def __init__(self) -> None:
+        self.max_queue = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))
+        self.batch_size = int(os.getenv("WEBHOOK_FLUSH_BATCH_SIZE", "500"))
+        self.flush_interval = float(os.getenv("WEBHOOK_FLUSH_INTERVAL", "0.05"))
+        self.dedupe_window = int(os.getenv("WEBHOOK_DEDUPE_WINDOW", "50000"))
+        self.dead_letter_path = Path(os.getenv("WEBHOOK_DEAD_LETTER_FILE", "data/webhook_dead_letters.jsonl"))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._recent_deliveries: "OrderedDict[str, None]" = OrderedDict()
+
+        # Backpressure metrics
+        self._stats = {
+            "accepted": 0,
+            "duplicates": 0,
+            "rejected": 0,
+            "stored": 0,
+            "flushed": 0,
+            "batches": 0,
+            "flush_errors": 0,
+            "dead_lettered": 0,
+            "max_queue_depth": 0,
+            "total_flush_seconds": 0.0,
+            "total_queue_seconds": 0.0,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write the queued events and stop the background task"""
+        if self._task is None:
+            return
+        # The sentinel is queued behind the pending events, so they are all written first
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def _seen(self, delivery_id: str) -> bool:
+        if delivery_id in self._recent_deliveries:
+            self._recent_deliveries.move_to_end(delivery_id)
+            return True
+        self._recent_deliveries[delivery_id] = None
+        while len(self._recent_deliveries) > self.dedupe_window:
+            self._recent_deliveries.popitem(last=False)
+        return False
+
+    def submit(self, delivery_id: str, event_type: str, data: Dict[str, Any], status: str = "success", subscription_id: str = None) -> str:
+        """
+        Queue an event for storage.
+
+        Returns:
+            "accepted", "duplicate" when the delivery was already received, or
+            "rejected" when the queue is full
+        """
+        if self._queue is None:
+            raise RuntimeError("Webhook ingestor not started")
+        if self._seen(delivery_id):
+            self._stats["duplicates"] += 1
+            return "duplicate"
+
+        event = {
+            "event_id": str(uuid.uuid4()),
+            "delivery_id": delivery_id,
+            "timestamp": datetime.utcnow(),
+            "event_type": event_type,
+            "subscription_id": subscription_id,
+            "status": status,
+            "data": data,
+        }
+        try:
+            self._queue.put_nowait((time.perf_counter(), event))
+        except asyncio.QueueFull:
+            # Forget the delivery so the retry is accepted
+            self._recent_deliveries.pop(delivery_id, None)
+            self._stats["rejected"] += 1
+            return "rejected"
+
+        self._stats["accepted"] += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+        return "accepted"
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # Collect the burst that arrives during the flush interval
+            deadline = time.perf_counter() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    def _write(self, events: List[Dict[str, Any]]) -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            return create_webhook_events_batch(db, events)
+        finally:
+            db.close()
+
+    def _append_dead_letter(self, event: Dict[str, Any], error: str):
+        self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"error": error, "event": event}, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _dead_letter(self, event: Dict[str, Any], error: Exception):
+        """Keep an event the database rejects in the dead-letter file, so it can be replayed by hand"""
+        self._stats["dead_lettered"] += 1
+        # Forget the delivery so a redelivery is accepted
+        self._recent_deliveries.pop(event["delivery_id"], None)
+        logger.error(f"Dead-lettering webhook event {event['event_id']} (delivery {event['delivery_id']}): {str(error)}")
+        try:
+            await asyncio.to_thread(self._append_dead_letter, event, str(error))
+        except Exception as e:
+            # Last resort, the payload is at least in the logs
+            logger.error(f"Error writing the dead-letter file: {str(e)}\n{json.dumps(event, default=str)}")
+
+    async def _write_with_retries(self, events: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Write events, retrying database outages and splitting batches the database rejects.
+        Returns the event ids of the stored events with their seq.
+        """
+        backoff = 0.5
+        while True:
+            try:
+                return await asyncio.to_thread(self._write, events)
+            except (DataError, IntegrityError) as e:
+                # The same rows would fail again, find the bad events
+                self._stats["flush_errors"] += 1
+                error = e
+                break
+            except Exception as e:
+                # Connection errors, restarts or an exhausted pool, keep the batch
+                self._stats["flush_errors"] += 1
+                logger.error(f"Error writing {len(events)} webhook events, retrying in {backoff}s: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+        if len(events) == 1:
+            await self._dead_letter(events[0], error)
+            return {}
+        logger.error(f"Error writing {len(events)} webhook events, splitting the batch: {str(error)}")
+        middle = len(events) // 2
+        inserted = await self._write_with_retries(events[:middle])
+        inserted.update(await self._write_with_retries(events[middle:]))
+        return inserted
+
+    async def _flush(self, batch: List[tuple]):
+        events = [event for _, event in batch]
+        started = time.perf_counter()
+        dead_lettered = self._stats["dead_lettered"]
+        inserted = await self._write_with_retries(events)
+        dead_lettered = self._stats["dead_lettered"] - dead_lettered
+
+        now = time.perf_counter()
+        self._stats["batches"] += 1
+        self._stats["flushed"] += len(events)
+        self._stats["stored"] += len(inserted)
+        self._stats["duplicates"] += len(events) - len(inserted) - dead_lettered
+        self._stats["total_flush_seconds"] += now - started
+        self._stats["total_queue_seconds"] += sum(now - queued_at for queued_at, _ in batch)
+
+        # Push the stored events to the stream clients, in seq order
+        stored = [dict(event, seq=inserted[event["event_id"]]) for event in events if event["event_id"] in inserted]
+        for event in sorted(stored, key=lambda event: event["seq"]):
+            webhook_event_broker.publish({
+                "id": event["event_id"],
+                "seq": event["seq"],
+                "timestamp": event["timestamp"].isoformat(),
+                "event_type": event["event_type"],
+                "subscription_id": event["subscription_id"],
+                "data": event["data"],
+                "status": event["status"],
+            })
+
+        # Refresh the charts subscribed to these subscriptions
+        chart_refresher.notify(stored)
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        batches = stats.pop("batches")
+        total_flush_seconds = stats.pop("total_flush_seconds")
+        total_queue_seconds = stats.pop("total_queue_seconds")
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "batches": batches,
+            "avg_batch_size": stats["flushed"] / batches if batches else 0.0,
+            "avg_flush_seconds": total_flush_seconds / batches if batches else 0.0,
+            "avg_queue_seconds": total_queue_seconds / stats["flushed"] if stats["flushed"] else 0.0,
+            **stats,
+        }
+
+
+webhook_ingestor = WebhookIngestor()
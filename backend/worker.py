@@ -0,0 +1,52 @@
+"""
+Standalone worker for queued chat turns.
+
+Runs the jobs submitted with POST /message/jobs, so workers can be scaled
+separately from the API. Set CHAT_JOB_WORKERS=0 on the API to leave all jobs
+to worker processes.
+
+    python -m backend.worker --workers 4
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from agents.runtime import get_runtime
+from agents.utils.openai_client import close_async_openai_client
+from agents.utils.render_pool import get_render_pool
+from backend.database import async_engine
+from backend.utils.chat_job_queue import chat_job_queue
+
+logging.basicConfig(level=logging.INFO)
+
+
+async def run(workers: int):
+    # Build the pipelines and warm the renderer before claiming the first job
+    await get_runtime()
+    await get_render_pool().warm_up()
+    chat_job_queue.start(workers)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    print("[INFO] Stopping, waiting for the running jobs...")
+    await chat_job_queue.stop()
+    await async_engine.dispose()
+    await close_async_openai_client()
+    get_render_pool().shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued chat turns")
+    parser.add_argument("--workers", type=int, default=chat_job_queue.default_workers, help="jobs run at the same time")
+    args = parser.parse_args()
+    asyncio.run(run(max(1, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getLatestWebhookEvent } from '../../services/api';
+import { getLatestWebhookEvent, subscribeToWebhookEvents } from '../../services/api';
 
 const WebhookTab = () => {
   const [latestEvent, setLatestEvent] = useState(null);
@@ -56,11 +56,17 @@ const WebhookTab = () => {
     }
   };
 
-  // Fetch latest event periodically
+  // Fetch the latest event once, then receive new events as they arrive
   useEffect(() => {
     fetchLatestEvent();
-    const interval = setInterval(fetchLatestEvent, 5000); // Poll every 5 seconds
-    return () => clearInterval(interval);
+    const unsubscribe = subscribeToWebhookEvents(
+      (event) => {
+        setLatestEvent(event);
+        setError(null);
+      },
+      () => setError('Connection to webhook stream lost, reconnecting...')
+    );
+    return () => unsubscribe();
   }, []);
 
   return (
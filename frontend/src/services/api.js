@@ -21,10 +21,52 @@ export const createUser = async (walletAddress) => {
   }
 };
 
-export const sendMessage = async ({ walletAddress, canvasId = null, text, mentionedVisualizationIds = [] }) => {
+const JOB_POLL_INTERVAL_MS = 2000;
+
+// Poll a queued message job until it is finished, used when its stream cannot be opened
+const pollMessageJob = async (jobId, onProgress) => {
+  for (;;) {
+    const response = await fetch(`${BACKEND_API_BASE_URL}/message/jobs/${jobId}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch message job');
+    }
+    const job = await response.json();
+    if (onProgress) onProgress(job.progress, job.status);
+    if (job.status === 'succeeded') return job.result;
+    if (job.status === 'failed') throw new Error(job.error || 'Failed to send message');
+    await new Promise((wait) => setTimeout(wait, JOB_POLL_INTERVAL_MS));
+  }
+};
+
+// Wait for a queued message job, resolves with the same response as POST /message
+const waitForMessageJob = (jobId, onProgress) => new Promise((resolve, reject) => {
+  const source = new EventSource(`${BACKEND_API_BASE_URL}/message/jobs/${jobId}/stream`);
+  source.addEventListener('job', (message) => {
+    const job = JSON.parse(message.data);
+    if (onProgress) onProgress(job.progress, job.status);
+    if (job.status === 'succeeded') {
+      source.close();
+      resolve(job.result);
+    } else if (job.status === 'failed') {
+      source.close();
+      reject(new Error(job.error || 'Failed to send message'));
+    }
+  });
+  source.onerror = (error) => {
+    console.error('Message job stream error:', error);
+    // The browser reconnects a dropped stream by itself, but gives up on an
+    // error response. The job keeps running on the server, so poll it instead
+    if (source.readyState === EventSource.CLOSED) {
+      pollMessageJob(jobId, onProgress).then(resolve, reject);
+    }
+  };
+});
+
+export const sendMessage = async ({ walletAddress, canvasId = null, text, mentionedVisualizationIds = [], onProgress = null }) => {
   try {
     console.log('Sending request with:', { walletAddress, canvasId, text, mentionedVisualizationIds }); // Debug log
-    const response = await fetch(`${BACKEND_API_BASE_URL}/message`, {
+    // Queue the message, the reply can take longer than a proxy timeout
+    const response = await fetch(`${BACKEND_API_BASE_URL}/message/jobs`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -42,7 +84,8 @@ export const sendMessage = async ({ walletAddress, canvasId = null, text, mentio
       throw new Error(error.detail || 'Failed to send message');
     }
 
-    const data = await response.json();
+    const { job_id: jobId } = await response.json();
+    const data = await waitForMessageJob(jobId, onProgress);
     console.log('Response data:', data); // Debug log
     return data;
   } catch (error) {
@@ -275,4 +318,28 @@ export const getLatestWebhookEvent = async () => {
     console.error('Error fetching latest webhook event:', error);
     throw error;
   }
-}; 
\ No newline at end of file
+}; 
+
+// Subscribe to webhook events pushed by the backend (Server-Sent Events).
+// The browser reconnects automatically and resumes from the last received event.
+// Returns a function that closes the stream.
+export const subscribeToWebhookEvents = (onEvent, onError, filters = {}) => {
+  const params = new URLSearchParams();
+  if (filters.subscriptionId) params.append('subscription_id', filters.subscriptionId);
+  if (filters.eventType) params.append('event_type', filters.eventType);
+  const query = params.toString();
+
+  const source = new EventSource(`${BACKEND_API_BASE_URL}/api/webhook/stream${query ? `?${query}` : ''}`);
+  source.addEventListener('webhook', (message) => {
+    try {
+      onEvent(JSON.parse(message.data));
+    } catch (error) {
+      console.error('Error parsing webhook event:', error);
+    }
+  });
+  source.onerror = (error) => {
+    console.error('Webhook event stream error:', error);
+    if (onError) onError(error);
+  };
+  return () => source.close();
+};